@@ -6,18 +6,47 @@ import time
 import traceback
 import platform
 import csv
+import glob
+import fnmatch
+import json
+import re
 import shutil
+import threading
+import io
+import zipfile
+import tarfile
+import mmap
+import zlib
+import struct
+import hashlib
+import pickle
+import sqlite3
+import statistics
+import queue
+import tempfile
 import warnings
+import gzip
+import collections
+import itertools
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_EXCEPTION
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QLineEdit, QPushButton, QComboBox, QListWidget,
                              QMessageBox, QFileDialog, QTabWidget, QGroupBox, 
-                             QTableWidget, QTableWidgetItem, QHeaderView, QCheckBox)
-from PyQt5.QtCore import Qt, QTimer
+                             QTableView, QHeaderView, QCheckBox, QAbstractItemView, QSpinBox,
+                             QSplitter, QTreeWidget, QTreeWidgetItem, QDateTimeEdit,
+                             QDialog, QDialogButtonBox, QListWidgetItem)
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QDateTime, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QPointF
+from PyQt5.QtGui import QPainter, QPen, QColor, QPolygonF
 import psycopg2
 import pymysql
 from configparser import ConfigParser
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.events import EVENT_JOB_MISSED
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
 
 # Suppress warnings
 warnings.filterwarnings("ignore", category=UserWarning, message="pkg_resources is deprecated")
@@ -29,7 +58,6 @@ if platform.system() == 'Windows':
     import win32service
     import win32con
     import win32api
-    import win32process
     import win32event
     try:
         import wmi
@@ -37,13 +65,4465 @@ if platform.system() == 'Windows':
         wmi = None
 import psutil
 
+# Optional: YAML user manifests
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Optional: S3-compatible backup storage
+try:
+    import boto3
+except ImportError:
+    boto3 = None
+
+# Optional: authenticated encryption of backups
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:
+    AESGCM = None
+    InvalidTag = None
+
+class UserTableModel(QAbstractTableModel):
+    """Table model that pages users/roles from the server on demand"""
+
+    HEADERS = ["Username", "Can Login", "Superuser", "Other Privileges"]
+    PAGE_SIZE = 200
+    fetch_failed = pyqtSignal(object)  # A page could not be loaded: on refresh, filtering, sorting or scrolling
+
+    # Privilege flag -> catalog column used for server-side filtering
+    PG_PRIVILEGE_COLUMNS = {
+        'LOGIN': 'rolcanlogin',
+        'SUPERUSER': 'rolsuper',
+        'CREATEDB': 'rolcreatedb',
+        'CREATEROLE': 'rolcreaterole',
+        'REPLICATION': 'rolreplication'
+    }
+    MYSQL_PRIVILEGE_COLUMNS = {
+        'ALL PRIVILEGES': 'Super_priv',
+        'CREATE': 'Create_priv',
+        'ALTER': 'Alter_priv',
+        'DROP': 'Drop_priv',
+        'INSERT': 'Insert_priv',
+        'SELECT': 'Select_priv',
+        'UPDATE': 'Update_priv',
+        'DELETE': 'Delete_priv'
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.connection = None
+        self.db_type = None
+        self.rows = []  # (display name, can login, superuser, other privileges, account key)
+        self.last_key = None  # Sort key of the last row loaded; the next page starts after it
+        self.name_filter = ""
+        self.privilege_filter = None
+        self.sort_column = 0
+        self.sort_order = Qt.AscendingOrder
+        self.exhausted = True
+        self.last_error = None
+
+    def set_connection(self, connection, db_type):
+        self.connection = connection
+        self.db_type = db_type
+        self.refresh()
+
+    def set_filters(self, name_filter="", privilege_filter=None):
+        self.name_filter = name_filter
+        self.privilege_filter = privilege_filter
+        self.refresh()
+
+    def refresh(self):
+        """Drop all cached rows and load the first page again"""
+        self.beginResetModel()
+        self.rows = []
+        self.last_key = None
+        self.exhausted = self.connection is None
+        self.last_error = None
+        self.endResetModel()
+
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def clear(self):
+        self.connection = None
+        self.db_type = None
+        self.refresh()
+
+    def account(self, row):
+        """Return the account key for a row: role name (PostgreSQL) or (user, host) (MySQL)"""
+        if 0 <= row < len(self.rows):
+            return self.rows[row][4]
+        return None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        value = self.rows[index.row()][index.column()]
+        if isinstance(value, bool):
+            return "Yes" if value else "No"
+        return value or ""
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return section + 1
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent):
+        if parent.isValid() or self.exhausted:
+            return
+
+        try:
+            page, last_key = self.fetch_page(self.last_key, self.PAGE_SIZE)
+        except Exception as e:
+            # Exceptions must not escape a Qt virtual; keep them and report them through the signal
+            self.last_error = e
+            self.exhausted = True
+            try:
+                self.connection.rollback()
+            except Exception:
+                pass
+            self.fetch_failed.emit(e)
+            return
+
+        if len(page) < self.PAGE_SIZE:
+            self.exhausted = True
+
+        if page:
+            self.last_key = last_key
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+            self.rows.extend(page)
+            self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sort_column = column
+        self.sort_order = order
+        self.refresh()
+
+    def fetch_page(self, after, limit):
+        """Run one filtered and sorted query for the rows following the sort key ``after``
+
+        Pages are read by keyset rather than OFFSET, so each page costs the
+        same however far the user has scrolled. Returns the rows and the
+        sort key of the last one.
+        """
+        descending = self.sort_order == Qt.DescendingOrder
+        direction = "DESC" if descending else "ASC"
+
+        if self.db_type == "PostgreSQL":
+            columns = ["rolname", "rolcanlogin", "rolsuper", "other"]
+            sort_keys = ["rolname", "rolcanlogin", "rolsuper", "other"]
+            unique_keys = ["rolname"]
+            conditions = ["rolname !~ '^pg_'"]
+            params = []
+            if self.name_filter:
+                conditions.append("rolname ILIKE %s")
+                params.append(f"%{self.name_filter}%")
+            if self.privilege_filter in self.PG_PRIVILEGE_COLUMNS:
+                conditions.append(self.PG_PRIVILEGE_COLUMNS[self.privilege_filter])
+
+            source = f"""
+                SELECT rolname, rolcanlogin, rolsuper,
+                       concat_ws(', ',
+                                 CASE WHEN rolcreatedb THEN 'CREATEDB' END,
+                                 CASE WHEN rolcreaterole THEN 'CREATEROLE' END,
+                                 CASE WHEN rolreplication THEN 'REPLICATION' END) AS other
+                FROM pg_roles
+                WHERE {' AND '.join(conditions)}
+            """
+        else:
+            columns = ["user", "host", "account", "Super_priv", "other"]
+            sort_keys = ["account", "account", "Super_priv", "other"]
+            unique_keys = ["user", "host"]
+            conditions = ["1 = 1"]
+            params = []
+            if self.name_filter:
+                conditions.append("CONCAT(user, '@', host) LIKE %s")
+                params.append(f"%{self.name_filter}%")
+            if self.privilege_filter in self.MYSQL_PRIVILEGE_COLUMNS:
+                conditions.append(f"{self.MYSQL_PRIVILEGE_COLUMNS[self.privilege_filter]} = 'Y'")
+
+            other_columns = ", ".join(
+                f"IF({column} = 'Y', '{priv}', NULL)"
+                for priv, column in self.MYSQL_PRIVILEGE_COLUMNS.items()
+                if priv != 'ALL PRIVILEGES'
+            )
+            source = f"""
+                SELECT user, host, CONCAT(user, '@', host) AS account, Super_priv,
+                       CONCAT_WS(', ', {other_columns}) AS other
+                FROM mysql.user
+                WHERE {' AND '.join(conditions)}
+            """
+
+        # The unique columns break ties, so the key of the last row marks exactly where a page ended
+        order = [sort_keys[self.sort_column]] + [key for key in unique_keys if key != sort_keys[self.sort_column]]
+        keyset = ""
+        if after is not None:
+            keyset = f"WHERE ({', '.join(order)}) {'<' if descending else '>'} ({', '.join(['%s'] * len(order))})"
+            params.extend(after)
+        query = f"""
+            SELECT {', '.join(columns)} FROM ({source}) AS accounts
+            {keyset}
+            ORDER BY {', '.join(f"{key} {direction}" for key in order)}
+            LIMIT %s
+        """
+        params.append(limit)
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        last_key = tuple(rows[-1][columns.index(key)] for key in order) if rows else after
+        if self.db_type == "PostgreSQL":
+            return [(r[0], r[1], r[2], r[3], r[0]) for r in rows], last_key
+        return [(r[2], True, r[3] == 'Y', r[4], (r[0], r[1])) for r in rows], last_key
+
+def quote_pg_identifier(name):
+    """Quote a PostgreSQL identifier (role, schema, table)"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+def quote_mysql_string(value):
+    """Quote a MySQL string literal"""
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "''") + "'"
+
+def quote_mysql_identifier(name):
+    """Quote a MySQL identifier (schema, table, column)"""
+    return "`" + str(name).replace("`", "``") + "`"
+
+def quote_mysql_account(user, host):
+    return f"{quote_mysql_string(user)}@{quote_mysql_string(host)}"
+
+def account_label(account):
+    """Display name for an account key: role name or (user, host)"""
+    if isinstance(account, tuple):
+        return f"{account[0]}@{account[1]}"
+    return account
+
+class PrivilegeDiffPlanner:
+    """Work out the minimal privilege changes that bring accounts to a target set
+
+    PostgreSQL role attributes are managed as a whole. For MySQL only the
+    global privileges offered in the UI are touched, except when moving to
+    or away from ALL PRIVILEGES; database/table level grants are left alone.
+    """
+
+    PG_ATTRIBUTES = ['LOGIN', 'SUPERUSER', 'CREATEDB', 'CREATEROLE', 'REPLICATION']
+
+    # Global privilege -> mysql.user column, i.e. what ALL PRIVILEGES ON *.* sets
+    MYSQL_GLOBAL_PRIVILEGES = {
+        'SELECT': 'Select_priv',
+        'INSERT': 'Insert_priv',
+        'UPDATE': 'Update_priv',
+        'DELETE': 'Delete_priv',
+        'CREATE': 'Create_priv',
+        'DROP': 'Drop_priv',
+        'RELOAD': 'Reload_priv',
+        'SHUTDOWN': 'Shutdown_priv',
+        'PROCESS': 'Process_priv',
+        'FILE': 'File_priv',
+        'REFERENCES': 'References_priv',
+        'INDEX': 'Index_priv',
+        'ALTER': 'Alter_priv',
+        'SHOW DATABASES': 'Show_db_priv',
+        'SUPER': 'Super_priv',
+        'CREATE TEMPORARY TABLES': 'Create_tmp_table_priv',
+        'LOCK TABLES': 'Lock_tables_priv',
+        'EXECUTE': 'Execute_priv',
+        'REPLICATION SLAVE': 'Repl_slave_priv',
+        'REPLICATION CLIENT': 'Repl_client_priv',
+        'CREATE VIEW': 'Create_view_priv',
+        'SHOW VIEW': 'Show_view_priv',
+        'CREATE ROUTINE': 'Create_routine_priv',
+        'ALTER ROUTINE': 'Alter_routine_priv',
+        'CREATE USER': 'Create_user_priv',
+        'EVENT': 'Event_priv',
+        'TRIGGER': 'Trigger_priv',
+        'CREATE TABLESPACE': 'Create_tablespace_priv'
+    }
+    MYSQL_MANAGED = ['CREATE', 'ALTER', 'DROP', 'INSERT', 'SELECT', 'UPDATE', 'DELETE']
+
+    def __init__(self, db_type):
+        self.db_type = db_type
+
+    def read_current(self, connection, accounts):
+        """Return {account: set of privileges currently held} in one query"""
+        current = {account: set() for account in accounts}
+        if not accounts:
+            return current
+
+        with connection.cursor() as cursor:
+            if self.db_type == "PostgreSQL":
+                cursor.execute("""
+                    SELECT rolname, rolcanlogin, rolsuper, rolcreatedb, rolcreaterole, rolreplication
+                    FROM pg_roles
+                    WHERE rolname = ANY(%s)
+                """, (list(accounts),))
+                for row in cursor.fetchall():
+                    current[row[0]] = {attr for attr, held in zip(self.PG_ATTRIBUTES, row[1:]) if held}
+            else:
+                columns = ", ".join(self.MYSQL_GLOBAL_PRIVILEGES.values())
+                placeholders = ", ".join(["(%s, %s)"] * len(accounts))
+                params = [value for account in accounts for value in account]
+                cursor.execute(
+                    f"SELECT user, host, {columns} FROM mysql.user WHERE (user, host) IN ({placeholders})",
+                    params
+                )
+                for row in cursor.fetchall():
+                    current[(row[0], row[1])] = {
+                        priv for priv, flag in zip(self.MYSQL_GLOBAL_PRIVILEGES, row[2:]) if flag == 'Y'
+                    }
+
+        if self.db_type == "PostgreSQL":
+            # Don't sit idle in a transaction while the plan is reviewed
+            connection.rollback()
+        return current
+
+    def diff(self, held, desired):
+        """Return (grant, revoke) lists for one account"""
+        desired = set(desired)
+
+        if self.db_type == "PostgreSQL":
+            grant = [attr for attr in self.PG_ATTRIBUTES if attr in desired and attr not in held]
+            revoke = [attr for attr in self.PG_ATTRIBUTES if attr not in desired and attr in held]
+            return grant, revoke
+
+        everything = set(self.MYSQL_GLOBAL_PRIVILEGES)
+        if 'ALL PRIVILEGES' in desired:
+            return (['ALL PRIVILEGES'] if not everything <= held else []), []
+
+        wanted = [priv for priv in self.MYSQL_MANAGED if priv in desired]
+        grant = [priv for priv in wanted if priv not in held]
+        if everything <= held:
+            # Stepping down from ALL PRIVILEGES: revoke everything not wanted
+            revoke = [priv for priv in self.MYSQL_GLOBAL_PRIVILEGES if priv not in wanted]
+        else:
+            revoke = [priv for priv in self.MYSQL_MANAGED if priv in held and priv not in wanted]
+        return grant, revoke
+
+    def statements(self, account, grant, revoke):
+        """Statements for one account; MySQL ones are regrouped by plan()"""
+        if self.db_type == "PostgreSQL":
+            if not grant and not revoke:
+                return []
+            clauses = grant + ["NO" + attr for attr in revoke]
+            return [f"ALTER ROLE {quote_pg_identifier(account)} WITH {' '.join(clauses)}"]
+
+        target = quote_mysql_account(*account)
+        statements = []
+        if grant:
+            statements.append(f"GRANT {', '.join(grant)} ON *.* TO {target}")
+        if revoke:
+            statements.append(f"REVOKE {', '.join(revoke)} ON *.* FROM {target}")
+        return statements
+
+class BulkUserOperation:
+    """Compile a modify/delete over many accounts into batched statements
+
+    PostgreSQL runs every batch inside a single transaction, so any failure
+    rolls the whole operation back. MySQL account statements commit
+    implicitly, so accounts needing the same change share one multi-account
+    GRANT/REVOKE/DROP statement, which MySQL 8.0 applies atomically.
+
+    Modify only issues the delta worked out by PrivilegeDiffPlanner; call
+    plan() first to review it.
+    """
+
+    BATCH_SIZE = 100
+
+    def __init__(self, db_type, operation, accounts, privileges=()):
+        self.db_type = db_type
+        self.operation = operation  # "modify" or "delete"
+        self.accounts = list(accounts)
+        self.privileges = list(privileges)
+        self.batches = None
+        self.account_statements = {}
+        self.unchanged = []
+
+    def plan(self, connection):
+        """Work out the statements to run and return them as (accounts, statements) batches"""
+        self.account_statements = {}
+        self.unchanged = []
+
+        if self.operation == "delete":
+            for account in self.accounts:
+                if self.db_type == "PostgreSQL":
+                    self.account_statements[account] = [f"DROP ROLE IF EXISTS {quote_pg_identifier(account)}"]
+                else:
+                    self.account_statements[account] = [f"DROP USER IF EXISTS {quote_mysql_account(*account)}"]
+            changes = {account: ("DROP",) for account in self.accounts}
+        else:
+            planner = PrivilegeDiffPlanner(self.db_type)
+            current = planner.read_current(connection, self.accounts)
+            changes = {}
+            for account in self.accounts:
+                grant, revoke = planner.diff(current[account], self.privileges)
+                if grant or revoke:
+                    self.account_statements[account] = planner.statements(account, grant, revoke)
+                    changes[account] = (tuple(grant), tuple(revoke))
+                else:
+                    self.unchanged.append(account)
+
+        changed = [account for account in self.accounts if account in changes]
+
+        if self.db_type == "PostgreSQL":
+            self.batches = []
+            for start in range(0, len(changed), self.BATCH_SIZE):
+                chunk = changed[start:start + self.BATCH_SIZE]
+                if self.operation == "delete":
+                    roles = ", ".join(quote_pg_identifier(account) for account in chunk)
+                    statements = [f"DROP ROLE IF EXISTS {roles}"]
+                else:
+                    statements = [stmt for account in chunk for stmt in self.account_statements[account]]
+                self.batches.append((chunk, statements))
+            return self.batches
+
+        # MySQL: one multi-account statement per distinct change
+        groups = {}
+        for account in changed:
+            groups.setdefault(changes[account], []).append(account)
+
+        accounts_in_plan = []
+        statements = []
+        for change, accounts in groups.items():
+            targets = ", ".join(quote_mysql_account(*account) for account in accounts)
+            if change == ("DROP",):
+                statements.append(f"DROP USER IF EXISTS {targets}")
+            else:
+                grant, revoke = change
+                if grant:
+                    statements.append(f"GRANT {', '.join(grant)} ON *.* TO {targets}")
+                if revoke:
+                    statements.append(f"REVOKE {', '.join(revoke)} ON *.* FROM {targets}")
+            accounts_in_plan.extend(accounts)
+
+        self.batches = [(accounts_in_plan, statements)] if statements else []
+        return self.batches
+
+    def plan_text(self):
+        lines = [stmt for _, statements in self.batches or [] for stmt in statements]
+        if self.unchanged:
+            lines.append("")
+            lines.append("-- Unchanged: " + ", ".join(account_label(account) for account in self.unchanged))
+        return "\n".join(lines)
+
+    def statement_count(self):
+        return sum(len(statements) for _, statements in self.batches or [])
+
+    def apply(self, connection):
+        """Execute the planned batches and return a list of (account, ok, message)"""
+        if self.batches is None:
+            self.plan(connection)
+        batches = self.batches
+
+        try:
+            with connection.cursor() as cursor:
+                for _, statements in batches:
+                    if statements:
+                        # One round-trip per batch: psycopg2 accepts several
+                        # statements in one execute, pymysql needs them split
+                        if self.db_type == "PostgreSQL":
+                            cursor.execute(";\n".join(statements))
+                        else:
+                            for statement in statements:
+                                cursor.execute(statement)
+            connection.commit()
+        except Exception as e:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+            return self.failure_results(connection, batches, e)
+
+        return [
+            (account_label(account), True, "Unchanged" if account in self.unchanged else "OK")
+            for account in self.accounts
+        ]
+
+    def failure_results(self, connection, batches, error):
+        """Report which accounts failed after the operation has been rolled back"""
+        failed = {}
+
+        if self.db_type == "PostgreSQL":
+            # Replay per account behind savepoints to pinpoint the culprits,
+            # then discard the replay as well
+            try:
+                with connection.cursor() as cursor:
+                    for accounts, _ in batches:
+                        for account in accounts:
+                            cursor.execute("SAVEPOINT bulk_user_op")
+                            try:
+                                for statement in self.account_statements[account]:
+                                    cursor.execute(statement)
+                            except Exception as account_error:
+                                failed[account] = str(account_error).strip()
+                                cursor.execute("ROLLBACK TO SAVEPOINT bulk_user_op")
+                            else:
+                                cursor.execute("RELEASE SAVEPOINT bulk_user_op")
+            except Exception:
+                pass
+            finally:
+                try:
+                    connection.rollback()
+                except Exception:
+                    pass
+        else:
+            # The batch is reported as failed as a whole; note an earlier
+            # statement in it (e.g. a GRANT before a failing REVOKE) may
+            # already have committed
+            for accounts, _ in batches:
+                for account in accounts:
+                    failed[account] = str(error).strip()
+
+        results = []
+        for account in self.accounts:
+            if account in self.unchanged:
+                results.append((account_label(account), True, "Unchanged"))
+                continue
+            message = failed.get(account, "Rolled back")
+            results.append((account_label(account), False, message))
+
+        if not failed:
+            # The replay did not reproduce the error; attribute it to everyone
+            results = [
+                (label, ok, message if ok else str(error).strip())
+                for label, ok, message in results
+            ]
+        return results
+
+def split_manifest_list(value):
+    """Manifest list fields may be a YAML list or a ';'/',' separated string"""
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        items = value
+    else:
+        items = str(value).replace(",", ";").split(";")
+    return [str(item).strip() for item in items if str(item).strip()]
+
+def read_user_manifest(path):
+    """Load user entries from a CSV or YAML manifest
+
+    CSV columns / YAML keys: username, password, host (MySQL, default '%'),
+    privileges and roles (lists, or ';' separated in CSV).
+    """
+    if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+        if yaml is None:
+            raise Exception("PyYAML is required to read YAML manifests (pip install pyyaml)")
+        with open(path, 'r') as f:
+            data = yaml.safe_load(f) or []
+        rows = data.get('users', []) if isinstance(data, dict) else data
+    else:
+        with open(path, 'r', newline='') as f:
+            rows = list(csv.DictReader(f))
+
+    entries = []
+    seen = set()
+    for number, row in enumerate(rows, 1):
+        username = str(row.get('username') or '').strip()
+        if not username:
+            raise ValueError(f"Manifest entry {number}: missing username")
+        host = str(row.get('host') or '%').strip()
+        if (username, host) in seen:
+            raise ValueError(f"Manifest entry {number}: duplicate user {username}@{host}")
+        seen.add((username, host))
+
+        password = row.get('password')
+        entries.append({
+            'username': username,
+            'host': host,
+            'password': str(password) if password not in (None, '') else None,
+            'privileges': [priv.upper() for priv in split_manifest_list(row.get('privileges'))],
+            'roles': split_manifest_list(row.get('roles'))
+        })
+    return entries
+
+class UserProvisioner:
+    """Provision manifest users in batches over several concurrent connections
+
+    Existing accounts are looked up once up front and then skipped or
+    updated. Every batch is compiled into as few statements as possible (a
+    single multi-statement execute on PostgreSQL, multi-account statements on
+    MySQL) and committed once; a failing batch is retried entry by entry so
+    the report names the offending users.
+    """
+
+    BATCH_SIZE = 200
+
+    def __init__(self, db_type, connect, valid_privileges, workers=4, update_existing=False, dry_run=False):
+        self.db_type = db_type
+        self.connect = connect
+        self.valid_privileges = set(valid_privileges)
+        self.workers = max(1, workers)
+        self.update_existing = update_existing
+        self.dry_run = dry_run
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def account(self, entry):
+        if self.db_type == "PostgreSQL":
+            return entry['username']
+        return (entry['username'], entry['host'])
+
+    def worker_connection(self):
+        """One connection per worker thread, reused across its batches"""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.connect()
+            self.local.connection = connection
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def existing_accounts(self, connection):
+        with connection.cursor() as cursor:
+            if self.db_type == "PostgreSQL":
+                cursor.execute("SELECT rolname FROM pg_roles")
+                existing = {row[0] for row in cursor.fetchall()}
+                connection.rollback()
+            else:
+                cursor.execute("SELECT user, host FROM mysql.user")
+                existing = {(row[0], row[1]) for row in cursor.fetchall()}
+        return existing
+
+    def plan(self, connection, entries):
+        """Return [(entry, action)] with action 'create', 'update' or 'skip'"""
+        for entry in entries:
+            invalid = [priv for priv in entry['privileges'] if priv not in self.valid_privileges]
+            if invalid:
+                raise ValueError(f"User {account_label(self.account(entry))}: unsupported privileges {', '.join(invalid)}")
+
+        existing = self.existing_accounts(connection)
+        plan = []
+        for entry in entries:
+            if self.account(entry) not in existing:
+                plan.append((entry, 'create'))
+            elif self.update_existing:
+                plan.append((entry, 'update'))
+            else:
+                plan.append((entry, 'skip'))
+        return plan
+
+    def compile_batch(self, items):
+        """Compile [(entry, action)] into [(sql, params)]
+
+        Identifiers are %-escaped because every statement is executed with a
+        parameter tuple (passwords are always bound, never inlined).
+        """
+        statements = []
+        items = [(entry, action) for entry, action in items if action != 'skip']
+
+        if self.db_type == "PostgreSQL":
+            for entry, action in items:
+                role = quote_pg_identifier(entry['username']).replace('%', '%%')
+                attributes = " ".join(entry['privileges'])
+                if action == 'create':
+                    sql = f"CREATE USER {role}"
+                    params = ()
+                    if entry['password']:
+                        sql += " WITH PASSWORD %s"
+                        params = (entry['password'],)
+                    if attributes:
+                        sql += (" " if entry['password'] else " WITH ") + attributes
+                    statements.append((sql, params))
+                elif entry['password'] or attributes:
+                    sql = f"ALTER ROLE {role} WITH"
+                    params = ()
+                    if attributes:
+                        sql += " " + attributes
+                    if entry['password']:
+                        sql += " PASSWORD %s"
+                        params = (entry['password'],)
+                    statements.append((sql, params))
+                for member_of in entry['roles']:
+                    statements.append((f"GRANT {quote_pg_identifier(member_of).replace('%', '%%')} TO {role}", ()))
+            return statements
+
+        def target(entry):
+            return quote_mysql_account(entry['username'], entry['host']).replace('%', '%%')
+
+        creates = [entry for entry, action in items if action == 'create']
+        if creates:
+            specs = []
+            params = []
+            for entry in creates:
+                if entry['password']:
+                    specs.append(f"{target(entry)} IDENTIFIED BY %s")
+                    params.append(entry['password'])
+                else:
+                    specs.append(target(entry))
+            statements.append((f"CREATE USER IF NOT EXISTS {', '.join(specs)}", tuple(params)))
+
+        password_updates = [entry for entry, action in items if action == 'update' and entry['password']]
+        if password_updates:
+            specs = ", ".join(f"{target(entry)} IDENTIFIED BY %s" for entry in password_updates)
+            statements.append((f"ALTER USER {specs}", tuple(entry['password'] for entry in password_updates)))
+
+        # Accounts that need the same privileges/roles share one GRANT
+        privilege_groups = {}
+        role_groups = {}
+        for entry, _ in items:
+            if entry['privileges']:
+                privilege_groups.setdefault(tuple(sorted(entry['privileges'])), []).append(target(entry))
+            if entry['roles']:
+                role_groups.setdefault(tuple(sorted(entry['roles'])), []).append(target(entry))
+        for privileges, targets in privilege_groups.items():
+            statements.append((f"GRANT {', '.join(privileges)} ON *.* TO {', '.join(targets)}", ()))
+        for roles, targets in role_groups.items():
+            granted = ", ".join(quote_mysql_string(role).replace('%', '%%') for role in roles)
+            statements.append((f"GRANT {granted} TO {', '.join(targets)}", ()))
+        return statements
+
+    def execute(self, connection, statements):
+        if not statements:
+            return
+        with connection.cursor() as cursor:
+            if self.db_type == "PostgreSQL":
+                # Whole batch in one round-trip
+                statements = [(
+                    ";\n".join(sql for sql, _ in statements),
+                    tuple(value for _, params in statements for value in params)
+                )]
+            for sql, params in statements:
+                if params:
+                    cursor.execute(sql, params)
+                else:
+                    cursor.execute(sql % ())
+        connection.commit()
+
+    def run_batch(self, items):
+        """Provision one batch on this worker's connection; returns result rows"""
+        connection = self.worker_connection()
+        try:
+            self.execute(connection, self.compile_batch(items))
+            return [(account_label(self.account(entry)), action, True, "") for entry, action in items]
+        except Exception:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+
+        # Retry one by one to find the failing entries
+        results = []
+        for entry, action in items:
+            try:
+                self.execute(connection, self.compile_batch([(entry, action)]))
+                results.append((account_label(self.account(entry)), action, True, ""))
+            except Exception as e:
+                try:
+                    connection.rollback()
+                except Exception:
+                    pass
+                results.append((account_label(self.account(entry)), action, False, str(e).strip()))
+        return results
+
+    def run(self, connection, entries, progress=None):
+        """Provision all entries and return a report dict
+
+        ``connection`` is only used for the up-front lookup of existing users;
+        ``progress(done, total, elapsed)`` is called from the calling thread.
+        """
+        started = time.time()
+        plan = self.plan(connection, entries)
+        report = {
+            'plan': plan,
+            'results': [],
+            'batches': 0,
+            'elapsed': 0.0,
+            'statements': [],
+            'dry_run': self.dry_run
+        }
+
+        work = [item for item in plan if item[1] != 'skip']
+        batches = [work[i:i + self.BATCH_SIZE] for i in range(0, len(work), self.BATCH_SIZE)]
+        report['batches'] = len(batches)
+
+        if self.dry_run:
+            for batch in batches:
+                report['statements'].extend(sql % tuple('***' for _ in params) for sql, params in self.compile_batch(batch))
+            report['elapsed'] = time.time() - started
+            return report
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(self.run_batch, batch) for batch in batches]
+                for future in as_completed(futures):
+                    report['results'].extend(future.result())
+                    if progress:
+                        progress(len(report['results']), len(work), time.time() - started)
+        finally:
+            for worker_connection in self.connections:
+                try:
+                    worker_connection.close()
+                except Exception:
+                    pass
+            self.connections = []
+
+        report['elapsed'] = time.time() - started
+        return report
+
+class RoleGraph:
+    """In-memory snapshot of PostgreSQL roles, memberships and default ACLs
+
+    Loaded with a single catalog query; lookups such as effective_privileges()
+    are answered from memory. After changing some roles, refresh_roles()
+    re-reads just those roles and their edges.
+    """
+
+    SNAPSHOT_QUERY = """
+        WITH wanted AS (
+            SELECT oid FROM pg_roles WHERE %(all)s OR rolname = ANY(%(names)s)
+        )
+        SELECT
+            (SELECT json_agg(row_to_json(r)) FROM pg_roles r
+             WHERE r.oid IN (SELECT oid FROM wanted)),
+            (SELECT json_agg(row_to_json(m)) FROM pg_auth_members m
+             WHERE %(all)s OR m.roleid IN (SELECT oid FROM wanted) OR m.member IN (SELECT oid FROM wanted)),
+            (SELECT json_agg(json_build_object(
+                        'role', d.defaclrole, 'schema', n.nspname,
+                        'type', d.defaclobjtype, 'acl', d.defaclacl::text[]))
+             FROM pg_default_acl d LEFT JOIN pg_namespace n ON n.oid = d.defaclnamespace
+             WHERE d.defaclrole IN (SELECT oid FROM wanted))
+    """
+
+    ATTRIBUTES = [
+        ('rolsuper', 'SUPERUSER'),
+        ('rolcanlogin', 'LOGIN'),
+        ('rolcreatedb', 'CREATEDB'),
+        ('rolcreaterole', 'CREATEROLE'),
+        ('rolreplication', 'REPLICATION'),
+        ('rolbypassrls', 'BYPASSRLS')
+    ]
+
+    ACL_PRIVILEGES = {
+        'r': 'SELECT', 'a': 'INSERT', 'w': 'UPDATE', 'd': 'DELETE', 'D': 'TRUNCATE',
+        'x': 'REFERENCES', 't': 'TRIGGER', 'X': 'EXECUTE', 'U': 'USAGE', 'C': 'CREATE',
+        'c': 'CONNECT', 'T': 'TEMPORARY', 'm': 'MAINTAIN'
+    }
+    OBJECT_TYPES = {'r': 'tables', 'S': 'sequences', 'f': 'functions', 'T': 'types', 'n': 'schemas'}
+
+    def __init__(self):
+        self.roles = {}         # oid -> pg_roles row (dict)
+        self.oids = {}          # role name -> oid
+        self.member_of = {}     # member oid -> {role oid: edge}
+        self.members = {}       # role oid -> {member oid: edge}
+        self.default_acls = {}  # owner oid -> [(schema, object type, [aclitem text])]
+        self.closures = {}      # (oid, inherited_only) -> memoized closure
+        self.loaded_at = None
+
+    def load(self, connection):
+        """Replace the whole graph with a fresh snapshot"""
+        roles, memberships, default_acls = self.fetch(connection, None)
+        self.roles = {}
+        self.oids = {}
+        self.member_of = {}
+        self.members = {}
+        self.default_acls = {}
+        self.merge(roles, memberships, default_acls)
+        self.loaded_at = datetime.datetime.now()
+
+    def refresh_roles(self, connection, names):
+        """Re-read only the given roles and the edges touching them"""
+        names = [name for name in names if name]
+        if not names or self.loaded_at is None:
+            return
+
+        stale = {self.oids[name] for name in names if name in self.oids}
+        roles, memberships, default_acls = self.fetch(connection, names)
+        stale |= {row['oid'] for row in roles}
+
+        # Forget everything about these roles, then merge the fresh rows
+        for oid in stale:
+            row = self.roles.pop(oid, None)
+            if row:
+                self.oids.pop(row['rolname'], None)
+            self.default_acls.pop(oid, None)
+            for role_oid in self.member_of.pop(oid, {}):
+                self.members.get(role_oid, {}).pop(oid, None)
+            for member_oid in self.members.pop(oid, {}):
+                self.member_of.get(member_oid, {}).pop(oid, None)
+
+        self.merge(roles, memberships, default_acls)
+
+    def fetch(self, connection, names):
+        with connection.cursor() as cursor:
+            cursor.execute(self.SNAPSHOT_QUERY, {'all': names is None, 'names': names or []})
+            roles, memberships, default_acls = cursor.fetchone()
+        connection.rollback()
+        return roles or [], memberships or [], default_acls or []
+
+    def merge(self, roles, memberships, default_acls):
+        for row in roles:
+            self.roles[row['oid']] = row
+            self.oids[row['rolname']] = row['oid']
+
+        for row in memberships:
+            if row['member'] not in self.roles or row['roleid'] not in self.roles:
+                continue
+            # PostgreSQL 16 stores inheritance per grant; older versions use the member's rolinherit
+            inherit = row.get('inherit_option')
+            if inherit is None:
+                inherit = self.roles[row['member']].get('rolinherit', True)
+            edge = {'admin': row.get('admin_option', False), 'inherit': inherit}
+            self.member_of.setdefault(row['member'], {})[row['roleid']] = edge
+            self.members.setdefault(row['roleid'], {})[row['member']] = edge
+
+        for row in default_acls:
+            self.default_acls.setdefault(row['role'], []).append((row['schema'], row['type'], row['acl'] or []))
+
+        self.closures = {}
+
+    def role_names(self):
+        return sorted(self.oids)
+
+    def granted_roles(self, name, inherited_only=False):
+        """Roles reachable from ``name`` through memberships (cycle-safe)"""
+        oid = self.oids.get(name)
+        if oid is None:
+            return set()
+
+        key = (oid, inherited_only)
+        if key not in self.closures:
+            seen = set()
+            stack = [oid]
+            while stack:
+                current = stack.pop()
+                for role_oid, edge in self.member_of.get(current, {}).items():
+                    if inherited_only and not edge['inherit']:
+                        continue
+                    if role_oid not in seen and role_oid != oid:
+                        seen.add(role_oid)
+                        stack.append(role_oid)
+            self.closures[key] = seen
+        return {self.roles[role_oid]['rolname'] for role_oid in self.closures[key]}
+
+    def attributes(self, name):
+        row = self.roles.get(self.oids.get(name), {})
+        return [label for column, label in self.ATTRIBUTES if row.get(column)]
+
+    def direct_memberships(self, name):
+        oid = self.oids.get(name)
+        return sorted(
+            (self.roles[role_oid]['rolname'], edge)
+            for role_oid, edge in self.member_of.get(oid, {}).items()
+        )
+
+    def direct_members(self, name):
+        oid = self.oids.get(name)
+        return sorted(
+            (self.roles[member_oid]['rolname'], edge)
+            for member_oid, edge in self.members.get(oid, {}).items()
+        )
+
+    def parse_acl_item(self, item):
+        """Split 'grantee=privs/grantor' into (grantee, [privileges])"""
+        grantee, _, rest = item.partition('=')
+        letters = rest.split('/')[0]
+        privileges = [self.ACL_PRIVILEGES.get(letter, letter) for letter in letters if letter != '*']
+        return grantee or 'PUBLIC', privileges
+
+    def effective_privileges(self, name):
+        """What ``name`` can do directly, by inheritance and via SET ROLE"""
+        inherited = self.granted_roles(name, inherited_only=True)
+        reachable = self.granted_roles(name)
+        grantees = inherited | {name, 'PUBLIC'}
+
+        via_set_role = {}
+        for role in reachable:
+            for attribute in self.attributes(role):
+                if attribute != 'LOGIN':
+                    via_set_role.setdefault(attribute, set()).add(role)
+
+        default_privileges = []
+        for owner_oid, entries in self.default_acls.items():
+            owner = self.roles[owner_oid]['rolname']
+            for schema, object_type, acl in entries:
+                for item in acl:
+                    grantee, privileges = self.parse_acl_item(item)
+                    if grantee in grantees:
+                        default_privileges.append((
+                            owner, schema or '(all schemas)',
+                            self.OBJECT_TYPES.get(object_type, object_type),
+                            grantee, privileges
+                        ))
+
+        return {
+            'attributes': self.attributes(name),
+            'inherited_roles': sorted(inherited),
+            'set_role_only': sorted(reachable - inherited),
+            'attributes_via_set_role': {attr: sorted(roles) for attr, roles in via_set_role.items()},
+            'default_privileges': sorted(default_privileges)
+        }
+
+class ToolRegistry:
+    """Installed PostgreSQL/MySQL client binaries and their versions
+
+    Discovery only lists directories; ``--version`` is run once per binary and
+    cached on disk keyed by path, mtime and size, so a warm start spawns no
+    processes.
+    """
+
+    CACHE_FILE = 'db_backup_tools.json'
+    PG_TOOLS = ['pg_dump', 'pg_restore', 'psql', 'pg_receivewal', 'pg_ctl', 'pg_basebackup']
+    MYSQL_TOOLS = ['mysqldump', 'mysql', 'mysqlbinlog']
+
+    def __init__(self, cache_file=CACHE_FILE):
+        self.cache_file = cache_file
+        self.cache = {}
+        self.tools = {}  # tool name -> [{'path', 'version'}]
+        self.cache_dirty = False
+
+    @staticmethod
+    def executable(name):
+        return f"{name}.exe" if platform.system() == "Windows" else name
+
+    def candidate_dirs(self):
+        """Directories that may hold client tools, without spawning anything"""
+        patterns = []
+        if platform.system() == 'Windows':
+            for root in {os.path.expandvars(r"%PROGRAMFILES%"), os.path.expandvars(r"%PROGRAMFILES(x86)%"),
+                         r"C:\Program Files"}:
+                patterns += [
+                    os.path.join(root, "PostgreSQL", "*", "bin"),
+                    os.path.join(root, "PostgreSQL", "bin"),
+                    os.path.join(root, "MySQL", "MySQL Server *", "bin"),
+                    os.path.join(root, "MySQL", "bin")
+                ]
+            for drive in ["C:", "D:", "E:"]:
+                patterns += [rf"{drive}\PostgreSQL\bin", rf"{drive}\MySQL\bin"]
+        else:
+            patterns += [
+                "/usr/lib/postgresql/*/bin",
+                "/usr/pgsql-*/bin",
+                "/usr/local/pgsql/bin",
+                "/opt/homebrew/opt/postgresql@*/bin",
+                "/usr/local/opt/postgresql@*/bin",
+                "/Applications/Postgres.app/Contents/Versions/*/bin",
+                "/usr/local/mysql/bin",
+                "/opt/homebrew/opt/mysql*/bin",
+                "/usr/local/opt/mysql*/bin"
+            ]
+
+        dirs = []
+        for pattern in patterns:
+            dirs.extend(sorted(glob.glob(pattern)))
+        for path in os.environ.get('PATH', '').split(os.pathsep):
+            path = path.strip().strip('"')
+            if path:
+                dirs.append(path)
+
+        unique = []
+        seen = set()
+        for path in dirs:
+            key = os.path.normcase(os.path.realpath(path))
+            if key not in seen and os.path.isdir(path):
+                seen.add(key)
+                unique.append(path)
+        return unique
+
+    def load_cache(self):
+        try:
+            with open(self.cache_file, 'r') as f:
+                self.cache = json.load(f).get('entries', {})
+        except (OSError, ValueError):
+            self.cache = {}
+
+    def save_cache(self):
+        if not self.cache_dirty:
+            return
+        try:
+            with open(self.cache_file, 'w') as f:
+                json.dump({'entries': self.cache}, f, indent=1)
+            self.cache_dirty = False
+        except OSError as e:
+            print(f"Error saving tool cache: {e}")
+
+    def version_of(self, path):
+        """Version tuple of a binary, from the cache when the file is unchanged"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        entry = self.cache.get(path)
+        if entry and entry.get('mtime') == stat.st_mtime and entry.get('size') == stat.st_size:
+            return tuple(entry['version']) if entry.get('version') else None
+
+        try:
+            output = subprocess.run(
+                [path, "--version"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=10
+            ).stdout.decode(errors='replace')
+        except Exception:
+            output = ""
+        version = self.parse_version(output)
+
+        self.cache[path] = {
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'version': list(version) if version else None,
+            'output': output.strip()
+        }
+        self.cache_dirty = True
+        return version
+
+    @staticmethod
+    def parse_version(output):
+        # "mysqldump  Ver 10.13 Distrib 5.7.44" reports the server version after Distrib
+        match = re.search(r"Distrib\s+(\d+)\.(\d+)(?:\.(\d+))?", output)
+        if not match:
+            match = re.search(r"(\d+)\.(\d+)(?:\.(\d+))?", output)
+        if not match:
+            return None
+        return tuple(int(part) for part in match.groups() if part is not None)
+
+    def discover(self):
+        """Find every installed client binary and record its version"""
+        self.load_cache()
+        self.tools = {name: [] for name in self.PG_TOOLS + self.MYSQL_TOOLS}
+        seen = set()
+
+        for directory in self.candidate_dirs():
+            for name in self.tools:
+                path = os.path.join(directory, self.executable(name))
+                if not os.path.isfile(path):
+                    continue
+                real = os.path.normcase(os.path.realpath(path))
+                if real in seen:
+                    continue
+                seen.add(real)
+                self.tools[name].append({'path': path, 'version': self.version_of(path)})
+
+        # Drop cache entries for binaries that no longer exist
+        for path in list(self.cache):
+            if not os.path.exists(path):
+                del self.cache[path]
+                self.cache_dirty = True
+        self.save_cache()
+
+    def version_key(self, name, version):
+        """Part of a version that has to match the server"""
+        if not version:
+            return None
+        if name in self.PG_TOOLS:
+            # PostgreSQL 10+ majors are one number, 9.x majors are two
+            return version[:1] if version[0] >= 10 else version[:2]
+        return version[:2]
+
+    def best(self, name, server_version=None):
+        """Pick the binary whose version suits the server
+
+        Prefers the same major version, then the closest newer one (dump
+        tools refuse to dump newer servers), then the newest available.
+        """
+        entries = [entry for entry in self.tools.get(name, []) if os.path.exists(entry['path'])]
+        if not entries:
+            return None
+
+        newest = max(entries, key=lambda entry: entry['version'] or ())
+        target = self.version_key(name, server_version)
+        if target is None:
+            return newest['path']
+
+        keyed = [(self.version_key(name, entry['version']), entry) for entry in entries if entry['version']]
+        exact = [entry for key, entry in keyed if key == target]
+        if exact:
+            return max(exact, key=lambda entry: entry['version'])['path']
+        newer = [(key, entry) for key, entry in keyed if key > target]
+        if newer:
+            return min(newer, key=lambda item: item[0])[1]['path']
+        return newest['path']
+
+    def versions(self, name):
+        return [entry['version'] for entry in self.tools.get(name, []) if entry['version']]
+
+BACKUP_EXTENSIONS = ('.sql', '.zip', '.tar.gz', '.sql.enc', '.zip.enc', '.tar.gz.enc')
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+def is_backup_name(name):
+    return name.startswith("Backup_") and name.endswith(BACKUP_EXTENSIONS)
+
+BASE_BACKUP_EXTENSIONS = ('.tar.gz', '.tar.gz.enc')
+BASE_BACKUP_START_RE = re.compile(r"(?:write-ahead|transaction) log start point: ([0-9A-F]+/[0-9A-F]+) on timeline (\d+)")
+BASE_BACKUP_END_RE = re.compile(r"(?:write-ahead|transaction) log end point: ([0-9A-F]+/[0-9A-F]+)")
+
+def is_base_backup_name(name):
+    return name.endswith(BASE_BACKUP_EXTENSIONS)
+
+def find_base_backup_position(output):
+    """Timeline and start/end LSN from pg_basebackup --verbose output, or None"""
+    start = BASE_BACKUP_START_RE.search(output)
+    if not start:
+        return None
+    end = BASE_BACKUP_END_RE.search(output)
+    return {'timeline': int(start.group(2)), 'start_lsn': start.group(1), 'end_lsn': end.group(1) if end else None}
+
+def extract_tar_stream(stream, directory):
+    """Unpack a tar read sequentially from ``stream``, refusing members that escape ``directory``"""
+    with tarfile.open(fileobj=stream, mode='r|') as archive:
+        if hasattr(tarfile, 'data_filter'):
+            archive.extractall(directory, filter='data')
+            return
+        root = os.path.realpath(directory)
+        for member in archive:
+            path = os.path.realpath(os.path.join(directory, member.name))
+            if os.path.commonpath([root, path]) != root or member.issym() or member.islnk():
+                raise ValueError(f"Unsafe path in backup archive: {member.name}")
+            archive.extract(member, directory)
+
+class CheckedReader:
+    """Read-only file wrapper calling ``check`` before each read, so a long unpack can be cancelled"""
+
+    def __init__(self, stream, check):
+        self.stream = stream
+        self.check = check
+
+    def read(self, size=-1):
+        self.check()
+        return self.stream.read(size)
+
+class ParallelGzipWriter:
+    """Gzip compression spread over threads, pigz style
+
+    Input is cut into blocks that are compressed independently (zlib releases
+    the GIL) and written in order as concatenated gzip members, which any gzip
+    reader treats as one stream.
+    """
+
+    BLOCK_SIZE = 4 * 1024 * 1024
+
+    def __init__(self, inner, workers=None, level=6):
+        self.inner = inner
+        self.level = level
+        self.workers = workers or os.cpu_count() or 2
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.pending = collections.deque()
+        self.buffer = bytearray()
+        self.bytes_in = 0
+
+    @property
+    def bytes_written(self):
+        return self.inner.bytes_written
+
+    def compress_block(self, block):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressor.compress(block) + compressor.flush()
+
+    def write(self, data):
+        self.buffer += data
+        self.bytes_in += len(data)
+        while len(self.buffer) >= self.BLOCK_SIZE:
+            self.submit(bytes(self.buffer[:self.BLOCK_SIZE]))
+            del self.buffer[:self.BLOCK_SIZE]
+
+    def submit(self, block):
+        self.pending.append(self.executor.submit(self.compress_block, block))
+        # Bound memory: write finished blocks once every worker has a couple queued
+        while len(self.pending) > self.workers * 2:
+            self.inner.write(self.pending.popleft().result())
+
+    def flush(self):
+        self.inner.flush()
+
+    def close(self):
+        if self.buffer:
+            self.submit(bytes(self.buffer))
+            self.buffer.clear()
+        while self.pending:
+            self.inner.write(self.pending.popleft().result())
+        self.executor.shutdown()
+        self.inner.close()
+
+    def abort(self):
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown()
+        self.inner.abort()
+
+class LocalFileWriter:
+    """Write a backup to ``<path>.partial`` and move it into place on close"""
+
+    def __init__(self, path):
+        self.path = path
+        self.partial_path = path + ".partial"
+        self.file = open(self.partial_path, 'wb')
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.file.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+        os.replace(self.partial_path, self.path)
+
+    def abort(self):
+        try:
+            self.file.close()
+        finally:
+            if os.path.exists(self.partial_path):
+                os.remove(self.partial_path)
+
+class LocalStorage:
+    """Backups stored as files in a local directory"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def description(self):
+        return self.directory
+
+    def prepare(self):
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+    def open_writer(self, name):
+        return LocalFileWriter(os.path.join(self.directory, name))
+
+    def open_reader(self, name):
+        return open(os.path.join(self.directory, name), 'rb')
+
+    def free_space(self):
+        return shutil.disk_usage(self.directory).free
+
+    def staging_directory(self):
+        return os.path.join(self.directory, ".staging")
+
+    def local_path(self, name):
+        return os.path.join(self.directory, name)
+
+    def location(self, name):
+        return os.path.join(self.directory, name)
+
+    def list(self):
+        """Return [(name, mtime, size)] for all backups"""
+        if not os.path.isdir(self.directory):
+            return []
+        backups = []
+        for filename in os.listdir(self.directory):
+            if is_backup_name(filename):
+                stat = os.stat(os.path.join(self.directory, filename))
+                backups.append((filename, stat.st_mtime, stat.st_size))
+        return backups
+
+    def delete(self, name):
+        os.remove(os.path.join(self.directory, name))
+
+class S3MultipartWriter:
+    """Stream a backup into an S3 multipart upload
+
+    Parts are uploaded by a thread pool while the dump is still being
+    written. S3 allows 10,000 parts per upload, so the part size doubles
+    every ``PARTS_PER_STEP`` parts. Parts in flight are capped in bytes
+    (``2 * workers`` starting parts' worth), so fewer uploads run at once
+    as parts grow; write() blocks when the uploads fall behind.
+    """
+
+    PARTS_PER_STEP = 1000
+    MAX_PART_SIZE = 5 * 1024 ** 3  # S3's limit for a single part
+
+    def __init__(self, client, bucket, key, part_size, workers):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.upload_id = client.create_multipart_upload(Bucket=bucket, Key=key)['UploadId']
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.memory_limit = part_size * workers * 2
+        self.in_flight = 0  # Bytes of parts submitted and not yet uploaded
+        self.room = threading.Condition()
+        self.buffer = bytearray()
+        self.futures = []
+        self.part_number = 0
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.bytes_written += len(data)
+        size = self.next_part_size()
+        while len(self.buffer) >= size:
+            # Hand the buffer itself to the upload; only the short tail past the part is copied
+            part, self.buffer = self.buffer, self.buffer[size:]
+            del part[size:]
+            self.submit(part)
+            size = self.next_part_size()
+        return len(data)
+
+    def next_part_size(self):
+        # 16 MB parts starting out reach about 8 TB by part 9,000, past S3's 5 TB object limit
+        return min(self.part_size << (self.part_number // self.PARTS_PER_STEP), self.MAX_PART_SIZE)
+
+    def flush(self):
+        pass
+
+    def submit(self, chunk):
+        # Fail fast if an earlier part has already failed
+        for future in self.futures:
+            if future.done() and future.exception():
+                raise future.exception()
+
+        with self.room:
+            # A part bigger than the whole allowance still goes, once nothing else is in flight
+            while self.in_flight and self.in_flight + len(chunk) > self.memory_limit:
+                self.room.wait()
+            self.in_flight += len(chunk)
+        self.part_number += 1
+        try:
+            self.futures.append(self.executor.submit(self.upload_part, self.part_number, chunk))
+        except Exception:
+            self.release(len(chunk))
+            raise
+
+    def release(self, size):
+        with self.room:
+            self.in_flight -= size
+            self.room.notify_all()
+
+    def upload_part(self, number, chunk):
+        try:
+            response = self.client.upload_part(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                PartNumber=number, Body=chunk
+            )
+            return {'PartNumber': number, 'ETag': response['ETag']}
+        finally:
+            self.release(len(chunk))
+
+    def close(self):
+        if self.buffer or self.part_number == 0:
+            part, self.buffer = self.buffer, bytearray()
+            self.submit(part)
+        try:
+            parts = [future.result() for future in self.futures]
+        except Exception:
+            self.abort()
+            raise
+        self.executor.shutdown(wait=True)
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+
+    def abort(self):
+        for future in self.futures:
+            future.cancel()
+        self.executor.shutdown(wait=True)
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+        except Exception as e:
+            print(f"Error aborting upload of {self.key}: {e}")
+
+class S3Reader:
+    """Read an S3 object as a stream, without downloading it first"""
+
+    def __init__(self, body):
+        self.body = body
+
+    def read(self, size=-1):
+        return self.body.read(None if size is None or size < 0 else size)
+
+    def close(self):
+        self.body.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class S3Storage:
+    """Backups stored in an S3-compatible bucket (AWS S3, MinIO, ...)"""
+
+    PART_SIZE = 16 * 1024 * 1024
+    WORKERS = 4
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, access_key=None, secret_key=None,
+                 region=None, part_size=PART_SIZE, workers=WORKERS):
+        if boto3 is None:
+            raise Exception("boto3 is required for S3 storage (pip install boto3)")
+        if not bucket:
+            raise ValueError("An S3 bucket name is required")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.part_size = part_size
+        self.workers = workers
+        # Credentials left blank fall back to the usual AWS environment/config lookup
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+            region_name=region or None
+        )
+
+    def description(self):
+        return f"s3://{self.bucket}/{self.prefix}"
+
+    def prepare(self):
+        self.client.head_bucket(Bucket=self.bucket)
+
+    def open_writer(self, name):
+        return S3MultipartWriter(self.client, self.bucket, self.prefix + name, self.part_size, self.workers)
+
+    def open_reader(self, name):
+        response = self.client.get_object(Bucket=self.bucket, Key=self.prefix + name)
+        return S3Reader(response['Body'])
+
+    def free_space(self):
+        return None  # Buckets have no meaningful free-space limit
+
+    def staging_directory(self):
+        return os.path.join(tempfile.gettempdir(), "db_backup_staging", self.bucket)
+
+    def local_path(self, name):
+        return None
+
+    def location(self, name):
+        return f"s3://{self.bucket}/{self.prefix}{name}"
+
+    def list(self):
+        backups = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + "Backup_"):
+            for item in page.get('Contents', []):
+                name = item['Key'][len(self.prefix):]
+                if "/" not in name and is_backup_name(name):
+                    backups.append((name, item['LastModified'].timestamp(), item['Size']))
+        return backups
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + name)
+
+class BackupEncryption:
+    """Chunked AES-256-GCM format for encrypted backups
+
+    Layout: MAGIC, 16-byte scrypt salt, 4-byte nonce prefix, then frames of
+    (4-byte ciphertext length, 1-byte final flag, ciphertext + tag). Each
+    frame's nonce is the prefix plus its index, and the header, index and
+    final flag are authenticated, so reordered, altered or truncated
+    streams are rejected at the first bad frame.
+    """
+
+    MAGIC = b"DBBKENC1"
+    SUFFIX = ".enc"
+    CHUNK_SIZE = 1024 * 1024
+    FRAME = struct.Struct(">IB")
+
+    @staticmethod
+    def derive_key(passphrase, salt):
+        return hashlib.scrypt(passphrase.encode('utf-8'), salt=salt, n=2 ** 15, r=8, p=1,
+                              maxmem=64 * 1024 * 1024, dklen=32)
+
+    @classmethod
+    def aad(cls, header, index, final):
+        return header + struct.pack(">QB", index, final)
+
+    @staticmethod
+    def nonce(prefix, index):
+        return prefix + struct.pack(">Q", index)
+
+class EncryptingWriter:
+    """Writer stage that encrypts everything passed through to ``inner``"""
+
+    def __init__(self, inner, passphrase):
+        if AESGCM is None:
+            raise Exception("The cryptography package is required for encrypted backups (pip install cryptography)")
+        self.inner = inner
+        salt = os.urandom(16)
+        self.prefix = os.urandom(4)
+        self.header = BackupEncryption.MAGIC + salt + self.prefix
+        self.cipher = AESGCM(BackupEncryption.derive_key(passphrase, salt))
+        self.buffer = bytearray()
+        self.index = 0
+        self.bytes_written = 0
+        self.crypto_seconds = 0.0
+        self.inner.write(self.header)
+
+    def write(self, data):
+        self.buffer += data
+        self.bytes_written += len(data)
+        while len(self.buffer) > BackupEncryption.CHUNK_SIZE:
+            self.write_frame(bytes(self.buffer[:BackupEncryption.CHUNK_SIZE]), final=0)
+            del self.buffer[:BackupEncryption.CHUNK_SIZE]
+        return len(data)
+
+    def write_frame(self, chunk, final):
+        started = time.perf_counter()
+        sealed = self.cipher.encrypt(
+            BackupEncryption.nonce(self.prefix, self.index), chunk,
+            BackupEncryption.aad(self.header, self.index, final)
+        )
+        self.crypto_seconds += time.perf_counter() - started
+        self.inner.write(BackupEncryption.FRAME.pack(len(sealed), final) + sealed)
+        self.index += 1
+
+    def flush(self):
+        pass
+
+    def close(self):
+        # The final frame (possibly empty) marks the end so truncation is detectable
+        self.write_frame(bytes(self.buffer), final=1)
+        self.buffer = bytearray()
+        self.inner.close()
+
+    def abort(self):
+        self.inner.abort()
+
+class DecryptingReader:
+    """Reader stage that verifies and decrypts a stream frame by frame"""
+
+    def __init__(self, inner, passphrase):
+        if AESGCM is None:
+            raise Exception("The cryptography package is required for encrypted backups (pip install cryptography)")
+        self.inner = inner
+        self.header = self.read_exact(len(BackupEncryption.MAGIC) + 20)
+        if not self.header.startswith(BackupEncryption.MAGIC):
+            raise ValueError("Not an encrypted backup")
+        salt = self.header[len(BackupEncryption.MAGIC):len(BackupEncryption.MAGIC) + 16]
+        self.prefix = self.header[-4:]
+        self.cipher = AESGCM(BackupEncryption.derive_key(passphrase, salt))
+        self.buffer = b""
+        self.index = 0
+        self.finished = False
+
+    def read_exact(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.inner.read(size - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def next_frame(self):
+        frame = self.read_exact(BackupEncryption.FRAME.size)
+        if len(frame) < BackupEncryption.FRAME.size:
+            raise ValueError("Encrypted backup is truncated")
+        length, final = BackupEncryption.FRAME.unpack(frame)
+        sealed = self.read_exact(length)
+        if len(sealed) < length:
+            raise ValueError("Encrypted backup is truncated")
+        try:
+            chunk = self.cipher.decrypt(
+                BackupEncryption.nonce(self.prefix, self.index), sealed,
+                BackupEncryption.aad(self.header, self.index, final)
+            )
+        except InvalidTag:
+            raise ValueError(f"Encrypted backup failed authentication at chunk {self.index} "
+                             "(wrong passphrase or tampered file)")
+        self.index += 1
+        self.finished = bool(final)
+        return chunk
+
+    def read(self, size=-1):
+        while not self.finished and (size is None or size < 0 or len(self.buffer) < size):
+            self.buffer += self.next_frame()
+        if size is None or size < 0:
+            data, self.buffer = self.buffer, b""
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def close(self):
+        self.inner.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+SQL_INDEX_SUFFIX = ".index.json"
+MYSQL_SECTION_RE = re.compile(
+    r"^-- (Table structure for table|Dumping data for table|Temporary (?:view|table) structure for view"
+    r"|Final view structure for view) `((?:[^`]|``)+)`"
+)
+MYSQL_BOUNDARY_RE = re.compile(r"^-- (Dumping routines for database|Dumping events for database|Current Database:)")
+PG_SECTION_RE = re.compile(r"^-- (?:Data for )?Name: (.+?); Type: (.+?); Schema: (.+?); Owner: ")
+PG_TABLE_KINDS = ('TABLE', 'TABLE DATA', 'VIEW', 'MATERIALIZED VIEW', 'MATERIALIZED VIEW DATA')
+PG_TABLE_PREFIXED_KINDS = ('CONSTRAINT', 'FK CONSTRAINT', 'DEFAULT', 'TRIGGER', 'POLICY', 'RULE', 'ROW SECURITY')
+PG_QUALIFIED_NAME_RE = re.compile(r'(?:"((?:[^"]|"")+)"|([^\s."(;]+))\.(?:"((?:[^"]|"")+)"|([^\s."(;]+))')
+
+def dump_index_name(backup_name):
+    """Name of the table index stored next to a SQL backup (encrypted along with it)"""
+    if backup_name.endswith(BackupEncryption.SUFFIX):
+        return backup_name[:-len(BackupEncryption.SUFFIX)] + SQL_INDEX_SUFFIX + BackupEncryption.SUFFIX
+    return backup_name + SQL_INDEX_SUFFIX
+
+def pg_qualified_table(text):
+    """(schema, table) of the first schema-qualified name in a statement fragment"""
+    match = PG_QUALIFIED_NAME_RE.search(text)
+    if not match:
+        return None
+    schema = match.group(1).replace('""', '"') if match.group(1) else match.group(2)
+    table = match.group(3).replace('""', '"') if match.group(3) else match.group(4)
+    return schema, table
+
+class SqlDumpIndexer:
+    """Records where each table's sections start in a plain SQL dump as it streams past
+
+    Only the comment-block headers mysqldump and pg_dump write before every
+    object ("--", header lines, "--") are parsed, and pg_dump COPY data is
+    skipped with a single search, so indexing keeps up with the dump.
+    Offsets are into the plain dump, before compression or encryption.
+    """
+
+    MAX_HEADER = 64 * 1024
+
+    def __init__(self, inner, db_type):
+        self.inner = inner
+        self.db_type = db_type
+        self.buffer = b""
+        self.offset = 0  # Dump offset of buffer[0]
+        self.in_copy = False
+        self.sections = []
+        self.sequence_owners = {}  # (schema, sequence) -> table
+        self.error = None
+
+    def write(self, data):
+        self.inner.write(data)
+        if self.error is None:
+            try:
+                self.buffer += data
+                self.scan()
+            except Exception as e:
+                # A broken index must never break the backup itself
+                self.error = str(e)
+                self.buffer = b""
+
+    def scan(self):
+        buf = self.buffer
+        pos = 0
+        while True:
+            if self.in_copy:
+                end = buf.find(b"\n\\.\n", pos)
+                if end < 0:
+                    pos = max(pos, len(buf) - 3)
+                    break
+                self.in_copy = False
+                pos = end + 3
+                continue
+
+            block = buf.find(b"\n--\n-- ", pos)
+            copy = buf.find(b"\nCOPY ", pos) if self.db_type == "PostgreSQL" else -1
+            if block < 0 and copy < 0:
+                pos = max(pos, len(buf) - 6)  # A marker may straddle the next write
+                break
+
+            if copy >= 0 and (block < 0 or copy < block):
+                line_end = buf.find(b"\n", copy + 1)
+                if line_end < 0:
+                    pos = copy
+                    break
+                self.in_copy = buf[copy + 1:line_end].rstrip().endswith(b"FROM stdin;")
+                pos = line_end  # An empty table's "\." follows straight away
+                continue
+
+            consumed = self.parse_block(buf, block)
+            if consumed is None:
+                pos = block  # Wait for the rest of the block
+                break
+            pos = consumed
+
+        self.offset += pos
+        self.buffer = buf[pos:]
+
+    def parse_block(self, buf, block):
+        """Handle a comment block at ``block``; returns where scanning continues, or None to wait"""
+        header_start = block + 4
+        close = buf.find(b"\n--\n", header_start)
+        if close < 0:
+            return None if len(buf) - block < self.MAX_HEADER else block + 1
+        lines = buf[header_start:close].decode('utf-8', errors='replace').split("\n")
+        if not all(line.startswith("--") for line in lines):
+            return block + 1  # Not a header block (e.g. mysqldump's opening banner)
+
+        section = self.parse_header(lines)
+        if section is None:
+            return close + 3
+        if section.pop('needs_statement'):
+            statement_start = close + 4
+            while buf[statement_start:statement_start + 1] == b"\n":
+                statement_start += 1
+            statement_end = buf.find(b"\n", statement_start)
+            if statement_end < 0:
+                return None if len(buf) - block < self.MAX_HEADER else close + 3
+            self.parse_statement(section, buf[statement_start:statement_end].decode('utf-8', errors='replace'))
+        section['start'] = self.offset + block + 1
+        self.sections.append(section)
+        return close + 3
+
+    def parse_header(self, lines):
+        for line in lines:
+            if self.db_type == "MySQL":
+                match = MYSQL_SECTION_RE.match(line)
+                if match:
+                    return {'kind': match.group(1), 'schema': "", 'table': match.group(2).replace('``', '`'),
+                            'needs_statement': False}
+                if MYSQL_BOUNDARY_RE.match(line):
+                    return {'kind': line[3:].split(' for ')[0], 'schema': "", 'table': None, 'needs_statement': False}
+            else:
+                match = PG_SECTION_RE.match(line)
+                if not match:
+                    continue
+                name, kind, schema = match.groups()
+                section = {'kind': kind, 'schema': schema, 'table': None, 'name': name, 'needs_statement': False}
+                if kind in PG_TABLE_KINDS:
+                    section['table'] = name
+                elif kind in PG_TABLE_PREFIXED_KINDS:
+                    section['table'] = name.split(' ', 1)[0]
+                elif kind in ('COMMENT', 'ACL') and name.startswith(('TABLE ', 'COLUMN ')):
+                    section['table'] = name.split(' ', 1)[1].split('.', 1)[0]
+                elif kind in ('INDEX', 'SEQUENCE', 'SEQUENCE OWNED BY'):
+                    section['needs_statement'] = True
+                return section
+        return None
+
+    def parse_statement(self, section, statement):
+        """Find the table behind an index or sequence from its first statement line"""
+        target = None
+        if section['kind'] == 'INDEX':
+            on = re.search(r"\bON (?:ONLY )?(.+)", statement)
+            target = pg_qualified_table(on.group(1)) if on else None
+        elif section['kind'] == 'SEQUENCE OWNED BY':
+            owned = re.search(r"\bOWNED BY (.+);", statement)
+            target = pg_qualified_table(owned.group(1)) if owned else None
+            if target:
+                self.sequence_owners[(section['schema'], section['name'])] = target[1]
+        elif statement.startswith("ALTER TABLE"):
+            # Identity column: the sequence is created by ALTER TABLE ... ADD GENERATED
+            target = pg_qualified_table(statement[len("ALTER TABLE"):].replace(" ONLY ", " "))
+        if target:
+            section['table'] = target[1]
+
+    def index(self, size):
+        """The finished index for a dump of ``size`` bytes"""
+        sections = []
+        for number, section in enumerate(self.sections):
+            if section['table'] is None and section['kind'] in ('SEQUENCE', 'SEQUENCE SET'):
+                section['table'] = self.sequence_owners.get((section['schema'], section['name']))
+            end = self.sections[number + 1]['start'] if number + 1 < len(self.sections) else size
+            sections.append({'kind': section['kind'], 'schema': section['schema'], 'table': section['table'],
+                             'start': section['start'], 'end': end})
+        return {
+            'version': 1,
+            'db_type': self.db_type,
+            'size': size,
+            'preamble': self.sections[0]['start'] if self.sections else size,
+            'sections': sections
+        }
+
+def merge_ranges(ranges):
+    """Joins byte ranges that follow on from each other"""
+    merged = []
+    for start, end in ranges:
+        if merged and start == merged[-1][1]:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def index_ranges(index, tables):
+    """Merged byte ranges holding the dump preamble plus every section of the chosen tables"""
+    return merge_ranges([(0, index['preamble'])] + [
+        (section['start'], section['end']) for section in index['sections']
+        if section['table'] is not None and (section['schema'], section['table']) in tables
+    ])
+
+class RangeReader:
+    """Reads only some byte ranges of a backup: memory-mapped for a plain local
+    file, otherwise by skipping through the (decrypted) stream"""
+
+    def __init__(self, ranges, path=None, stream=None, prefix=b""):
+        self.ranges = ranges
+        self.path = path
+        self.stream = stream
+        self.chunks = self.mapped_chunks() if path else self.streamed_chunks()
+        if prefix:
+            self.chunks = itertools.chain((prefix,), self.chunks)
+
+    def mapped_chunks(self):
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for start, end in self.ranges:
+                for position in range(start, end, STREAM_CHUNK_SIZE):
+                    yield mapped[position:min(end, position + STREAM_CHUNK_SIZE)]
+
+    def streamed_chunks(self):
+        position = 0
+        for start, end in self.ranges:
+            while position < end:
+                data = self.stream.read(min(STREAM_CHUNK_SIZE, end - position))
+                if not data:
+                    raise ValueError("The backup is shorter than its table index")
+                if position + len(data) > start:
+                    yield data[max(start - position, 0):]
+                position += len(data)
+
+    def read(self, size=-1):
+        return next(self.chunks, b'')
+
+MYSQL_DATA_KIND = 'Dumping data for table'
+MYSQL_LATE_KINDS = ('Final view structure for view', 'Dumping routines', 'Dumping events')
+MYSQL_GTID_PURGED_RE = re.compile(rb"^SET @@GLOBAL\.GTID_PURGED=.*?;[ \t]*\n?", re.M | re.S)
+MYSQL_BULK_SESSION = "SET SESSION foreign_key_checks=0, unique_checks=0, bulk_insert_buffer_size=268435456"
+
+class MySQLRestorePlan:
+    """Splits an indexed mysqldump into the phases of a parallel restore
+
+    Table structures load first on one connection, then each table's data
+    section on a connection of its own (largest first), and views, routines
+    and events last, once everything they refer to exists.
+    """
+
+    def __init__(self, index):
+        if index['db_type'] != "MySQL":
+            raise ValueError(f"This is a {index['db_type']} dump")
+        self.size = index['size']
+        self.preamble = index['preamble']
+        schema, late, data = [], [], {}
+        for section in index['sections']:
+            span = (section['start'], section['end'])
+            if section['kind'].startswith("Current Database"):
+                raise ValueError("Dumps of several databases are restored on one connection")
+            if section['kind'] == MYSQL_DATA_KIND:
+                data.setdefault(section['table'], []).append(span)
+            elif section['kind'] in MYSQL_LATE_KINDS:
+                late.append(span)
+            else:
+                schema.append(span)
+        self.schema = merge_ranges([(0, self.preamble)] + schema)
+        self.late = merge_ranges(late)
+        self.tables = sorted(((table, merge_ranges(spans)) for table, spans in data.items()),
+                             key=lambda item: -sum(end - start for start, end in item[1]))
+
+    def session_preamble(self, path):
+        """The dump's session settings for the extra connections; only the schema
+        connection may set GTID_PURGED"""
+        with open(path, 'rb') as f:
+            return MYSQL_GTID_PURGED_RE.sub(b"", f.read(self.preamble))
+
+class TokenBucket:
+    """Thread-safe rate limiter; the rate can be changed while a job is consuming
+
+    A rate of 0 means unlimited. ``on_wait`` is called between short sleeps so
+    the caller can keep its UI responsive while throttled.
+    """
+
+    SLICE = 0.1
+
+    def __init__(self, rate=0, on_wait=None):
+        self.lock = threading.Lock()
+        self.on_wait = on_wait
+        self.rate = 0
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.rate = max(0, rate)
+            # Allow at most one second of burst at the new rate
+            self.tokens = min(self.tokens, float(self.rate))
+            self.updated = time.monotonic()
+
+    def consume(self, amount):
+        while True:
+            with self.lock:
+                if not self.rate:
+                    return
+                now = time.monotonic()
+                self.tokens = min(self.tokens + (now - self.updated) * self.rate, float(self.rate))
+                self.updated = now
+                if self.tokens >= amount or self.tokens >= self.rate:
+                    # Large writes are let through once the bucket is full and go into debt
+                    self.tokens -= amount
+                    return
+                wait = min((min(amount, self.rate) - self.tokens) / self.rate, self.SLICE)
+            time.sleep(wait)
+            if self.on_wait:
+                self.on_wait()
+
+class ThrottledWriter:
+    """Writer stage that limits the rate at which bytes reach ``inner``"""
+
+    def __init__(self, inner, bucket):
+        self.inner = inner
+        self.bucket = bucket
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bucket.consume(len(data))
+        self.inner.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def flush(self):
+        self.inner.flush()
+
+    def close(self):
+        self.inner.close()
+
+    def abort(self):
+        self.inner.abort()
+
+PROCESS_PRIORITIES = ["Normal", "Below normal", "Idle"]
+
+def set_process_priority(pid, priority):
+    """Apply a CPU and I/O priority from PROCESS_PRIORITIES to a running process"""
+    process = psutil.Process(pid)
+    level = PROCESS_PRIORITIES.index(priority)
+    if platform.system() == 'Windows':
+        process.nice([psutil.NORMAL_PRIORITY_CLASS, psutil.BELOW_NORMAL_PRIORITY_CLASS,
+                      psutil.IDLE_PRIORITY_CLASS][level])
+        process.ionice([psutil.IOPRIO_NORMAL, psutil.IOPRIO_LOW, psutil.IOPRIO_VERYLOW][level])
+    else:
+        process.nice([0, 10, 19][level])
+        if hasattr(process, 'ionice'):
+            if level == 2:
+                process.ionice(psutil.IOPRIO_CLASS_IDLE)
+            else:
+                process.ionice(psutil.IOPRIO_CLASS_BE, [4, 7][level])
+
+def kill_process_tree(process, timeout=2):
+    """Terminate a Popen process and everything it started, killing whatever outlives ``timeout``"""
+    try:
+        children = psutil.Process(process.pid).children(recursive=True)
+    except psutil.NoSuchProcess:
+        children = []
+    for child in children:
+        try:
+            child.terminate()
+        except psutil.NoSuchProcess:
+            pass
+    # The direct child is reaped through Popen, so its owner still sees the real exit status
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    _, alive = psutil.wait_procs(children, timeout=timeout)
+    for child in alive:
+        try:
+            child.kill()
+        except psutil.NoSuchProcess:
+            pass
+
+class ProcessJob:
+    """A supervised child process and the latest resource figures of its process tree"""
+
+    def __init__(self, name, process, kind, timeout=None, memory_limit=None):
+        self.name = name
+        self.process = process
+        self.kind = kind
+        self.timeout = timeout  # Seconds
+        self.memory_limit = memory_limit  # Bytes of RSS across the process tree
+        self.started = time.perf_counter()
+        self.ended = None
+        self.status = "running"
+        self.stop_reason = None  # Set when the supervisor kills the job
+        self.cpu_seconds = 0.0
+        self.cpu_percent = 0.0
+        self.rss = 0
+        self.peak_rss = 0
+        self.read_bytes = None  # None where the platform has no per-process I/O counters
+        self.write_bytes = None
+        self.sampled_at = None
+        self.handle = None
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    @property
+    def elapsed(self):
+        return (self.ended or time.perf_counter()) - self.started
+
+    def sample(self):
+        """Refresh CPU, memory and I/O figures; children that exited keep counting through the maxima"""
+        if self.handle is None:
+            self.handle = psutil.Process(self.process.pid)
+        processes = [self.handle] + self.handle.children(recursive=True)
+        cpu, rss, read, written, has_io = 0.0, 0, 0, 0, False
+        for process in processes:
+            try:
+                with process.oneshot():
+                    times = process.cpu_times()
+                    cpu += times.user + times.system
+                    if process is self.handle:
+                        cpu += getattr(times, 'children_user', 0) + getattr(times, 'children_system', 0)
+                    rss += process.memory_info().rss
+                    if hasattr(process, 'io_counters'):
+                        counters = process.io_counters()
+                        read += counters.read_bytes
+                        written += counters.write_bytes
+                        has_io = True
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        now = time.perf_counter()
+        if self.sampled_at:
+            self.cpu_percent = max(cpu - self.cpu_seconds, 0) / max(now - self.sampled_at, 0.001) * 100
+        self.sampled_at = now
+        self.cpu_seconds = max(self.cpu_seconds, cpu)
+        self.rss = rss
+        self.peak_rss = max(self.peak_rss, rss)
+        if has_io:
+            self.read_bytes = max(self.read_bytes or 0, read)
+            self.write_bytes = max(self.write_bytes or 0, written)
+
+    def client_ports(self):
+        """Local ports of the tree's TCP connections, which identify its sessions on the database server"""
+        try:
+            root = psutil.Process(self.pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return set()
+        ports = set()
+        for process in processes:
+            try:
+                # net_connections() replaced connections() in psutil 6
+                connections = getattr(process, 'net_connections', None) or process.connections
+                ports.update(connection.laddr.port for connection in connections(kind='tcp') if connection.raddr)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return ports
+
+    def summary(self):
+        text = f"CPU {self.cpu_seconds:.1f} s, peak RSS {self.peak_rss / (1024 * 1024):.1f} MB"
+        if self.read_bytes is not None:
+            text += (f", read {self.read_bytes / (1024 * 1024):.1f} MB, "
+                     f"written {self.write_bytes / (1024 * 1024):.1f} MB")
+        return text
+
+class ProcessSupervisor:
+    """Starts child processes as jobs and watches them from a monitor thread
+
+    Every INTERVAL the monitor samples each running job, kills jobs that
+    overrun their timeout or memory cap (with their child processes), and
+    moves finished ones to a short history. The thread only runs while
+    jobs do.
+    """
+
+    INTERVAL = 1.0
+
+    def __init__(self, history=50):
+        self.jobs = []
+        self.finished = collections.deque(maxlen=history)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def start(self, command, name=None, kind="tool", timeout=None, memory_limit=None, **popen_args):
+        """subprocess.Popen(command, **popen_args), supervised as a job"""
+        process = subprocess.Popen(command, **popen_args)
+        job = ProcessJob(name or os.path.basename(command[0]), process, kind, timeout, memory_limit)
+        with self.lock:
+            self.jobs.append(job)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.monitor, name="process-supervisor", daemon=True)
+                self.thread.start()
+        return process
+
+    def monitor(self):
+        while not self.stopping.wait(self.INTERVAL):
+            with self.lock:
+                if not self.jobs:
+                    self.thread = None
+                    return
+                jobs = list(self.jobs)
+            for job in jobs:
+                self.check(job)
+
+    def check(self, job):
+        if job.process.poll() is None:
+            try:
+                job.sample()
+            except psutil.NoSuchProcess:
+                pass
+            except Exception as e:
+                print(f"Error sampling {job.name} ({job.pid}): {e}")
+            if job.timeout and job.elapsed > job.timeout:
+                job.stop_reason = f"{job.name} was stopped after running longer than {job.timeout / 60:g} min"
+            elif job.memory_limit and job.rss > job.memory_limit:
+                job.stop_reason = (f"{job.name} was stopped at {job.rss / (1024 * 1024):.0f} MB of memory "
+                                   f"(limit {job.memory_limit / (1024 * 1024):.0f} MB)")
+            if job.stop_reason:
+                kill_process_tree(job.process)
+            if job.process.poll() is None:
+                return
+        self.reap(job)
+
+    def reap(self, job):
+        job.ended = time.perf_counter()
+        returncode = job.process.returncode
+        job.status = "stopped" if job.stop_reason else "finished" if returncode == 0 else f"exit code {returncode}"
+        job.cpu_percent = 0.0
+        job.rss = 0
+        with self.lock:
+            if job in self.jobs:
+                self.jobs.remove(job)
+                self.finished.appendleft(job)
+
+    def job_for(self, process):
+        with self.lock:
+            return next((job for job in list(self.jobs) + list(self.finished) if job.process is process), None)
+
+    def running(self, kind=None):
+        with self.lock:
+            return [job for job in self.jobs if kind is None or job.kind == kind]
+
+    def all_jobs(self):
+        """Running jobs, then finished ones, newest first"""
+        with self.lock:
+            return list(reversed(self.jobs)) + list(self.finished)
+
+    def jobs_since(self, started, kind=None):
+        return [job for job in self.all_jobs() if job.started >= started and (kind is None or job.kind == kind)]
+
+    def stop(self, job, reason):
+        """Kill a job's process tree; its owner reports ``reason`` instead of the exit code"""
+        job.stop_reason = reason
+        try:
+            kill_process_tree(job.process)
+        except Exception as e:
+            print(f"Error terminating {job.name} ({job.pid}): {e}")
+
+    def stop_all(self):
+        self.stopping.set()
+        for job in self.running():
+            self.stop(job, f"{job.name} was stopped when the application closed")
+            self.reap(job)
+
+CANCEL_CONNECT_TIMEOUT = 5  # Seconds; a server too busy to answer in time still has the job's tools killed
+
+class JobCancelled(Exception):
+    pass
+
+class JobControl:
+    """Cancellation of one backup or restore
+
+    cancel() sets the flag the job's loops check and runs the cancel hooks,
+    from whichever thread asked. The job is also registered in the schedule
+    database, and a watcher thread picks up cancellations requested there
+    by ``app.py --cancel``.
+    """
+
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, kind, description, db_type=None, history=None, run_id=None):
+        self.kind = kind
+        self.description = description
+        self.db_type = db_type
+        self.run_id = run_id
+        self.started = time.perf_counter()
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.hooks = []
+        self.sessions = set()  # Server sessions of the job's own connections (backend pids / thread ids)
+        self.lock = threading.Lock()
+        self.history = history
+        self.id = None
+        if history:
+            try:
+                self.id = history.register_job(kind, description, run_id)
+                threading.Thread(target=self.watch, name=f"{kind}-cancel-watch", daemon=True).start()
+            except Exception as e:
+                print(f"Error registering {kind} job: {e}")
+
+    def watch(self):
+        while not self.finished.wait(self.POLL_INTERVAL):
+            try:
+                if self.history.cancel_requested(self.id):
+                    self.cancel()
+                    return
+            except Exception as e:
+                print(f"Error checking for cancellation: {e}")
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise JobCancelled(f"The {self.kind} was cancelled")
+
+    def add_session(self, session):
+        with self.lock:
+            self.sessions.add(session)
+
+    def session_ids(self):
+        with self.lock:
+            return sorted(self.sessions)
+
+    def on_cancel(self, hook):
+        self.hooks.append(hook)
+
+    def cancel(self):
+        """Stop the job: hooks run once, however many times it is cancelled"""
+        with self.lock:
+            if self.cancelled.is_set():
+                return
+            self.cancelled.set()
+        for hook in self.hooks:
+            try:
+                hook(self)
+            except Exception as e:
+                print(f"Error cancelling {self.kind}: {e}")
+
+    def close(self):
+        self.finished.set()
+        if self.id is not None:
+            try:
+                self.history.unregister_job(self.id)
+            except Exception as e:
+                print(f"Error unregistering {self.kind} job: {e}")
+
+def connect_database(db_type, details, connect_timeout=None):
+    """Open a connection from plain connection details (host, port, database, user, password)"""
+    options = {'connect_timeout': connect_timeout} if connect_timeout else {}
+    if db_type == "PostgreSQL":
+        return psycopg2.connect(
+            host=details['host'],
+            port=details['port'] or "5432",
+            database=details['database'],
+            user=details['user'],
+            password=details['password'],
+            **options
+        )
+    return pymysql.connect(
+        host=details['host'],
+        port=int(details['port'] or "3306"),
+        database=details['database'],
+        user=details['user'],
+        password=details['password'],
+        **options
+    )
+
+def sample_server_load(connection, db_type):
+    """Active sessions and replication lag (seconds, None if not replicating) plus host CPU"""
+    lag = None
+    if db_type == "PostgreSQL":
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT count(*) FROM pg_stat_activity
+                WHERE state = 'active' AND backend_type = 'client backend' AND pid <> pg_backend_pid()
+            """)
+            sessions = cursor.fetchone()[0]
+            # Standby: how far replay is behind; primary: the slowest standby
+            cursor.execute("""
+                SELECT CASE WHEN pg_is_in_recovery()
+                    THEN EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+                    ELSE (SELECT EXTRACT(EPOCH FROM max(replay_lag)) FROM pg_stat_replication)
+                END
+            """)
+            value = cursor.fetchone()[0]
+            lag = float(value) if value is not None else None
+        connection.rollback()
+    else:
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            cursor.execute("SHOW PROCESSLIST")
+            sessions = sum(
+                1 for row in cursor.fetchall()
+                if row['Id'] != connection.thread_id()
+                and row['Command'] not in ('Sleep', 'Daemon', 'Binlog Dump', 'Binlog Dump GTID')
+            )
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except pymysql.err.ProgrammingError:
+                cursor.execute("SHOW SLAVE STATUS")  # Before MySQL 8.0.22
+            for row in cursor.fetchall():
+                value = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+                if value is not None:
+                    lag = max(lag or 0, float(value))
+                    
+    return {'sessions': sessions, 'lag': lag, 'cpu': psutil.cpu_percent(interval=1)}
+
+class LoadPolicy:
+    """Thresholds above which a scheduled backup is deferred; 0 disables a check"""
+
+    def __init__(self, max_sessions=0, max_lag=0, max_cpu=0):
+        self.max_sessions = max_sessions
+        self.max_lag = max_lag
+        self.max_cpu = max_cpu
+
+    def reasons(self, sample):
+        reasons = []
+        if self.max_sessions and sample['sessions'] > self.max_sessions:
+            reasons.append(f"{sample['sessions']} active sessions > {self.max_sessions}")
+        if self.max_lag and sample['lag'] is not None and sample['lag'] > self.max_lag:
+            reasons.append(f"replication lag {sample['lag']:.0f}s > {self.max_lag}s")
+        if self.max_cpu and sample['cpu'] > self.max_cpu:
+            reasons.append(f"CPU {sample['cpu']:.0f}% > {self.max_cpu}%")
+        return reasons
+
+DEFER_RETRY_SECONDS = 300
+
+MONITOR_APPLICATION_NAME = "db-backup-monitor"
+MYSQL_IDLE_COMMANDS = ('Sleep', 'Daemon', 'Binlog Dump', 'Binlog Dump GTID')
+
+def read_server_activity(connection, db_type, lock_detail=True):
+    """Every other client session on the server, as {session id: row dict}
+
+    ``seconds`` is the time spent in the current state. With ``lock_detail``
+    the sessions blocking each waiting one are looked up and, on PostgreSQL,
+    the locks each session holds are counted; both cost more on busy servers.
+    """
+    rows = {}
+    if db_type == "PostgreSQL":
+        detail = """CASE WHEN a.wait_event_type = 'Lock' THEN array_to_string(pg_blocking_pids(a.pid), ', ') END,
+                    (SELECT count(*) FROM pg_locks l WHERE l.pid = a.pid)""" if lock_detail else "NULL, NULL"
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT a.pid, a.usename, a.datname,
+                       coalesce(host(a.client_addr) || ':' || a.client_port, 'local'),
+                       coalesce(a.state, ''), coalesce(a.wait_event_type || ': ' || a.wait_event, ''),
+                       {detail},
+                       EXTRACT(EPOCH FROM clock_timestamp() - a.state_change)::float8,
+                       left(a.query, 500)
+                FROM pg_stat_activity a
+                WHERE a.backend_type = 'client backend' AND a.pid <> pg_backend_pid()
+            """)
+            for pid, user, database, client, state, wait_event, blocked_by, locks, seconds, query in cursor.fetchall():
+                rows[pid] = {
+                    'session': pid, 'user': user, 'database': database, 'client': client, 'state': state,
+                    'wait': wait_event, 'blocked_by': blocked_by or "", 'locks': locks,
+                    'seconds': round(seconds or 0), 'query': query or "", 'active': state == 'active'
+                }
+        return rows
+        
+    with connection.cursor() as cursor:
+        # performance_schema.processlist (MySQL 8.0.22+) reads without the global mutex SHOW PROCESSLIST takes
+        for source in ("performance_schema.processlist", "information_schema.PROCESSLIST"):
+            try:
+                cursor.execute(f"""
+                    SELECT ID, USER, DB, HOST, COMMAND, STATE, TIME, LEFT(INFO, 500)
+                    FROM {source} WHERE ID <> CONNECTION_ID()
+                """)
+                break
+            except pymysql.MySQLError:
+                continue
+        for session, user, database, host, command, state, seconds, query in cursor.fetchall():
+            rows[session] = {
+                'session': session, 'user': user, 'database': database or "", 'client': host, 'state': command,
+                'wait': state or "", 'blocked_by': "", 'locks': None, 'seconds': int(seconds or 0),
+                'query': query or "", 'active': command not in MYSQL_IDLE_COMMANDS
+            }
+        if lock_detail:
+            waits = []
+            for query in ("""
+                SELECT r.PROCESSLIST_ID, b.PROCESSLIST_ID FROM performance_schema.data_lock_waits w
+                JOIN performance_schema.threads r ON r.THREAD_ID = w.REQUESTING_THREAD_ID
+                JOIN performance_schema.threads b ON b.THREAD_ID = w.BLOCKING_THREAD_ID
+            """, """
+                SELECT r.trx_mysql_thread_id, b.trx_mysql_thread_id FROM information_schema.INNODB_LOCK_WAITS w
+                JOIN information_schema.INNODB_TRX r ON r.trx_id = w.requesting_trx_id
+                JOIN information_schema.INNODB_TRX b ON b.trx_id = w.blocking_trx_id
+            """):  # MySQL 8, then 5.7
+                try:
+                    cursor.execute(query)
+                    waits = cursor.fetchall()
+                    break
+                except pymysql.MySQLError:
+                    continue
+            blockers = {}
+            for waiting, blocking in waits:
+                blockers.setdefault(waiting, set()).add(blocking)
+            for session, blocking in blockers.items():
+                if session in rows:
+                    rows[session]['blocked_by'] = ", ".join(str(pid) for pid in sorted(blocking))
+    return rows
+
+class ActivityMonitor:
+    """Polls server activity on a dedicated connection from a background thread
+
+    The time each poll's queries take is measured. While the recent average
+    costs more than ``budget`` (a fraction of the interval) the lock details
+    are dropped first, then the interval is doubled; both come back once
+    polling is cheap again. The UI reads the latest rows and a ring buffer
+    of per-poll figures for its charts.
+    """
+
+    HISTORY = 300  # Polls kept for the charts
+    MAX_INTERVAL = 300
+    COST_WINDOW = 5  # Polls averaged before the interval or detail changes
+
+    def __init__(self, connect, db_type, interval, budget):
+        self.connect = connect
+        self.db_type = db_type
+        self.base_interval = interval
+        self.interval = interval
+        self.budget = budget
+        self.lock_detail = True
+        self.rows = {}
+        self.samples = collections.deque(maxlen=self.HISTORY)
+        self.costs = collections.deque(maxlen=self.COST_WINDOW)
+        self.polls = 0
+        self.error = None
+        self.connection = None
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="activity-monitor", daemon=True)
+        self.thread.start()
+
+    def set_limits(self, interval, budget):
+        self.base_interval = interval
+        self.interval = max(interval, min(self.interval, self.MAX_INTERVAL))
+        self.budget = budget
+        self.costs.clear()
+
+    def open(self):
+        connection = self.connect()
+        # Autocommit: every poll sees fresh statistics and no transaction stays open
+        # between polls; the statement timeout caps a poll at one interval
+        if self.db_type == "PostgreSQL":
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute("SET application_name = %s", (MONITOR_APPLICATION_NAME,))
+                cursor.execute(f"SET statement_timeout = {int(max(self.base_interval, 1) * 1000)}")
+        else:
+            connection.autocommit(True)
+            with connection.cursor() as cursor:
+                try:
+                    cursor.execute(f"SET SESSION max_execution_time = {int(max(self.base_interval, 1) * 1000)}")
+                except pymysql.MySQLError:
+                    pass  # Before MySQL 5.7.8
+        return connection
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                if self.connection is None:
+                    self.connection = self.open()
+                self.poll()
+                self.error = None
+            except Exception as e:
+                self.error = str(e)
+                self.close_connection()
+                self.interval = min(self.interval * 2, self.MAX_INTERVAL)  # Back off while the server struggles
+            self.stopping.wait(self.interval)
+        self.close_connection()
+
+    def poll(self):
+        started = time.perf_counter()
+        rows = read_server_activity(self.connection, self.db_type, self.lock_detail)
+        cost = time.perf_counter() - started
+        active = [row for row in rows.values() if row['active']]
+        sample = {
+            'time': time.time(),
+            'sessions': len(rows),
+            'active': len(active),
+            'blocked': sum(1 for row in rows.values() if row['blocked_by'] or row['wait'].startswith('Lock')),
+            'longest': max((row['seconds'] for row in active), default=0),
+            'cost': cost
+        }
+        with self.lock:
+            self.rows = rows
+            self.samples.append(sample)
+            self.polls += 1
+        self.costs.append(cost)
+        self.adjust()
+
+    def adjust(self):
+        """Keep the average poll cost within the budget share of the interval"""
+        if len(self.costs) < self.COST_WINDOW:
+            return
+        load = statistics.mean(self.costs) / self.interval
+        if load > self.budget:
+            if self.lock_detail:
+                self.lock_detail = False
+            else:
+                self.interval = min(self.interval * 2, self.MAX_INTERVAL)
+        elif load < self.budget / 4:
+            if self.interval > self.base_interval:
+                self.interval = max(self.base_interval, self.interval / 2)
+            elif not self.lock_detail:
+                self.lock_detail = True
+            else:
+                return
+        else:
+            return
+        self.costs.clear()  # Judge the new setting on its own polls
+
+    def snapshot(self):
+        """(rows, samples, polls) as of the latest poll"""
+        with self.lock:
+            return dict(self.rows), list(self.samples), self.polls
+
+    def close_connection(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def stop(self, timeout=5):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(timeout)
+
+class ActivityTableModel(QAbstractTableModel):
+    """Server sessions, updated in place from each new snapshot
+
+    update() removes sessions that ended, appends new ones and signals only
+    the cells that changed, so the view keeps its selection and scroll
+    position and redraws little between polls.
+    """
+
+    COLUMNS = [("Session", 'session'), ("User", 'user'), ("Database", 'database'), ("Client", 'client'),
+               ("State", 'state'), ("Wait", 'wait'), ("Blocked by", 'blocked_by'), ("Locks", 'locks'),
+               ("Seconds", 'seconds'), ("Query", 'query')]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.keys = []
+        self.rows = []
+
+    def update(self, rows):
+        """Apply a snapshot {key: row dict}; returns (added, changed, removed) row counts"""
+        removed = 0
+        for position in reversed(range(len(self.keys))):
+            if self.keys[position] not in rows:
+                self.beginRemoveRows(QModelIndex(), position, position)
+                del self.keys[position]
+                del self.rows[position]
+                self.endRemoveRows()
+                removed += 1
+                
+        changed = 0
+        for position, key in enumerate(self.keys):
+            old, new = self.rows[position], rows[key]
+            columns = [column for column, (_, field) in enumerate(self.COLUMNS) if old[field] != new[field]]
+            if columns:
+                self.rows[position] = new
+                self.dataChanged.emit(self.index(position, columns[0]), self.index(position, columns[-1]))
+                changed += 1
+                
+        known = set(self.keys)
+        added = [key for key in rows if key not in known]
+        if added:
+            self.beginInsertRows(QModelIndex(), len(self.keys), len(self.keys) + len(added) - 1)
+            self.keys.extend(added)
+            self.rows.extend(rows[key] for key in added)
+            self.endInsertRows()
+        return len(added), changed, removed
+
+    def clear(self):
+        self.beginResetModel()
+        self.keys = []
+        self.rows = []
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        field = self.COLUMNS[index.column()][1]
+        if role == Qt.DisplayRole:
+            value = row[field]
+            return "" if value is None else value  # Numbers stay numbers so the columns sort numerically
+        if role == Qt.ToolTipRole and field == 'query':
+            return row['query']
+        if role == Qt.ForegroundRole and row['blocked_by']:
+            return QColor(Qt.red)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.COLUMNS[section][0]
+        return section + 1
+
+class Sparkline(QWidget):
+    """Small line chart of one figure over the monitor's recent polls"""
+
+    def __init__(self, title, capacity, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.capacity = capacity
+        self.values = []
+        self.setMinimumSize(150, 56)
+
+    def set_values(self, values):
+        self.values = list(values)[-self.capacity:]
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        latest = f"{self.values[-1]:g}" if self.values else "-"
+        painter.drawText(2, 12, f"{self.title}: {latest}")
+        area = self.rect().adjusted(2, 16, -2, -2)
+        painter.setPen(QPen(QColor(200, 200, 200)))
+        painter.drawRect(area)
+        if len(self.values) < 2:
+            return
+        # Newest sample at the right edge; the scale follows the highest value shown
+        top = max(max(self.values), 1)
+        step = area.width() / max(self.capacity - 1, 1)
+        right = area.right()
+        points = [QPointF(right - (len(self.values) - 1 - i) * step,
+                          area.bottom() - value / top * area.height())
+                  for i, value in enumerate(self.values)]
+        painter.setPen(QPen(QColor(30, 110, 200), 1.5))
+        painter.drawPolyline(QPolygonF(points))
+
+SCHEDULE_DB = 'db_backup_jobs.sqlite'
+
+class SQLiteJobStore(BaseJobStore):
+    """APScheduler job store in a local SQLite file, so schedules survive restarts
+
+    Same layout as APScheduler's SQLAlchemyJobStore, on the standard library's
+    sqlite3 so no extra dependency is needed.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        with self.connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS apscheduler_jobs (
+                    id TEXT PRIMARY KEY, next_run_time REAL, job_state BLOB NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS apscheduler_jobs_next ON apscheduler_jobs (next_run_time)")
+
+    def lookup_job(self, job_id):
+        with self.connect() as db:
+            row = db.execute("SELECT job_state FROM apscheduler_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self.reconstitute_job(row[0]) if row else None
+
+    def get_due_jobs(self, now):
+        return self.get_jobs("WHERE next_run_time <= ?", (datetime_to_utc_timestamp(now),))
+
+    def get_next_run_time(self):
+        with self.connect() as db:
+            row = db.execute(
+                "SELECT min(next_run_time) FROM apscheduler_jobs WHERE next_run_time IS NOT NULL"
+            ).fetchone()
+        return utc_timestamp_to_datetime(row[0])
+
+    def get_all_jobs(self):
+        jobs = self.get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        try:
+            with self.connect() as db:
+                db.execute(
+                    "INSERT INTO apscheduler_jobs (id, next_run_time, job_state) VALUES (?, ?, ?)",
+                    (job.id, datetime_to_utc_timestamp(job.next_run_time), pickle.dumps(job.__getstate__()))
+                )
+        except sqlite3.IntegrityError:
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        with self.connect() as db:
+            cursor = db.execute(
+                "UPDATE apscheduler_jobs SET next_run_time = ?, job_state = ? WHERE id = ?",
+                (datetime_to_utc_timestamp(job.next_run_time), pickle.dumps(job.__getstate__()), job.id)
+            )
+        if cursor.rowcount == 0:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        with self.connect() as db:
+            cursor = db.execute("DELETE FROM apscheduler_jobs WHERE id = ?", (job_id,))
+        if cursor.rowcount == 0:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        with self.connect() as db:
+            db.execute("DELETE FROM apscheduler_jobs")
+
+    def reconstitute_job(self, job_state):
+        state = pickle.loads(job_state)
+        state['jobstore'] = self
+        job = Job.__new__(Job)
+        job.__setstate__(state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def get_jobs(self, condition="", params=()):
+        jobs = []
+        failed = []
+        with self.connect() as db:
+            rows = db.execute(
+                f"SELECT id, job_state FROM apscheduler_jobs {condition} ORDER BY next_run_time", params
+            ).fetchall()
+            for job_id, job_state in rows:
+                try:
+                    jobs.append(self.reconstitute_job(job_state))
+                except Exception:
+                    self._logger.exception('Unable to restore job "%s" -- removing it', job_id)
+                    failed.append((job_id,))
+            if failed:
+                db.executemany("DELETE FROM apscheduler_jobs WHERE id = ?", failed)
+        return jobs
+
+class BackupHistory:
+    """Per-run backup history (start, end, bytes, status) in the schedule database"""
+
+    def __init__(self, path):
+        self.path = path
+        with self.connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS backup_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    started REAL NOT NULL,
+                    finished REAL,
+                    db_type TEXT,
+                    database TEXT,
+                    format TEXT,
+                    trigger TEXT,
+                    deferred REAL DEFAULT 0,
+                    bytes INTEGER DEFAULT 0,
+                    status TEXT NOT NULL,
+                    file TEXT,
+                    error TEXT,
+                    source_bytes INTEGER,
+                    binlog_file TEXT,
+                    binlog_position INTEGER
+                )
+            """)
+            columns = [row[1] for row in db.execute("PRAGMA table_info(backup_runs)")]
+            for column, column_type in [('source_bytes', 'INTEGER'), ('binlog_file', 'TEXT'), ('binlog_position', 'INTEGER')]:
+                if column not in columns:
+                    db.execute(f"ALTER TABLE backup_runs ADD COLUMN {column} {column_type}")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS active_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    description TEXT,
+                    run_id INTEGER,
+                    pid INTEGER NOT NULL,
+                    started REAL NOT NULL,
+                    cancel_requested REAL
+                )
+            """)
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS base_backups (
+                    file TEXT PRIMARY KEY,
+                    timeline INTEGER,
+                    start_lsn TEXT,
+                    end_lsn TEXT,
+                    recorded REAL
+                )
+            """)
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def start(self, db_type, database, backup_format, trigger, deferred=0, source_bytes=None):
+        with self.connect() as db:
+            return db.execute(
+                "INSERT INTO backup_runs (started, db_type, database, format, trigger, deferred, status, source_bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?, 'running', ?)",
+                (time.time(), db_type, database, backup_format, trigger, deferred, source_bytes)
+            ).lastrowid
+
+    def finish(self, run_id, status, bytes_written=0, file=None, error=None, binlog=None):
+        binlog_file, binlog_position = binlog or (None, None)
+        with self.connect() as db:
+            db.execute(
+                "UPDATE backup_runs SET finished = ?, status = ?, bytes = ?, file = ?, error = ?, "
+                "binlog_file = ?, binlog_position = ? WHERE id = ?",
+                (time.time(), status, bytes_written, file, error, binlog_file, binlog_position, run_id)
+            )
+    
+    def binlog_position(self, file):
+        """Binlog coordinates recorded for a backup file, or None"""
+        with self.connect() as db:
+            row = db.execute(
+                "SELECT binlog_file, binlog_position FROM backup_runs WHERE file = ? AND binlog_file IS NOT NULL "
+                "ORDER BY started DESC LIMIT 1", (file,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def record_missed(self, scheduled_time, reason):
+        with self.connect() as db:
+            db.execute(
+                "INSERT INTO backup_runs (started, finished, trigger, status, error) "
+                "VALUES (?, ?, 'scheduled', 'missed', ?)",
+                (scheduled_time, scheduled_time, reason)
+            )
+
+    def successful_runs(self, db_type, database, backup_format, limit=20):
+        """Newest successful runs of one database and format, as dicts"""
+        with self.connect() as db:
+            db.row_factory = sqlite3.Row
+            return [dict(row) for row in db.execute(
+                "SELECT * FROM backup_runs WHERE status = 'success' AND db_type = ? AND database = ? "
+                "AND format = ? AND bytes > 0 ORDER BY started DESC LIMIT ?",
+                (db_type, database, backup_format, limit)
+            )]
+
+    def recent(self, limit=200):
+        """Newest runs first, as dicts (with the start LSN of base backups)"""
+        with self.connect() as db:
+            db.row_factory = sqlite3.Row
+            return [dict(row) for row in db.execute(
+                "SELECT r.*, b.start_lsn FROM backup_runs r LEFT JOIN base_backups b ON b.file = r.file "
+                "ORDER BY r.started DESC LIMIT ?", (limit,)
+            )]
+    
+    def register_job(self, kind, description, run_id=None):
+        """Announce a running backup or restore so another process can cancel it; returns its id"""
+        with self.connect() as db:
+            # Rows left behind by an application that crashed
+            for job_id, pid in db.execute("SELECT id, pid FROM active_jobs").fetchall():
+                if not psutil.pid_exists(pid):
+                    db.execute("DELETE FROM active_jobs WHERE id = ?", (job_id,))
+            return db.execute(
+                "INSERT INTO active_jobs (kind, description, run_id, pid, started) VALUES (?, ?, ?, ?, ?)",
+                (kind, description, run_id, os.getpid(), time.time())
+            ).lastrowid
+
+    def unregister_job(self, job_id):
+        with self.connect() as db:
+            db.execute("DELETE FROM active_jobs WHERE id = ?", (job_id,))
+
+    def active_jobs(self):
+        """Running backups and restores of live application processes, as dicts"""
+        with self.connect() as db:
+            db.row_factory = sqlite3.Row
+            rows = [dict(row) for row in db.execute("SELECT * FROM active_jobs ORDER BY started")]
+        return [row for row in rows if psutil.pid_exists(row['pid'])]
+
+    def request_cancel(self, job_id=None):
+        """Ask the owning application to cancel one job, or all of them; returns how many were asked"""
+        live = [row['id'] for row in self.active_jobs() if job_id is None or row['id'] == job_id]
+        with self.connect() as db:
+            for live_id in live:
+                db.execute("UPDATE active_jobs SET cancel_requested = ? WHERE id = ? AND cancel_requested IS NULL",
+                           (time.time(), live_id))
+        return len(live)
+
+    def cancel_requested(self, job_id):
+        with self.connect() as db:
+            row = db.execute("SELECT cancel_requested FROM active_jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def record_base_backup(self, file, position):
+        with self.connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO base_backups (file, timeline, start_lsn, end_lsn, recorded) VALUES (?, ?, ?, ?, ?)",
+                (file, position['timeline'], position['start_lsn'], position['end_lsn'], time.time())
+            )
+    
+    def base_backup(self, file):
+        """Catalogued WAL position of a base backup file, or None"""
+        with self.connect() as db:
+            db.row_factory = sqlite3.Row
+            row = db.execute("SELECT * FROM base_backups WHERE file = ?", (file,)).fetchone()
+        return dict(row) if row else None
+
+def run_throughput(run):
+    """Bytes per second of a finished successful run, or None"""
+    if run['status'] != 'success' or not run['finished'] or not run['bytes']:
+        return None
+    return run['bytes'] / max(run['finished'] - run['started'], 0.001)
+
+def read_table_sizes(connection, db_type):
+    """Catalog statistics per table: [(schema, table, estimated rows, data bytes)]
+
+    Uses planner statistics (pg_class, information_schema.TABLES), so it is
+    cheap but only as fresh as the last ANALYZE.
+    """
+    with connection.cursor() as cursor:
+        if db_type == "PostgreSQL":
+            cursor.execute("""
+                SELECT n.nspname, c.relname, greatest(c.reltuples, 0)::bigint,
+                       (c.relpages + coalesce(t.relpages, 0))::bigint * current_setting('block_size')::bigint
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                LEFT JOIN pg_class t ON t.oid = c.reltoastrelid
+                WHERE c.relkind IN ('r', 'm')
+                AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+                AND n.nspname NOT LIKE 'pg_toast%'
+                AND n.nspname NOT LIKE 'pg_temp%'
+            """)
+        else:
+            cursor.execute("""
+                SELECT TABLE_SCHEMA, TABLE_NAME, COALESCE(TABLE_ROWS, 0), COALESCE(DATA_LENGTH, 0)
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE'
+            """)
+        tables = [(schema, name, int(rows or 0), int(size or 0)) for schema, name, rows, size in cursor.fetchall()]
+    if db_type == "PostgreSQL":
+        connection.rollback()  # Don't sit idle in a transaction for the length of the backup
+    return tables
+
+def list_backup_tables(connection, db_type):
+    """All tables a backup could include: [(schema, table)]; MySQL schemas are the database"""
+    with connection.cursor() as cursor:
+        if db_type == "PostgreSQL":
+            cursor.execute("""
+                SELECT table_schema, table_name
+                FROM information_schema.tables
+                WHERE table_type = 'BASE TABLE'
+                AND table_schema NOT IN ('pg_catalog', 'information_schema')
+                ORDER BY table_schema, table_name
+            """)
+        else:
+            cursor.execute("""
+                SELECT TABLE_SCHEMA, TABLE_NAME
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE()
+                ORDER BY TABLE_NAME
+            """)
+        tables = [(schema, name) for schema, name in cursor.fetchall()]
+    if db_type == "PostgreSQL":
+        connection.rollback()
+    return tables
+
+class TableFilter:
+    """Include/exclude glob patterns for schemas and tables
+
+    Table patterns are ``table`` or ``schema.table``. A table is backed up when
+    it matches the include lists (empty means everything) and no exclude list;
+    a ``schema.table`` include does not also need its schema included.
+    """
+
+    def __init__(self, include_schemas=(), exclude_schemas=(), include_tables=(), exclude_tables=()):
+        self.include_schemas = list(include_schemas)
+        self.exclude_schemas = list(exclude_schemas)
+        self.include_tables = list(include_tables)
+        self.exclude_tables = list(exclude_tables)
+
+    @classmethod
+    def from_text(cls, include_schemas="", exclude_schemas="", include_tables="", exclude_tables=""):
+        return cls(*(split_manifest_list(value) for value in
+                     (include_schemas, exclude_schemas, include_tables, exclude_tables)))
+
+    def is_empty(self):
+        return not (self.include_schemas or self.exclude_schemas or self.include_tables or self.exclude_tables)
+
+    @staticmethod
+    def table_matches(schema, table, pattern):
+        if "." in pattern:
+            schema_pattern, table_pattern = pattern.split(".", 1)
+            return fnmatch.fnmatchcase(schema, schema_pattern) and fnmatch.fnmatchcase(table, table_pattern)
+        return fnmatch.fnmatchcase(table, pattern)
+
+    def matches(self, schema, table):
+        # An explicit schema.table include stands on its own, like pg_dump -t
+        named = any("." in p and self.table_matches(schema, table, p) for p in self.include_tables)
+        if self.include_schemas and not named and not any(fnmatch.fnmatchcase(schema, p) for p in self.include_schemas):
+            return False
+        if any(fnmatch.fnmatchcase(schema, p) for p in self.exclude_schemas):
+            return False
+        if self.include_tables and not any(self.table_matches(schema, table, p) for p in self.include_tables):
+            return False
+        return not any(self.table_matches(schema, table, p) for p in self.exclude_tables)
+
+    def select(self, tables):
+        """Filter (schema, table, ...) tuples"""
+        return [table for table in tables if self.matches(table[0], table[1])]
+
+    @staticmethod
+    def pg_pattern(glob_pattern):
+        """Translate a glob into a pg_dump pattern; literal parts are quoted to keep their case"""
+        parts = []
+        for part in glob_pattern.split(".", 1):
+            translated = ""
+            for token in re.split(r"(\*|\?|\[[^\]]*\])", part):
+                if not token:
+                    continue
+                if token in ("*", "?"):
+                    translated += token
+                elif token.startswith("[") and token.endswith("]"):
+                    # fnmatch negates a class with [!...], pg_dump's regular expressions with [^...]
+                    translated += "[^" + token[2:] if token.startswith("[!") else token
+                else:
+                    translated += '"' + token.replace('"', '""') + '"'
+            parts.append(translated)
+        return ".".join(parts)
+
+    @staticmethod
+    def pg_table_pattern(glob_pattern):
+        """pg_dump -t/-T pattern; unqualified patterns match in every schema, as matches() does,
+        not just the ones on pg_dump's search_path"""
+        return TableFilter.pg_pattern(glob_pattern if "." in glob_pattern else f"*.{glob_pattern}")
+
+    def pg_dump_args(self):
+        """pg_dump -n/-N/-t/-T switches with the same meaning as matches()"""
+        args = []
+        exclude_tables = list(self.exclude_tables)
+        if self.include_tables:
+            # pg_dump ignores -n/-N once -t is given, so fold the schema filters into table patterns
+            for pattern in self.include_tables:
+                if "." in pattern or not self.include_schemas:
+                    args += ["-t", self.pg_table_pattern(pattern)]
+                else:
+                    args += [arg for schema in self.include_schemas
+                             for arg in ("-t", self.pg_table_pattern(f"{schema}.{pattern}"))]
+            exclude_tables += [f"{schema}.*" for schema in self.exclude_schemas]
+        else:
+            args += [arg for schema in self.include_schemas for arg in ("-n", self.pg_pattern(schema))]
+            args += [arg for schema in self.exclude_schemas for arg in ("-N", self.pg_pattern(schema))]
+        args += [arg for pattern in exclude_tables for arg in ("-T", self.pg_table_pattern(pattern))]
+        return args
+
+    def mysqldump_args(self, tables):
+        """--ignore-table for every (schema, table) the patterns leave out"""
+        return [f"--ignore-table={schema}.{table}" for schema, table in tables if not self.matches(schema, table)]
+
+class ExportCancelled(Exception):
+    pass
+
+DATABASE_CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError,
+                              pymysql.err.OperationalError, pymysql.err.InterfaceError)
+MYSQL_CONNECTION_LOST_CODES = (2006, 2013, 2055)  # Server gone away, lost during query, lost at handshake
+
+def connection_lost(connection, error):
+    """Whether ``error`` left the connection itself dead, rather than failing one statement
+
+    OperationalError also covers cancelled statements, deadlocks and a full
+    disk; only a dead connection is worth retrying on a new one.
+    """
+    if hasattr(connection, 'get_backend_pid'):
+        return bool(connection.closed) or (getattr(error, 'pgcode', None) or "").startswith("08")
+    if not getattr(connection, 'open', True) or isinstance(error, pymysql.err.InterfaceError):
+        return True
+    return bool(error.args) and error.args[0] in MYSQL_CONNECTION_LOST_CODES
+
+class ParallelCsvExport:
+    """Runs CSV export tasks concurrently and appends each finished entry to one archive
+
+    Archives are written as a stream, so only one entry can be open at a time:
+    workers spool their CSV (in memory, spilling to a temporary file) and the
+    finished entry is copied into the archive under a lock.
+    """
+
+    SPOOL_SIZE = 32 * 1024 * 1024
+
+    def __init__(self, connections, row_limiter, checkpoint=None, reconnect=None):
+        self.connections = queue.Queue()
+        for connection in connections:
+            self.connections.put(connection)
+        self.workers = len(connections)
+        self.row_limiter = row_limiter
+        self.checkpoint = checkpoint  # Stage entries for a resumable backup instead of archiving them
+        self.reconnect = reconnect  # Replaces a dropped worker connection on the same snapshot
+        self.archive_lock = threading.Lock()
+        self.cancelled = False
+
+    def check(self):
+        if self.cancelled:
+            raise ExportCancelled()
+
+    def run(self, tasks, archive, on_wait=None):
+        """Run [(entry name, task)]; a task is ``task(connection, binary_file, export) -> rows``"""
+        results = {}
+        if not tasks:
+            return results
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.run_task, name, task, archive): name for name, task in tasks}
+            pending = set(futures)
+            try:
+                while pending:
+                    done, pending = wait(pending, timeout=0.1, return_when=FIRST_EXCEPTION)
+                    for future in done:
+                        results[futures[future]] = future.result()
+                    if on_wait:
+                        on_wait()
+            except BaseException as e:
+                # Stop the other workers at their next batch instead of finishing every table
+                self.cancelled = True
+                for future in pending:
+                    future.cancel()
+                wait(pending)
+                # Report the failure that started it, not a worker that merely stopped
+                causes = [future.exception() for future in futures if future.done() and not future.cancelled()
+                          and future.exception() and not isinstance(future.exception(), ExportCancelled)]
+                if isinstance(e, ExportCancelled) and causes:
+                    raise causes[0]
+                raise
+        return results
+
+    def run_task(self, name, task, archive):
+        staged = self.checkpoint.entry_path(name) if self.checkpoint else None
+        connection = self.connections.get()
+        try:
+            for attempt in range(2):
+                output = open(staged + ".tmp", 'wb') if staged else tempfile.SpooledTemporaryFile(max_size=self.SPOOL_SIZE)
+                try:
+                    self.check()
+                    rows = task(connection, output, self)
+                    break
+                except DATABASE_CONNECTION_ERRORS as e:
+                    output.close()
+                    if attempt or not self.reconnect or self.cancelled or not connection_lost(connection, e):
+                        self.cancelled = True
+                        raise
+                    print(f"Connection lost while exporting {name}, retrying on the same snapshot")
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+                    try:
+                        connection = self.reconnect()
+                    except BaseException:
+                        self.cancelled = True
+                        raise
+                except BaseException:
+                    # A failed task may leave its connection mid-result; nothing else may use it
+                    output.close()
+                    self.cancelled = True
+                    raise
+        finally:
+            self.connections.put(connection)
+            
+        try:
+            if staged:
+                output.close()
+                os.replace(staged + ".tmp", staged)
+                self.checkpoint.mark_done(name, rows)
+                return rows
+                
+            output.seek(0)
+            with self.archive_lock:
+                self.check()
+                with archive.open(name, 'w', force_zip64=True) as entry:
+                    shutil.copyfileobj(output, entry, STREAM_CHUNK_SIZE)
+            return rows
+        finally:
+            output.close()
+
+def mysql_table_task(table, predicate=None):
+    """Export task streaming one MySQL table (or a key range of it) through an unbuffered cursor"""
+    def export(connection, output, job):
+        # No ``with``: closing an unbuffered cursor drains the rest of the result set
+        cursor = connection.cursor(pymysql.cursors.SSCursor)
+        query = f"SELECT * FROM {quote_mysql_identifier(table)}"
+        cursor.execute(query + (f" WHERE {predicate}" if predicate else ""))
+        csv_file = io.TextIOWrapper(output, encoding='utf-8', newline='')
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow([column[0] for column in cursor.description])
+        rows = 0
+        for batch in iter(lambda: cursor.fetchmany(1000), ()):
+            job.check()
+            job.row_limiter.consume(len(batch))
+            csv_writer.writerows(batch)
+            rows += len(batch)
+        csv_file.flush()
+        csv_file.detach()
+        cursor.close()
+        return rows
+    return export
+
+class CountingFile:
+    """File wrapper counting lines written, with row pacing and cancellation for COPY"""
+
+    def __init__(self, inner, job):
+        self.inner = inner
+        self.job = job
+        self.lines = 0
+
+    def write(self, data):
+        self.job.check()
+        lines = data.count(b"\n")
+        self.job.row_limiter.consume(lines)
+        self.lines += lines
+        return self.inner.write(data)
+
+def pg_table_task(schema, table, predicate=None):
+    """Export task running COPY for one PostgreSQL table (or a page/key range of it)"""
+    def export(connection, output, job):
+        source = f"{quote_pg_identifier(schema)}.{quote_pg_identifier(table)}"
+        if predicate:
+            source = f"(SELECT * FROM {source} WHERE {predicate})"
+        counter = CountingFile(output, job)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {source} TO STDOUT WITH CSV HEADER", counter)
+        return max(counter.lines - 1, 0)  # Approximate: quoted newlines count as rows
+    return export
+
+class PostgresSnapshot:
+    """N connections sharing one exported snapshot (pg_export_snapshot)
+
+    The exporting transaction stays open until close() so workers can keep
+    importing the snapshot; every worker reads the database as of that moment.
+    """
+
+    def __init__(self, connect, workers):
+        self.connect = connect
+        self.workers = max(1, workers)
+        self.control = None
+        self.connections = []
+        self.snapshot_id = None
+        self.info = {}
+
+    def open(self):
+        self.control = self.connect()
+        self.control.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        with self.control.cursor() as cursor:
+            cursor.execute("""
+                SELECT pg_export_snapshot(), pg_is_in_recovery(),
+                       CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() ELSE pg_current_wal_lsn() END::text
+            """)
+            snapshot_id, in_recovery, lsn = cursor.fetchone()
+            
+        self.snapshot_id = snapshot_id
+        for _ in range(self.workers):
+            self.connections.append(self.reconnect())
+                
+        self.info = {
+            'snapshot': snapshot_id,
+            'standby': in_recovery,
+            'lsn': lsn,
+            'workers': self.workers,
+            'taken_at': datetime.datetime.now().isoformat(timespec='seconds')
+        }
+
+    def reconnect(self):
+        """A worker connection on the snapshot; works as long as the exporting transaction lives"""
+        connection = self.connect()
+        try:
+            connection.set_session(isolation_level='REPEATABLE READ', readonly=True)
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION SNAPSHOT %s", (self.snapshot_id,))
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    def unlock(self):
+        pass  # Nothing is locked; kept for symmetry with MySQLSnapshot
+
+    def close(self):
+        for connection in [self.control] + self.connections:
+            try:
+                if connection:
+                    connection.close()
+            except Exception as e:
+                print(f"Error closing export connection: {e}")
+
+CHUNK_BYTES = 256 * 1024 * 1024
+MAX_CHUNKS = 64
+INTEGER_TYPES = ('smallint', 'integer', 'bigint', 'tinyint', 'mediumint', 'int')
+
+def key_range_predicates(column, bounds):
+    """WHERE clauses covering the whole key space, split at the sorted ``bounds``"""
+    bounds = sorted(set(bounds))
+    if not bounds:
+        return [None]
+    predicates = [f"{column} < {bounds[0]}"]
+    predicates += [f"{column} >= {low} AND {column} < {high}" for low, high in zip(bounds, bounds[1:])]
+    predicates.append(f"{column} >= {bounds[-1]}")
+    return predicates
+
+def pick_bounds(values, chunks):
+    """``chunks - 1`` split points taken evenly from sorted sample ``values``"""
+    if len(values) < 2:
+        return []
+    return [values[len(values) * i // chunks] for i in range(1, chunks)]
+
+def uniform_bounds(low, high, chunks):
+    if low is None or high is None or high <= low:
+        return []
+    return [low + (high - low) * i // chunks for i in range(1, chunks)]
+
+def plan_table_chunks(connection, db_type, schema, table, size_bytes):
+    """Split a large table for parallel export: ([WHERE clause or None, ...], method)
+
+    PostgreSQL 14+ splits by ctid page ranges (TID range scans). Otherwise an
+    integer single-column primary key is split at planner histogram bounds
+    (pg_stats, MySQL 8 column histograms) or, failing that, evenly between
+    MIN and MAX. The first and last ranges are open so rows added since the
+    statistics were gathered are still covered.
+    """
+    chunks = min(MAX_CHUNKS, -(-size_bytes // CHUNK_BYTES))
+    if chunks < 2:
+        return [None], None
+        
+    with connection.cursor() as cursor:
+        if db_type == "PostgreSQL":
+            relation = f"{quote_pg_identifier(schema)}.{quote_pg_identifier(table)}"
+            if connection.server_version >= 140000:
+                cursor.execute("SELECT relpages FROM pg_class WHERE oid = %s::regclass", (relation,))
+                pages = cursor.fetchone()[0]
+                bounds = uniform_bounds(0, pages, chunks)
+                connection.rollback()
+                if not bounds:
+                    return [None], None
+                predicates = [f"ctid < '({bounds[0]},0)'::tid"]
+                predicates += [f"ctid >= '({low},0)'::tid AND ctid < '({high},0)'::tid"
+                               for low, high in zip(bounds, bounds[1:])]
+                predicates.append(f"ctid >= '({bounds[-1]},0)'::tid")
+                return predicates, "ctid"
+                
+            cursor.execute("""
+                SELECT a.attname, format_type(a.atttypid, NULL)
+                FROM pg_index i
+                JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+                WHERE i.indrelid = %s::regclass AND i.indisprimary
+            """, (relation,))
+            key = cursor.fetchall()
+            if len(key) != 1 or key[0][1] not in INTEGER_TYPES:
+                connection.rollback()
+                return [None], None
+            column = key[0][0]
+            cursor.execute(
+                "SELECT histogram_bounds::text FROM pg_stats WHERE schemaname = %s AND tablename = %s AND attname = %s",
+                (schema, table, column)
+            )
+            row = cursor.fetchone()
+            bounds = pick_bounds([int(value) for value in row[0].strip("{}").split(",")], chunks) if row and row[0] else []
+            if not bounds:
+                cursor.execute(f"SELECT min({quote_pg_identifier(column)}), max({quote_pg_identifier(column)}) FROM {relation}")
+                bounds = uniform_bounds(*cursor.fetchone(), chunks)
+            connection.rollback()
+            return key_range_predicates(quote_pg_identifier(column), bounds), f"primary key {column}"
+            
+        cursor.execute("""
+            SELECT k.COLUMN_NAME, c.DATA_TYPE
+            FROM information_schema.KEY_COLUMN_USAGE k
+            JOIN information_schema.COLUMNS c
+              ON c.TABLE_SCHEMA = k.TABLE_SCHEMA AND c.TABLE_NAME = k.TABLE_NAME AND c.COLUMN_NAME = k.COLUMN_NAME
+            WHERE k.TABLE_SCHEMA = DATABASE() AND k.TABLE_NAME = %s AND k.CONSTRAINT_NAME = 'PRIMARY'
+        """, (table,))
+        key = cursor.fetchall()
+        if len(key) != 1 or key[0][1].lower() not in INTEGER_TYPES:
+            return [None], None
+        column = key[0][0]
+        bounds = []
+        try:
+            cursor.execute("""
+                SELECT HISTOGRAM FROM information_schema.COLUMN_STATISTICS
+                WHERE SCHEMA_NAME = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+            """, (table, column))
+            row = cursor.fetchone()
+            if row:
+                buckets = json.loads(row[0])['buckets']
+                # Equi-height buckets are [lower, upper, cumulative frequency, distinct]; singletons [value, frequency]
+                bounds = pick_bounds([int(bucket[1] if len(bucket) == 4 else bucket[0]) for bucket in buckets], chunks)
+        except pymysql.err.MySQLError:
+            pass  # No COLUMN_STATISTICS before MySQL 8.0
+        if not bounds:
+            cursor.execute(f"SELECT MIN({quote_mysql_identifier(column)}), MAX({quote_mysql_identifier(column)}) "
+                           f"FROM {quote_mysql_identifier(table)}")
+            bounds = uniform_bounds(*cursor.fetchone(), chunks)
+        return key_range_predicates(quote_mysql_identifier(column), bounds), f"primary key {column}"
+
+def csv_entry_name(schema, table, part=None, db_type="PostgreSQL"):
+    """Archive entry for a table or one of its chunks; PostgreSQL public and MySQL tables sit at the top level"""
+    base = table if db_type != "PostgreSQL" or schema == "public" else f"{schema}/{table}"
+    return f"{base}.part{part:04d}.csv" if part is not None else f"{base}.csv"
+
+def plan_csv_manifest(connection, db_type, tables, sizes, locked=()):
+    """Archive layout for the selected tables, large ones chunked, biggest first
+
+    Each item records its entries and their WHERE clauses so an interrupted
+    backup can be resumed with exactly the same layout. ``locked`` names
+    tables to export while MySQL's global read lock is held.
+    """
+    manifest = []
+    for schema, table in sorted(tables, key=lambda table: -sizes.get(table, 0)):
+        predicates, method = [None], None
+        try:
+            predicates, method = plan_table_chunks(connection, db_type, schema, table, sizes.get((schema, table), 0))
+        except Exception as e:
+            print(f"Error planning chunks for {table}, exporting it whole: {e}")
+            if db_type == "PostgreSQL":
+                connection.rollback()
+        manifest.append({
+            'schema': schema,
+            'table': table,
+            'chunked_by': method,
+            'locked': table in locked,
+            'entries': [csv_entry_name(schema, table, part if len(predicates) > 1 else None, db_type)
+                        for part in range(1, len(predicates) + 1)],
+            'ranges': predicates
+        })
+    return manifest
+
+def manifest_tasks(manifest, task_factory, done=()):
+    """Export tasks for the manifest entries not yet in ``done``"""
+    return [(name, task_factory(item['schema'], item['table'], predicate))
+            for item in manifest
+            for name, predicate in zip(item['entries'], item['ranges'])
+            if name not in done]
+
+class BackupCheckpoint:
+    """Progress of a resumable CSV backup, kept in a staging directory
+
+    Finished entries are staged as files and recorded in checkpoint.json, so a
+    resumed job skips them; the archive is assembled once every entry is done.
+    """
+
+    FILE = "checkpoint.json"
+
+    def __init__(self, directory, state):
+        self.directory = directory
+        self.state = state
+        self.lock = threading.Lock()
+
+    @classmethod
+    def create(cls, directory, backup_name, job, manifest):
+        os.makedirs(os.path.join(directory, "entries"), exist_ok=True)
+        checkpoint = cls(directory, {
+            'backup_name': backup_name,
+            'job': job,
+            'started': datetime.datetime.now().isoformat(timespec='seconds'),
+            'manifest': manifest,
+            'snapshots': [],
+            'done': {}
+        })
+        checkpoint.save()
+        return checkpoint
+
+    @classmethod
+    def find(cls, root, job):
+        """The newest unfinished checkpoint for the same job, or None"""
+        found = []
+        for name in os.listdir(root) if os.path.isdir(root) else []:
+            path = os.path.join(root, name, cls.FILE)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if state.get('job') == job:
+                found.append(cls(os.path.dirname(path), state))
+        return max(found, key=lambda checkpoint: checkpoint.state['started'], default=None)
+
+    @property
+    def backup_name(self):
+        return self.state['backup_name']
+
+    @property
+    def manifest(self):
+        return self.state['manifest']
+
+    @property
+    def done(self):
+        return self.state['done']
+
+    def total_entries(self):
+        return sum(len(item['entries']) for item in self.manifest)
+
+    def entry_path(self, name):
+        # Hashed names: table names may contain characters that are unsafe in paths
+        return os.path.join(self.directory, "entries", hashlib.sha1(name.encode('utf-8')).hexdigest() + ".csv")
+
+    def mark_done(self, name, rows):
+        with self.lock:
+            self.state['done'][name] = rows
+            self.save()
+
+    def add_snapshot(self, info):
+        with self.lock:
+            self.state['snapshots'].append(info)
+            self.save()
+
+    def save(self):
+        path = os.path.join(self.directory, self.FILE)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def assemble(self, archive):
+        for item in self.manifest:
+            for name in item['entries']:
+                with open(self.entry_path(name), 'rb') as source, archive.open(name, 'w', force_zip64=True) as entry:
+                    shutil.copyfileobj(source, entry, STREAM_CHUNK_SIZE)
+
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(self.directory))  # Only succeeds once no other job is staged
+        except OSError:
+            pass
+
+class MySQLSnapshot:
+    """N connections sharing one consistent InnoDB snapshot, plus its binlog position
+
+    FLUSH TABLES WITH READ LOCK is held only while the workers start their
+    ``WITH CONSISTENT SNAPSHOT`` transactions and non-transactional tables are
+    read. Without the RELOAD privilege the lock is unavailable, so a single
+    snapshot connection is used instead (still consistent, but serial).
+    """
+
+    def __init__(self, connect, workers):
+        self.connect = connect
+        self.workers = max(1, workers)
+        self.control = None
+        self.connections = []
+        self.locked = False
+        self.info = {}
+
+    def open(self):
+        self.control = self.connect()
+        try:
+            with self.control.cursor() as cursor:
+                cursor.execute("FLUSH TABLES WITH READ LOCK")
+            self.locked = True
+        except pymysql.err.MySQLError as e:
+            print(f"FLUSH TABLES WITH READ LOCK unavailable, exporting on one connection: {e}")
+            self.workers = 1
+            
+        for _ in range(self.workers):
+            connection = self.connect()
+            self.connections.append(connection)
+            with connection.cursor() as cursor:
+                cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+                
+        self.info = {
+            'coordinated': self.locked,
+            'workers': self.workers,
+            'taken_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            **self.binlog_position()
+        }
+
+    def binlog_position(self):
+        with self.control.cursor(pymysql.cursors.DictCursor) as cursor:
+            try:
+                cursor.execute("SHOW BINARY LOG STATUS")
+            except pymysql.err.MySQLError:
+                cursor.execute("SHOW MASTER STATUS")  # Before MySQL 8.2
+            row = cursor.fetchone()
+        if not row:
+            return {'binlog_file': None, 'binlog_position': None, 'gtid_executed': None}
+        return {
+            'binlog_file': row.get('File'),
+            'binlog_position': row.get('Position'),
+            'gtid_executed': (row.get('Executed_Gtid_Set') or "").replace("\n", "") or None
+        }
+
+    def unlock(self):
+        if self.locked:
+            with self.control.cursor() as cursor:
+                cursor.execute("UNLOCK TABLES")
+            self.locked = False
+
+    def close(self):
+        for connection in [self.control] + self.connections:
+            try:
+                if connection:
+                    connection.close()
+            except Exception as e:
+                print(f"Error closing export connection: {e}")
+
+CSV_ENTRY_RE = re.compile(r"^(?:(?P<schema>[^/]+)/)?(?P<table>[^/]+?)(?:\.part\d{4})?\.csv$")
+MYSQL_KEY_LINE_RE = re.compile(r"^(?:UNIQUE |FULLTEXT |SPATIAL )?KEY `((?:[^`]|``)+)`")
+MYSQL_FOREIGN_KEY_LINE_RE = re.compile(r"^CONSTRAINT `((?:[^`]|``)+)` FOREIGN KEY .*? REFERENCES (?:`(?:[^`]|``)+`\.)?`((?:[^`]|``)+)`")
+
+def csv_archive_tables(entries, db_type):
+    """{(schema, table): [entry names]} for the table data in a CSV backup; MySQL schemas are ""."""
+    tables = {}
+    for name in entries:
+        match = CSV_ENTRY_RE.match(name)
+        if match:
+            schema = match.group('schema') or ("public" if db_type == "PostgreSQL" else "")
+            tables.setdefault((schema, match.group('table')), []).append(name)
+    return tables
+
+def csv_load_task(db_type, schema, table, path, entry, nullable=None):
+    """Load task for one CSV entry of a backup archive into an existing table
+
+    CSV backups of MySQL write NULL as an empty field, so empty fields load
+    as NULL wherever ``nullable`` allows it.
+    """
+    def load(connection):
+        with zipfile.ZipFile(path) as archive, archive.open(entry) as raw:
+            if db_type == "PostgreSQL":
+                header = next(csv.reader([raw.readline().decode('utf-8')]), None)
+                if not header:
+                    return 0
+                columns = ", ".join(quote_pg_identifier(column) for column in header)
+                with connection.cursor() as cursor:
+                    cursor.copy_expert(f"COPY {quote_pg_identifier(schema)}.{quote_pg_identifier(table)} "
+                                       f"({columns}) FROM STDIN WITH (FORMAT csv)", raw)
+                    return cursor.rowcount
+                    
+            reader = csv.reader(io.TextIOWrapper(raw, encoding='utf-8', newline=''))
+            header = next(reader, None)
+            if not header:
+                return 0
+            nulls = [(nullable or {}).get(column, False) for column in header]
+            statement = (f"INSERT INTO {quote_mysql_identifier(table)} "
+                         f"({', '.join(quote_mysql_identifier(column) for column in header)}) "
+                         f"VALUES ({', '.join(['%s'] * len(header))})")
+            rows = 0
+            with connection.cursor() as cursor:
+                for batch in iter(lambda: list(itertools.islice(reader, 1000)), []):
+                    cursor.executemany(statement, [[None if value == "" and null else value
+                                                    for value, null in zip(row, nulls)] for row in batch])
+                    rows += len(batch)
+            return rows
+    return load
+
+def statement_task(statement):
+    def run(connection):
+        with connection.cursor() as cursor:
+            cursor.execute(statement)
+    return run
+
+def run_on_connections(connect, tasks, workers, session=(), on_wait=None):
+    """Run independent tasks, ``task(connection) -> result``, over up to ``workers`` new connections
+
+    Each connection first runs the ``session`` statements and every task is
+    committed on its own. A failed task does not stop the others, so a
+    rebuild restores as much as it can; failures are raised together at the
+    end. Returns {label: (seconds, result)}.
+    """
+    results, failures = {}, []
+    if not tasks:
+        return results
+    connections = queue.Queue()
+    opened = []
+    
+    def run(label, task):
+        connection = connections.get()
+        started = time.perf_counter()
+        try:
+            result = task(connection)
+            connection.commit()
+            results[label] = (time.perf_counter() - started, result)
+        except Exception as e:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+            failures.append(f"{label}: {e}")
+        finally:
+            connections.put(connection)
+            
+    try:
+        for _ in range(min(workers, len(tasks))):
+            connection = connect()
+            opened.append(connection)
+            with connection.cursor() as cursor:
+                for statement in session:
+                    cursor.execute(statement)
+            connection.commit()
+            connections.put(connection)
+        with ThreadPoolExecutor(max_workers=len(opened)) as executor:
+            pending = {executor.submit(run, label, task) for label, task in tasks}
+            try:
+                while pending:
+                    _, pending = wait(pending, timeout=0.1)
+                    if on_wait:
+                        on_wait()
+            except BaseException:
+                # A cancelled restore starts nothing new; the running tasks finish or fail first
+                for future in pending:
+                    future.cancel()
+                raise
+    finally:
+        for connection in opened:
+            try:
+                connection.close()
+            except Exception as e:
+                print(f"Error closing restore connection: {e}")
+    if failures:
+        raise Exception("\n".join(failures))
+    return results
+
+class DeferredIndexes:
+    """Indexes, keys and foreign keys of tables about to be bulk loaded
+
+    capture() reads their definitions from the catalog and drop() removes
+    them. They come back in two steps: indexes and keys, which are
+    independent and build concurrently, then foreign keys, which need the
+    keys. PostgreSQL foreign keys are added NOT VALID and validated
+    concurrently afterwards; MySQL ones are added with checks off, as
+    mysqldump output does, since the data comes from one snapshot.
+    """
+
+    DROP_ORDER = ('foreign key', 'key', 'index')
+
+    def __init__(self, db_type):
+        self.db_type = db_type
+        self.items = []  # {'kind', 'table': (schema, table), 'name', 'drop', 'build', 'validate'}
+        self.dropped = []
+        
+    def capture(self, connection, tables):
+        if self.db_type == "PostgreSQL":
+            self.capture_postgres(connection, tables)
+        else:
+            self.capture_mysql(connection, tables)
+            
+    def capture_postgres(self, connection, tables):
+        names = [f"{quote_pg_identifier(schema)}.{quote_pg_identifier(table)}" for schema, table in tables]
+        with connection.cursor() as cursor:
+            # Foreign keys pointing at the tables go too, or their keys could not be dropped
+            cursor.execute("""
+                SELECT n.nspname, t.relname, c.conname, c.contype, pg_get_constraintdef(c.oid)
+                FROM pg_constraint c
+                JOIN pg_class t ON t.oid = c.conrelid
+                JOIN pg_namespace n ON n.oid = t.relnamespace
+                WHERE (c.conrelid = ANY(%s::regclass[]) OR (c.contype = 'f' AND c.confrelid = ANY(%s::regclass[])))
+                AND c.contype IN ('p', 'u', 'x', 'f') AND c.coninhcount = 0
+                AND t.relkind = 'r' AND NOT t.relispartition
+                ORDER BY 1, 2, 3
+            """, (names, names))
+            constraints = cursor.fetchall()
+            cursor.execute("""
+                SELECT n.nspname, t.relname, x.relname, pg_get_indexdef(i.indexrelid)
+                FROM pg_index i
+                JOIN pg_class t ON t.oid = i.indrelid
+                JOIN pg_class x ON x.oid = i.indexrelid
+                JOIN pg_namespace n ON n.oid = t.relnamespace
+                WHERE i.indrelid = ANY(%s::regclass[]) AND NOT i.indisreplident
+                AND t.relkind = 'r' AND NOT t.relispartition
+                AND NOT EXISTS (SELECT 1 FROM pg_constraint c
+                                WHERE c.conindid = i.indexrelid AND c.contype IN ('p', 'u', 'x'))
+                ORDER BY 1, 2, 3
+            """, (names,))
+            indexes = cursor.fetchall()
+        connection.rollback()
+        
+        for schema, table, name, kind, definition in constraints:
+            relation = f"{quote_pg_identifier(schema)}.{quote_pg_identifier(table)}"
+            constraint = quote_pg_identifier(name)
+            item = {'kind': 'foreign key' if kind == 'f' else 'key', 'table': (schema, table), 'name': name,
+                    'drop': f"ALTER TABLE {relation} DROP CONSTRAINT {constraint}",
+                    'build': f"ALTER TABLE {relation} ADD CONSTRAINT {constraint} {definition}", 'validate': None}
+            if kind == 'f' and not definition.endswith("NOT VALID"):
+                item['build'] += " NOT VALID"
+                item['validate'] = f"ALTER TABLE {relation} VALIDATE CONSTRAINT {constraint}"
+            self.items.append(item)
+        for schema, table, name, definition in indexes:
+            self.items.append({'kind': 'index', 'table': (schema, table), 'name': name,
+                               'drop': f"DROP INDEX {quote_pg_identifier(schema)}.{quote_pg_identifier(name)}",
+                               'build': definition, 'validate': None})
+            
+    def capture_mysql(self, connection, tables):
+        names = {table for _, table in tables}
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT DISTINCT TABLE_NAME
+                FROM information_schema.REFERENTIAL_CONSTRAINTS
+                WHERE CONSTRAINT_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IN %s
+            """, (sorted(names),))
+            referencing = {row[0] for row in cursor.fetchall()}
+            for table in sorted(names | referencing):
+                cursor.execute(f"SHOW CREATE TABLE {quote_mysql_identifier(table)}")
+                quoted = quote_mysql_identifier(table)
+                # Key and constraint lines of SHOW CREATE TABLE are valid ALTER TABLE ... ADD clauses
+                for line in cursor.fetchone()[1].split("\n")[1:]:
+                    line = line.strip().rstrip(",")
+                    foreign = MYSQL_FOREIGN_KEY_LINE_RE.match(line)
+                    key = MYSQL_KEY_LINE_RE.match(line)
+                    if foreign and (table in names or foreign.group(2).replace('``', '`') in names):
+                        name = foreign.group(1).replace('``', '`')
+                        self.items.append({'kind': 'foreign key', 'table': ("", table), 'name': name,
+                                           'drop': f"ALTER TABLE {quoted} DROP FOREIGN KEY {quote_mysql_identifier(name)}",
+                                           'build': f"ADD {line}", 'validate': None})
+                    elif key and table in names:
+                        name = key.group(1).replace('``', '`')
+                        self.items.append({'kind': 'key', 'table': ("", table), 'name': name,
+                                           'drop': f"ALTER TABLE {quoted} DROP INDEX {quote_mysql_identifier(name)}",
+                                           'build': f"ADD {line}", 'validate': None})
+        connection.commit()
+        
+    def drop(self, cursor):
+        """Drop everything captured, foreign keys first; ``dropped`` tracks what is gone"""
+        for item in sorted(self.items, key=lambda item: self.DROP_ORDER.index(item['kind'])):
+            cursor.execute(item['drop'])
+            self.dropped.append(item)
+            
+    def statements(self, items, kinds, weights=None):
+        """(label, statement) pairs rebuilding ``items`` of the given kinds, biggest tables
+        first; MySQL gets one ALTER per table"""
+        items = [item for item in items if item['kind'] in kinds]
+        if self.db_type == "PostgreSQL":
+            groups = [(item['table'], [item], item['build']) for item in items]
+        else:
+            # One ALTER builds all of a table's secondary indexes in a single pass; InnoDB adds FULLTEXT ones singly
+            grouped = {}
+            for item in items:
+                single = item['build'].startswith("ADD FULLTEXT") and item['name']
+                grouped.setdefault((item['table'], single), []).append(item)
+            groups = [(table, group, f"ALTER TABLE {quote_mysql_identifier(table[1])} "
+                       + ", ".join(item['build'] for item in group))
+                      for (table, _), group in grouped.items()]
+        groups.sort(key=lambda group: -(weights or {}).get(group[0], 0))
+        return [(f"{', '.join(item['name'] for item in group)} on {table[1]}", statement)
+                for table, group, statement in groups]
+                
+    def validations(self):
+        return [(f"{item['name']} on {item['table'][1]}", item['validate'])
+                for item in self.dropped if item['validate']]
+                
+    def script(self):
+        """SQL recreating everything captured, kept while the tables are without it"""
+        statements = self.statements(self.items, ('key', 'index')) + self.statements(self.items, ('foreign key',))
+        statements += [(item['name'], item['validate']) for item in self.items if item['validate']]
+        prefix = "SET SESSION foreign_key_checks=0;\n" if self.db_type == "MySQL" else ""
+        return prefix + "".join(f"{statement};\n" for _, statement in statements)
+
+class BackupEstimator:
+    """Predicts backup size and duration from catalog statistics and past runs"""
+
+    # Output bytes per byte of table data when there is no history yet
+    DEFAULT_SIZE_RATIO = {'sql': 0.9, 'csv': 0.3, 'base backup': 0.4}
+    DEFAULT_THROUGHPUT = 20 * 1024 * 1024
+    FREE_SPACE_HEADROOM = 1.1
+
+    def __init__(self, history):
+        self.history = history
+
+    def estimate(self, tables, db_type, database, backup_format):
+        """Returns a dict with source_bytes, rows, size, seconds and the number of runs it is based on"""
+        source_bytes = sum(table[3] for table in tables)
+        rows = sum(table[2] for table in tables)
+        runs = [run for run in self.history.successful_runs(db_type, database, backup_format)
+                if run['source_bytes'] and run['finished']]
+        
+        if runs:
+            ratio = statistics.median(run['bytes'] / run['source_bytes'] for run in runs)
+            throughput = statistics.median(run_throughput(run) for run in runs)
+        else:
+            ratio = self.DEFAULT_SIZE_RATIO.get(backup_format, 1.0)
+            throughput = self.DEFAULT_THROUGHPUT
+            
+        size = int(source_bytes * ratio)
+        return {
+            'source_bytes': source_bytes,
+            'rows': rows,
+            'size': size,
+            'seconds': size / throughput,
+            'runs': len(runs)
+        }
+
+    def has_room(self, estimate, free_space):
+        return free_space is None or estimate['size'] * self.FREE_SPACE_HEADROOM <= free_space
+
+WAL_FILE_RE = re.compile(r"^(?:[0-9A-F]{24}|[0-9A-F]{8}\.history)$")
+WAL_POLL_SECONDS = 5
+
+def parse_lsn(text):
+    high, low = text.split('/')
+    return (int(high, 16) << 32) + int(low, 16)
+
+def format_lsn(lsn):
+    return f"{lsn >> 32:X}/{lsn & 0xFFFFFFFF:X}"
+
+def wal_segment_name(timeline, number, segment_size):
+    per_id = 0x100000000 // segment_size
+    return f"{timeline:08X}{number // per_id:08X}{number % per_id:08X}"
+
+def wal_segment_start(name, segment_size):
+    """Start LSN of a WAL segment file name"""
+    per_id = 0x100000000 // segment_size
+    return (int(name[8:16], 16) * per_id + int(name[16:24], 16)) * segment_size
+
+def read_backup_label(data_directory):
+    """Start LSN, timeline and start time of a physical base backup"""
+    with open(os.path.join(data_directory, 'backup_label'), 'r') as f:
+        text = f.read()
+    match = re.search(r"START WAL LOCATION: ([0-9A-F]+/[0-9A-F]+) \(file ([0-9A-F]{24})\)", text)
+    if not match:
+        raise ValueError("backup_label has no START WAL LOCATION")
+    started = re.search(r"START TIME: (.+)", text)
+    return {
+        'start_lsn': parse_lsn(match.group(1)),
+        'timeline': int(match.group(2)[:8], 16),
+        'start_time': started.group(1).strip() if started else None
+    }
+
+def quote_pg_setting(value):
+    return "'" + value.replace("\\", "\\\\").replace("'", "''") + "'"
+
+def write_recovery_settings(data_directory, restore_command, target_time=None):
+    """Set up archive recovery in a data directory; returns the file written
+
+    Without a target time recovery replays all archived WAL.
+    """
+    with open(os.path.join(data_directory, 'PG_VERSION'), 'r') as f:
+        major = int(f.read().strip().split('.')[0])
+    settings = [('restore_command', restore_command)]
+    if target_time:
+        settings += [
+            ('recovery_target_time', target_time.astimezone().strftime('%Y-%m-%d %H:%M:%S%z')),
+            ('recovery_target_action', 'promote')
+        ]
+    lines = ["# Point-in-time recovery, set up by Database Backup Manager"]
+    lines += [f"{name} = {quote_pg_setting(value)}" for name, value in settings]
+
+    if major >= 12:
+        # recovery.conf is gone; settings live in the main config and a signal file starts recovery
+        path = os.path.join(data_directory, 'postgresql.auto.conf')
+        with open(path, 'a') as f:
+            f.write("\n" + "\n".join(lines) + "\n")
+        open(os.path.join(data_directory, 'recovery.signal'), 'w').close()
+    else:
+        path = os.path.join(data_directory, 'recovery.conf')
+        with open(path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+    return path
+
+def gzip_into(source, directory, name):
+    """Gzip a file to ``directory/name.gz`` atomically; returns the stored size"""
+    target = os.path.join(directory, f"{name}.gz")
+    with open(source, 'rb') as src, open(target + '.tmp', 'wb') as raw:
+        with gzip.GzipFile(filename=name, mode='wb', fileobj=raw, compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(target + '.tmp', target)
+    return os.path.getsize(target)
+
+class SupervisedProcess:
+    """Keeps a long-running client tool alive, restarting it with backoff when it exits
+
+    ``command`` is called before every start so a restart can pick up where
+    the previous run stopped. The tail of the tool's output is kept for the UI.
+    """
+
+    MAX_BACKOFF = 60
+    STABLE_SECONDS = 60  # A run at least this long resets the backoff
+
+    def __init__(self, name, command, env=None, supervisor=None):
+        self.name = name
+        self.command = command
+        self.env = env
+        self.supervisor = supervisor  # Optional ProcessSupervisor accounting for each run
+        self.process = None
+        self.restarts = 0
+        self.last_exit = None
+        self.output = collections.deque(maxlen=200)
+        self.stopping = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.supervise, name=self.name, daemon=True)
+        self.thread.start()
+
+    def supervise(self):
+        backoff = 1
+        while not self.stopping.is_set():
+            started = time.time()
+            try:
+                popen_args = dict(env=self.env, stdin=subprocess.DEVNULL,
+                                  stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                if self.supervisor:
+                    self.process = self.supervisor.start(self.command(), name=self.name, kind="archiver", **popen_args)
+                else:
+                    self.process = subprocess.Popen(self.command(), **popen_args)
+            except Exception as e:
+                self.last_exit = f"failed to start: {e}"
+            else:
+                for line in self.process.stdout:
+                    self.output.append(line.decode(errors='replace').rstrip())
+                self.last_exit = f"exited with code {self.process.wait()}"
+            if self.stopping.is_set():
+                break
+            self.restarts += 1
+            backoff = 1 if time.time() - started >= self.STABLE_SECONDS else min(backoff * 2, self.MAX_BACKOFF)
+            self.output.append(f"{self.name} {self.last_exit}; restarting in {backoff} s")
+            self.stopping.wait(backoff)
+
+    def stop(self, timeout=10):
+        self.stopping.set()
+        process = self.process
+        if process and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if self.thread:
+            self.thread.join(timeout)
+
+class WalArchive:
+    """Compressed WAL segments in a local directory, catalogued in the schedule database
+
+    pg_receivewal writes into ``incoming``; finished segments are gzipped into
+    the archive directory and recorded with their timeline, start LSN and the
+    time they were archived, which bounds the latest point they can recover.
+    """
+
+    def __init__(self, directory, catalog=SCHEDULE_DB):
+        self.directory = os.path.abspath(directory)
+        self.spool = os.path.join(self.directory, 'incoming')
+        self.catalog = catalog
+        with self.connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS wal_segments (
+                    archive TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    timeline INTEGER,
+                    start_lsn INTEGER,
+                    size INTEGER,
+                    stored_size INTEGER,
+                    archived REAL,
+                    PRIMARY KEY (archive, name)
+                )
+            """)
+
+    def connect(self):
+        return sqlite3.connect(self.catalog, timeout=30)
+
+    def prepare(self):
+        os.makedirs(self.spool, exist_ok=True)
+
+    def archived_names(self):
+        with self.connect() as db:
+            return {row[0] for row in db.execute("SELECT name FROM wal_segments WHERE archive = ?", (self.directory,))}
+
+    def archive_ready(self):
+        """Move finished files out of the spool; returns how many were archived
+
+        The newest finished segment stays in the spool (already archived) so a
+        restarted pg_receivewal continues after it instead of at the server's
+        current position.
+        """
+        names = sorted(name for name in os.listdir(self.spool) if WAL_FILE_RE.match(name))
+        done = self.archived_names()
+        segments = [name for name in names if not name.endswith('.history')]
+        keep = segments[-1] if segments else None
+        archived = 0
+
+        for name in names:
+            path = os.path.join(self.spool, name)
+            if name not in done:
+                size = os.path.getsize(path)
+                stored = gzip_into(path, self.directory, name)
+                history = name.endswith('.history')
+                with self.connect() as db:
+                    db.execute(
+                        "INSERT OR REPLACE INTO wal_segments (archive, name, timeline, start_lsn, size, stored_size, archived) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (self.directory, name, int(name[:8], 16),
+                         None if history else wal_segment_start(name, size), size, stored, time.time())
+                    )
+                archived += 1
+            if name != keep:
+                os.remove(path)
+        return archived
+
+    def stage_partial(self):
+        """Compress pg_receivewal's in-progress segment into the archive, uncatalogued
+
+        Lets a restore replay WAL that has not filled a segment yet; the
+        finished segment replaces it once it completes. Returns (name, mtime)
+        or None.
+        """
+        partials = sorted(name for name in os.listdir(self.spool) if name.endswith('.partial'))
+        if not partials:
+            return None
+        name = partials[-1][:-len('.partial')]
+        path = os.path.join(self.spool, partials[-1])
+        modified = os.path.getmtime(path)
+        gzip_into(path, self.directory, name)
+        return name, modified
+
+    def segments(self):
+        with self.connect() as db:
+            db.row_factory = sqlite3.Row
+            return [dict(row) for row in db.execute(
+                "SELECT * FROM wal_segments WHERE archive = ? AND start_lsn IS NOT NULL ORDER BY start_lsn, timeline",
+                (self.directory,)
+            )]
+
+    def summary(self):
+        with self.connect() as db:
+            return db.execute(
+                "SELECT count(*), sum(size), sum(stored_size), min(name), max(name), max(archived) "
+                "FROM wal_segments WHERE archive = ? AND start_lsn IS NOT NULL", (self.directory,)
+            ).fetchone()
+
+    def coverage(self, start_lsn, timeline, target):
+        """How far the archive replays from a base backup towards a target timestamp
+
+        Walks segments from the one holding ``start_lsn``; raises ValueError
+        when that segment or one before the target is missing. Returns the
+        next segment number needed, the archive time reached and whether the
+        target is covered.
+        """
+        segments = [segment for segment in self.segments() if segment['timeline'] >= timeline]
+        if not segments:
+            raise ValueError("The WAL archive is empty")
+        segment_size = segments[0]['size']
+        by_number = {}
+        for segment in segments:
+            number = segment['start_lsn'] // segment_size
+            if number not in by_number or segment['archived'] > by_number[number]['archived']:
+                by_number[number] = segment
+
+        number = start_lsn // segment_size
+        if number not in by_number:
+            raise ValueError(
+                f"The archive has no WAL from the base backup's start ({format_lsn(start_lsn)}); "
+                "the backup predates archiving or the segment was lost"
+            )
+        reached = None
+        while number in by_number:
+            reached = by_number[number]['archived']
+            number += 1
+            if reached >= target:
+                return {'next': number, 'reached': reached, 'covered': True, 'segment_size': segment_size}
+        if any(later > number for later in by_number):
+            missing = wal_segment_name(timeline, number, segment_size)
+            raise ValueError(f"WAL segment {missing} is missing from the archive; recovery cannot get past it")
+        return {'next': number, 'reached': reached, 'covered': False, 'segment_size': segment_size}
+
+    def restore_command(self):
+        """restore_command that decompresses archived files for the server"""
+        script = ("import gzip,os,shutil,sys; os.path.exists(sys.argv[1]) or sys.exit(1); "
+                  "shutil.copyfileobj(gzip.open(sys.argv[1]), open(sys.argv[2], 'wb'))")
+        source = os.path.join(self.directory, '%f.gz')
+        return f'"{sys.executable}" -c "{script}" "{source}" "%p"'
+
+class ContinuousArchiver:
+    """A streaming tool under supervision, plus a thread moving its finished files into an archive
+
+    Used for pg_receivewal with a WalArchive and mysqlbinlog with a BinlogArchive.
+    """
+
+    def __init__(self, tool, archive, command, env=None, supervisor=None):
+        self.archive = archive
+        self.receiver = SupervisedProcess(tool, command, env, supervisor)
+        self.stopping = threading.Event()
+        self.thread = None
+        self.archived = 0
+        self.last_error = None
+
+    def start(self):
+        self.archive.prepare()
+        self.receiver.start()
+        self.thread = threading.Thread(target=self.run, name=f"{self.receiver.name}-archiver", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stopping.wait(WAL_POLL_SECONDS):
+            self.sweep()
+        self.sweep()
+
+    def sweep(self):
+        try:
+            self.archived += self.archive.archive_ready()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error archiving {self.receiver.name} output: {e}")
+
+    def stop(self):
+        self.receiver.stop()
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(30)
+
+BINLOG_FILE_RE = re.compile(r"^(.+)\.(\d{6,})$")
+BINLOG_MAGIC = b'\xfebin'
+
+def binlog_start_time(path):
+    """Timestamp of a binlog's first event, i.e. when the server rotated away from the previous file
+
+    Reads the format description event header of a raw or gzipped binlog;
+    None if the file is too short or not a binlog.
+    """
+    try:
+        with (gzip.open if path.endswith('.gz') else open)(path, 'rb') as f:
+            header = f.read(8)
+    except OSError:
+        return None
+    if len(header) < 8 or header[:4] != BINLOG_MAGIC:
+        return None
+    return struct.unpack('<I', header[4:8])[0] or None
+BINLOG_POSITION_RE = re.compile(
+    r"CHANGE (?:MASTER|REPLICATION SOURCE) TO (?:MASTER|SOURCE)_LOG_FILE='([^']+)', (?:MASTER|SOURCE)_LOG_POS=(\d+)"
+)
+
+def find_binlog_position(head):
+    """(file, position) from the --source-data comment at the top of a mysqldump, or None"""
+    match = BINLOG_POSITION_RE.search(head.decode('utf-8', errors='replace'))
+    return (match.group(1), int(match.group(2))) if match else None
+
+class HeadCapture:
+    """Passes writes through, keeping the first bytes for inspection"""
+
+    def __init__(self, inner, limit=1024 * 1024):
+        self.inner = inner
+        self.limit = limit
+        self.head = bytearray()
+
+    def write(self, data):
+        if len(self.head) < self.limit:
+            self.head += data[:self.limit - len(self.head)]
+        self.inner.write(data)
+
+class BinlogArchive:
+    """MySQL binary logs streamed by mysqlbinlog, gzipped into a local directory and catalogued
+
+    mysqlbinlog writes raw copies into ``incoming``. A file is complete once
+    the server has rotated to the next one; the newest stays in the spool so
+    a restarted mysqlbinlog re-fetches it and carries on.
+    """
+
+    def __init__(self, directory, catalog=SCHEDULE_DB):
+        self.directory = os.path.abspath(directory)
+        self.spool = os.path.join(self.directory, 'incoming')
+        self.catalog = catalog
+        with self.connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS binlog_files (
+                    archive TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    sequence INTEGER,
+                    size INTEGER,
+                    stored_size INTEGER,
+                    closed REAL,
+                    archived REAL,
+                    PRIMARY KEY (archive, name)
+                )
+            """)
+
+    def connect(self):
+        return sqlite3.connect(self.catalog, timeout=30)
+
+    def prepare(self):
+        os.makedirs(self.spool, exist_ok=True)
+
+    def spool_files(self):
+        """[(sequence, name)] of the raw binlogs in the spool, oldest first"""
+        files = []
+        for name in os.listdir(self.spool):
+            match = BINLOG_FILE_RE.match(name)
+            if match:
+                files.append((int(match.group(2)), name))
+        return sorted(files)
+
+    def archive_ready(self):
+        """Compress every binlog the server has rotated away from; returns how many"""
+        files = self.spool_files()
+        complete = files[:-1]
+        for (sequence, name), (_, following) in zip(complete, files[1:]):
+            path = os.path.join(self.spool, name)
+            # The file's mtime is only when it was fetched, which after a catch-up is long after it closed
+            closed = binlog_start_time(os.path.join(self.spool, following)) or os.path.getmtime(path)
+            size = os.path.getsize(path)
+            stored = gzip_into(path, self.directory, name)
+            with self.connect() as db:
+                db.execute(
+                    "INSERT OR REPLACE INTO binlog_files (archive, name, sequence, size, stored_size, closed, archived) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self.directory, name, sequence, size, stored, closed, time.time())
+                )
+            os.remove(path)
+        return len(complete)
+
+    def resume_file(self):
+        """Binlog to start streaming from: the newest one we hold, else None"""
+        files = self.spool_files()
+        if files:
+            return files[-1][1]
+        with self.connect() as db:
+            row = db.execute(
+                "SELECT name, sequence FROM binlog_files WHERE archive = ? ORDER BY sequence DESC LIMIT 1",
+                (self.directory,)
+            ).fetchone()
+        if not row:
+            return None
+        match = BINLOG_FILE_RE.match(row[0])
+        return f"{match.group(1)}.{row[1] + 1:0{len(match.group(2))}d}"
+
+    def summary(self):
+        with self.connect() as db:
+            return db.execute(
+                "SELECT count(*), sum(size), sum(stored_size), min(name), max(name), max(closed) "
+                "FROM binlog_files WHERE archive = ?", (self.directory,)
+            ).fetchone()
+
+    def replay_files(self, first_file, target):
+        """Binlogs to replay from ``first_file`` towards a target timestamp
+
+        Every contiguous file is returned: mysqlbinlog's --stop-datetime cuts
+        the replay at the target, and close times only tell whether the
+        archive reaches it. Archived files are gzipped; files still in the
+        spool (including the one being streamed) are used as they are.
+        Raises ValueError when the first file or one in between is missing.
+        """
+        match = BINLOG_FILE_RE.match(first_file)
+        if not match:
+            raise ValueError(f"Unexpected binlog file name: {first_file}")
+        base, width = match.group(1), len(match.group(2))
+        with self.connect() as db:
+            archived = {
+                sequence: (name, closed) for name, sequence, closed in db.execute(
+                    "SELECT name, sequence, closed FROM binlog_files WHERE archive = ?", (self.directory,)
+                ) if BINLOG_FILE_RE.match(name).group(1) == base
+            }
+        spooled = {sequence: name for sequence, name in self.spool_files()
+                   if BINLOG_FILE_RE.match(name).group(1) == base}
+
+        sequence = int(match.group(2))
+        files = []
+        reached = None
+        while sequence in archived or sequence in spooled:
+            if sequence in archived:
+                name, reached = archived[sequence]
+                files.append((name, os.path.join(self.directory, f"{name}.gz")))
+            else:
+                path = os.path.join(self.spool, spooled[sequence])
+                following = spooled.get(sequence + 1)
+                reached = (following and binlog_start_time(os.path.join(self.spool, following))) or os.path.getmtime(path)
+                files.append((spooled[sequence], path))
+            sequence += 1
+
+        if not files:
+            raise ValueError(f"{first_file} is not in the binlog archive; streaming started after this backup was taken")
+        covered = reached >= target
+        if not covered and any(later > sequence for later in list(archived) + list(spooled)):
+            raise ValueError(f"Binlog {base}.{sequence:0{width}d} is missing from the archive; replay cannot get past it")
+        return {'files': files, 'reached': reached, 'covered': covered}
+
+def scheduled_backup_job(due=None):
+    """Scheduler entry point; a module-level function so jobs can be persisted by reference"""
+    DatabaseBackupApp.instance.run_scheduled_backup(due)
+
 class DatabaseBackupApp(QMainWindow):
+    instance = None  # The running window, for persisted scheduler jobs
+    gui_call = pyqtSignal(object)  # Work handed to the GUI thread by the scheduler and worker threads
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Database Backup Manager")
         self.setGeometry(100, 100, 900, 700)
         
         self.connection = None
+        self.connection_details = None  # Host, port, ... of self.connection, read on the GUI thread
         self.current_db_type = None
         self.current_postgres_service = None
         self.current_mysql_service = None
@@ -51,12 +4531,28 @@ class DatabaseBackupApp(QMainWindow):
         self.pg_restore_path = None
         self.mysqldump_path = None
         self.mysql_path = None
+        self.tool_registry = ToolRegistry()
         self.max_backups = 3
-        self.background_processes = []  # Track background processes
+        self.supervisor = ProcessSupervisor()  # Every tool the app starts, with its resource figures
+        self.backup_running = False
+        self.active_job = None  # JobControl of the backup or restore in progress
+        self.activity_monitor = None  # Server activity polling, while the Activity tab's monitor runs
+        self.activity_polls_shown = 0
+        self.wal_archiver = None  # Continuous WAL archiving, while running
+        self.binlog_archiver = None  # Continuous binlog streaming, while running
+        self.last_run_deferral = 0  # Seconds the last scheduled backup waited for load to drop
+        self.write_limiter = TokenBucket(on_wait=self.pump_events)
+        self.row_limiter = TokenBucket(on_wait=self.pump_events)
+        self.gui_call.connect(lambda function: function())
         
-        # Initialize scheduler
-        self.scheduler = BackgroundScheduler()
-        self.scheduler.start()
+        # Initialize scheduler; jobs persist in SQLite and start once the UI and config are loaded
+        DatabaseBackupApp.instance = self
+        self.pending_scheduled_run = None  # Due time of a catch-up run waiting for a connection
+        self.history = BackupHistory(SCHEDULE_DB)
+        self.estimator = BackupEstimator(self.history)
+        self.scheduler = BackgroundScheduler(jobstores={'default': SQLiteJobStore(SCHEDULE_DB)})
+        self.scheduler.add_listener(self.record_missed_run, EVENT_JOB_MISSED)
+        self.scheduler.start(paused=True)
         
         # Check for admin rights on Windows
         if platform.system() == 'Windows':
@@ -65,6 +4561,8 @@ class DatabaseBackupApp(QMainWindow):
         self.init_ui()
         self.load_config()
         self.find_database_tools()
+        self.scheduler.resume()
+        self.restore_schedule_state()
     
     def check_admin_privileges(self):
         """Check if running with admin privileges on Windows"""
@@ -97,6 +4595,31 @@ class DatabaseBackupApp(QMainWindow):
         tabs.addTab(user_tab, "User Management")
         self.setup_user_tab(user_tab)
         
+        # Role Graph Tab (PostgreSQL)
+        roles_tab = QWidget()
+        tabs.addTab(roles_tab, "Role Graph")
+        self.setup_roles_tab(roles_tab)
+        
+        # History tab
+        history_tab = QWidget()
+        tabs.addTab(history_tab, "History")
+        self.setup_history_tab(history_tab)
+        
+        # Point-in-time recovery tab
+        pitr_tab = QWidget()
+        tabs.addTab(pitr_tab, "Point-in-Time")
+        self.setup_pitr_tab(pitr_tab)
+        
+        # Processes tab
+        processes_tab = QWidget()
+        tabs.addTab(processes_tab, "Processes")
+        self.setup_processes_tab(processes_tab)
+        
+        # Server activity tab
+        activity_tab = QWidget()
+        tabs.addTab(activity_tab, "Activity")
+        self.setup_activity_tab(activity_tab)
+        
         self.statusBar().showMessage("Ready")
     
     def setup_connection_tab(self, tab):
@@ -454,13 +4977,12 @@ class DatabaseBackupApp(QMainWindow):
                 info.dwFlags |= subprocess.STARTF_USESHOWWINDOW
                 info.wShowWindow = subprocess.SW_HIDE
                 
-                proc = subprocess.Popen(
+                proc = self.supervisor.start(
                     ['net', 'start', service_name],
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
                     startupinfo=info
                 )
-                self.background_processes.append(proc)
                 proc.wait(timeout=30)
                 
             except subprocess.TimeoutExpired:
@@ -547,13 +5069,12 @@ class DatabaseBackupApp(QMainWindow):
                 info.dwFlags |= subprocess.STARTF_USESHOWWINDOW
                 info.wShowWindow = subprocess.SW_HIDE
                 
-                proc = subprocess.Popen(
+                proc = self.supervisor.start(
                     ['net', 'stop', service_name],
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
                     startupinfo=info
                 )
-                self.background_processes.append(proc)
                 proc.wait(timeout=30)
                 
             except subprocess.TimeoutExpired:
@@ -645,24 +5166,22 @@ class DatabaseBackupApp(QMainWindow):
                     info.dwFlags |= subprocess.STARTF_USESHOWWINDOW
                     info.wShowWindow = subprocess.SW_HIDE
                     
-                    proc = subprocess.Popen(
+                    proc = self.supervisor.start(
                         ['net', 'stop', service_name],
                         stdout=subprocess.PIPE,
                         stderr=subprocess.PIPE,
                         startupinfo=info
                     )
-                    self.background_processes.append(proc)
                     proc.wait(timeout=30)
                     
                     time.sleep(2)  # Give it a moment to stop
                     
-                    proc = subprocess.Popen(
+                    proc = self.supervisor.start(
                         ['net', 'start', service_name],
                         stdout=subprocess.PIPE,
                         stderr=subprocess.PIPE,
                         startupinfo=info
                     )
-                    self.background_processes.append(proc)
                     proc.wait(timeout=30)
                     
                 except subprocess.TimeoutExpired:
@@ -904,13 +5423,12 @@ class DatabaseBackupApp(QMainWindow):
                 info.dwFlags |= subprocess.STARTF_USESHOWWINDOW
                 info.wShowWindow = subprocess.SW_HIDE
                 
-                proc = subprocess.Popen(
+                proc = self.supervisor.start(
                     ['net', 'start', service_name],
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
                     startupinfo=info
                 )
-                self.background_processes.append(proc)
                 proc.wait(timeout=30)
                 
             except subprocess.TimeoutExpired:
@@ -997,13 +5515,12 @@ class DatabaseBackupApp(QMainWindow):
                 info.dwFlags |= subprocess.STARTF_USESHOWWINDOW
                 info.wShowWindow = subprocess.SW_HIDE
                 
-                proc = subprocess.Popen(
+                proc = self.supervisor.start(
                     ['net', 'stop', service_name],
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
                     startupinfo=info
                 )
-                self.background_processes.append(proc)
                 proc.wait(timeout=30)
                 
             except subprocess.TimeoutExpired:
@@ -1097,24 +5614,22 @@ class DatabaseBackupApp(QMainWindow):
                     info.dwFlags |= subprocess.STARTF_USESHOWWINDOW
                     info.wShowWindow = subprocess.SW_HIDE
                     
-                    proc = subprocess.Popen(
+                    proc = self.supervisor.start(
                         ['net', 'stop', service_name],
                         stdout=subprocess.PIPE,
                         stderr=subprocess.PIPE,
                         startupinfo=info
                     )
-                    self.background_processes.append(proc)
                     proc.wait(timeout=30)
                     
                     time.sleep(2)  # Give it a moment to stop
                     
-                    proc = subprocess.Popen(
+                    proc = self.supervisor.start(
                         ['net', 'start', service_name],
                         stdout=subprocess.PIPE,
                         stderr=subprocess.PIPE,
                         startupinfo=info
                     )
-                    self.background_processes.append(proc)
                     proc.wait(timeout=30)
                     
                 except subprocess.TimeoutExpired:
@@ -1196,7 +5711,10 @@ class DatabaseBackupApp(QMainWindow):
         format_layout = QHBoxLayout()
         format_layout.addWidget(QLabel("Backup Format:"))
         self.backup_format_combo = QComboBox()
-        self.backup_format_combo.addItems(["SQL", "CSV"])
+        self.backup_format_combo.addItems(["SQL", "CSV", "Base backup"])
+        self.backup_format_combo.setItemData(
+            2, "PostgreSQL only: physical copy of the whole cluster (pg_basebackup), fastest to restore", Qt.ToolTipRole
+        )
         format_layout.addWidget(self.backup_format_combo)
         backup_layout.addLayout(format_layout)
         
@@ -1206,16 +5724,168 @@ class DatabaseBackupApp(QMainWindow):
         self.backup_location_input = QLineEdit()
         self.backup_location_input.setPlaceholderText("Select a directory")
         location_layout.addWidget(self.backup_location_input)
-        browse_button = QPushButton("Browse...")
-        browse_button.clicked.connect(self.select_backup_directory)
-        location_layout.addWidget(browse_button)
+        self.browse_button = QPushButton("Browse...")
+        self.browse_button.clicked.connect(self.select_backup_directory)
+        location_layout.addWidget(self.browse_button)
         backup_layout.addLayout(location_layout)
         
+        # Selective backup
+        self.filter_group = QGroupBox("Tables (comma-separated glob patterns, blank = all)")
+        filter_layout = QVBoxLayout()
+        schema_filter_layout = QHBoxLayout()
+        schema_filter_layout.addWidget(QLabel("Include schemas:"))
+        self.include_schemas_input = QLineEdit()
+        self.include_schemas_input.setPlaceholderText("e.g. public, sales_*")
+        schema_filter_layout.addWidget(self.include_schemas_input)
+        schema_filter_layout.addWidget(QLabel("Exclude schemas:"))
+        self.exclude_schemas_input = QLineEdit()
+        self.exclude_schemas_input.setPlaceholderText("e.g. audit*")
+        schema_filter_layout.addWidget(self.exclude_schemas_input)
+        filter_layout.addLayout(schema_filter_layout)
+        table_filter_layout = QHBoxLayout()
+        table_filter_layout.addWidget(QLabel("Include tables:"))
+        self.include_tables_input = QLineEdit()
+        self.include_tables_input.setPlaceholderText("e.g. orders*, public.customers")
+        table_filter_layout.addWidget(self.include_tables_input)
+        table_filter_layout.addWidget(QLabel("Exclude tables:"))
+        self.exclude_tables_input = QLineEdit()
+        self.exclude_tables_input.setPlaceholderText("e.g. *_log, tmp_*")
+        table_filter_layout.addWidget(self.exclude_tables_input)
+        filter_layout.addLayout(table_filter_layout)
+        self.filter_group.setLayout(filter_layout)
+        backup_layout.addWidget(self.filter_group)
+        
+        # Storage backend
+        storage_layout = QHBoxLayout()
+        storage_layout.addWidget(QLabel("Storage:"))
+        self.storage_combo = QComboBox()
+        self.storage_combo.addItems(["Local directory", "S3-compatible"])
+        storage_layout.addWidget(self.storage_combo)
+        backup_layout.addLayout(storage_layout)
+        
+        # S3-compatible settings (AWS S3, MinIO, ...)
+        self.s3_group = QGroupBox("S3-Compatible Storage")
+        s3_layout = QVBoxLayout()
+        
+        s3_endpoint_layout = QHBoxLayout()
+        s3_endpoint_layout.addWidget(QLabel("Endpoint URL:"))
+        self.s3_endpoint_input = QLineEdit()
+        self.s3_endpoint_input.setPlaceholderText("Leave blank for AWS, e.g. http://localhost:9000 for MinIO")
+        s3_endpoint_layout.addWidget(self.s3_endpoint_input)
+        s3_endpoint_layout.addWidget(QLabel("Region:"))
+        self.s3_region_input = QLineEdit()
+        s3_endpoint_layout.addWidget(self.s3_region_input)
+        s3_layout.addLayout(s3_endpoint_layout)
+        
+        s3_bucket_layout = QHBoxLayout()
+        s3_bucket_layout.addWidget(QLabel("Bucket:"))
+        self.s3_bucket_input = QLineEdit()
+        s3_bucket_layout.addWidget(self.s3_bucket_input)
+        s3_bucket_layout.addWidget(QLabel("Prefix:"))
+        self.s3_prefix_input = QLineEdit()
+        s3_bucket_layout.addWidget(self.s3_prefix_input)
+        s3_layout.addLayout(s3_bucket_layout)
+        
+        s3_credentials_layout = QHBoxLayout()
+        s3_credentials_layout.addWidget(QLabel("Access Key:"))
+        self.s3_access_key_input = QLineEdit()
+        self.s3_access_key_input.setPlaceholderText("Leave blank to use AWS environment/config")
+        s3_credentials_layout.addWidget(self.s3_access_key_input)
+        s3_credentials_layout.addWidget(QLabel("Secret Key:"))
+        self.s3_secret_key_input = QLineEdit()
+        self.s3_secret_key_input.setEchoMode(QLineEdit.Password)
+        s3_credentials_layout.addWidget(self.s3_secret_key_input)
+        s3_layout.addLayout(s3_credentials_layout)
+        
+        self.s3_group.setLayout(s3_layout)
+        backup_layout.addWidget(self.s3_group)
+        self.storage_combo.currentTextChanged.connect(self.update_storage_ui)
+        self.update_storage_ui()
+        
+        # Encryption (the passphrase is never written to the config file)
+        encryption_layout = QHBoxLayout()
+        self.encrypt_checkbox = QCheckBox("Encrypt backups (AES-256-GCM)")
+        encryption_layout.addWidget(self.encrypt_checkbox)
+        encryption_layout.addWidget(QLabel("Passphrase:"))
+        self.encryption_passphrase_input = QLineEdit()
+        self.encryption_passphrase_input.setEchoMode(QLineEdit.Password)
+        self.encryption_passphrase_input.setPlaceholderText("Also used to restore .enc backups")
+        encryption_layout.addWidget(self.encryption_passphrase_input)
+        backup_layout.addLayout(encryption_layout)
+        
+        # Resource limits, applied live to a running backup
+        limits_group = QGroupBox("Resource Limits")
+        limits_layout = QHBoxLayout()
+        limits_layout.addWidget(QLabel("Max write rate:"))
+        self.write_rate_spin = QSpinBox()
+        self.write_rate_spin.setRange(0, 10000)
+        self.write_rate_spin.setSuffix(" MB/s")
+        self.write_rate_spin.setSpecialValueText("Unlimited")
+        limits_layout.addWidget(self.write_rate_spin)
+        limits_layout.addWidget(QLabel("CSV rows/sec:"))
+        self.row_rate_spin = QSpinBox()
+        self.row_rate_spin.setRange(0, 10000000)
+        self.row_rate_spin.setSingleStep(1000)
+        self.row_rate_spin.setSpecialValueText("Unlimited")
+        limits_layout.addWidget(self.row_rate_spin)
+        limits_layout.addWidget(QLabel("Dump priority:"))
+        self.process_priority_combo = QComboBox()
+        self.process_priority_combo.addItems(PROCESS_PRIORITIES)
+        limits_layout.addWidget(self.process_priority_combo)
+        limits_layout.addWidget(QLabel("Export workers:"))
+        self.export_workers_spin = QSpinBox()
+        self.export_workers_spin.setRange(1, 32)
+        self.export_workers_spin.setValue(4)
+        self.export_workers_spin.setToolTip("Parallel connections for CSV exports")
+        limits_layout.addWidget(self.export_workers_spin)
+        self.resumable_checkbox = QCheckBox("Resumable CSV")
+        self.resumable_checkbox.setToolTip("Checkpoint finished tables to a staging directory so an interrupted backup can resume")
+        self.resumable_checkbox.setChecked(True)
+        limits_layout.addWidget(self.resumable_checkbox)
+        job_limits_layout = QHBoxLayout()
+        job_limits_layout.addWidget(QLabel("Tool timeout:"))
+        self.job_timeout_spin = QSpinBox()
+        self.job_timeout_spin.setRange(0, 7 * 24 * 60)
+        self.job_timeout_spin.setSuffix(" min")
+        self.job_timeout_spin.setSpecialValueText("None")
+        self.job_timeout_spin.setToolTip("Stop a dump or restore tool (and its child processes) that runs longer than this")
+        job_limits_layout.addWidget(self.job_timeout_spin)
+        job_limits_layout.addWidget(QLabel("Tool memory cap:"))
+        self.job_memory_spin = QSpinBox()
+        self.job_memory_spin.setRange(0, 1024 * 1024)
+        self.job_memory_spin.setSingleStep(256)
+        self.job_memory_spin.setSuffix(" MB")
+        self.job_memory_spin.setSpecialValueText("None")
+        self.job_memory_spin.setToolTip("Stop a dump or restore tool whose process tree uses more resident memory than this")
+        job_limits_layout.addWidget(self.job_memory_spin)
+        job_limits_layout.addStretch()
+        limits_rows = QVBoxLayout()
+        limits_rows.addLayout(limits_layout)
+        limits_rows.addLayout(job_limits_layout)
+        limits_group.setLayout(limits_rows)
+        backup_layout.addWidget(limits_group)
+        self.write_rate_spin.valueChanged.connect(self.update_resource_limits)
+        self.row_rate_spin.valueChanged.connect(self.update_resource_limits)
+        self.process_priority_combo.currentTextChanged.connect(self.update_resource_limits)
+        
         # Backup button
+        backup_button_layout = QHBoxLayout()
         self.backup_button = QPushButton("Create Backup")
         self.backup_button.clicked.connect(self.create_backup)
         self.backup_button.setEnabled(False)
-        backup_layout.addWidget(self.backup_button)
+        backup_button_layout.addWidget(self.backup_button)
+        estimate_button = QPushButton("Estimate")
+        estimate_button.clicked.connect(self.show_backup_estimate)
+        backup_button_layout.addWidget(estimate_button)
+        self.cancel_job_buttons = [QPushButton("Cancel Running Job"), QPushButton("Cancel Running Job")]
+        for button in self.cancel_job_buttons:
+            button.setEnabled(False)
+            button.setToolTip("Stop the backup or restore in progress, its tools and its queries on the server")
+            button.clicked.connect(self.cancel_running_job)
+        backup_button_layout.addWidget(self.cancel_job_buttons[0])
+        backup_layout.addLayout(backup_button_layout)
+        self.estimate_label = QLabel("")
+        backup_layout.addWidget(self.estimate_label)
         
         # Scheduled backup section
         schedule_group = QGroupBox("Scheduled Backups")
@@ -1242,9 +5912,55 @@ class DatabaseBackupApp(QMainWindow):
         
         schedule_layout.addLayout(controls_layout)
         
+        # Load-aware deferral
+        defer_layout = QHBoxLayout()
+        self.defer_checkbox = QCheckBox("Defer while server is busy")
+        defer_layout.addWidget(self.defer_checkbox)
+        defer_layout.addWidget(QLabel("Max active sessions:"))
+        self.max_sessions_spin = QSpinBox()
+        self.max_sessions_spin.setRange(0, 100000)
+        self.max_sessions_spin.setSpecialValueText("Off")
+        self.max_sessions_spin.setValue(20)
+        defer_layout.addWidget(self.max_sessions_spin)
+        defer_layout.addWidget(QLabel("Max lag:"))
+        self.max_lag_spin = QSpinBox()
+        self.max_lag_spin.setRange(0, 86400)
+        self.max_lag_spin.setSuffix(" s")
+        self.max_lag_spin.setSpecialValueText("Off")
+        self.max_lag_spin.setValue(60)
+        defer_layout.addWidget(self.max_lag_spin)
+        defer_layout.addWidget(QLabel("Max CPU:"))
+        self.max_cpu_spin = QSpinBox()
+        self.max_cpu_spin.setRange(0, 100)
+        self.max_cpu_spin.setSuffix(" %")
+        self.max_cpu_spin.setSpecialValueText("Off")
+        self.max_cpu_spin.setValue(80)
+        defer_layout.addWidget(self.max_cpu_spin)
+        defer_layout.addWidget(QLabel("Defer up to:"))
+        self.defer_window_spin = QSpinBox()
+        self.defer_window_spin.setRange(1, 24 * 60)
+        self.defer_window_spin.setSuffix(" min")
+        self.defer_window_spin.setValue(120)
+        defer_layout.addWidget(self.defer_window_spin)
+        schedule_layout.addLayout(defer_layout)
+        
+        catch_up_layout = QHBoxLayout()
+        catch_up_layout.addWidget(QLabel("Catch up missed runs within:"))
+        self.catch_up_spin = QSpinBox()
+        self.catch_up_spin.setRange(0, 24 * 7)
+        self.catch_up_spin.setSuffix(" h")
+        self.catch_up_spin.setSpecialValueText("Never")
+        self.catch_up_spin.setValue(24)
+        self.catch_up_spin.valueChanged.connect(self.update_misfire_policy)
+        catch_up_layout.addWidget(self.catch_up_spin)
+        catch_up_layout.addStretch()
+        schedule_layout.addLayout(catch_up_layout)
+        
         # Next backup time
         self.next_backup_label = QLabel("Next backup: Not scheduled")
         schedule_layout.addWidget(self.next_backup_label)
+        self.deferral_label = QLabel("")
+        schedule_layout.addWidget(self.deferral_label)
         
         schedule_group.setLayout(schedule_layout)
         backup_layout.addWidget(schedule_group)
@@ -1260,6 +5976,35 @@ class DatabaseBackupApp(QMainWindow):
         self.backup_list = QListWidget()
         restore_layout.addWidget(self.backup_list)
         
+        # Point-in-time roll forward of MySQL SQL backups
+        roll_forward_layout = QHBoxLayout()
+        self.roll_forward_checkbox = QCheckBox("MySQL: roll forward with archived binlogs to")
+        roll_forward_layout.addWidget(self.roll_forward_checkbox)
+        self.roll_forward_input = QDateTimeEdit(QDateTime.currentDateTime())
+        self.roll_forward_input.setCalendarPopup(True)
+        self.roll_forward_input.setDisplayFormat("yyyy-MM-dd HH:mm:ss")
+        roll_forward_layout.addWidget(self.roll_forward_input)
+        roll_forward_layout.addStretch()
+        restore_layout.addLayout(roll_forward_layout)
+        
+        restore_workers_layout = QHBoxLayout()
+        restore_workers_layout.addWidget(QLabel("Restore connections:"))
+        self.restore_workers_spin = QSpinBox()
+        self.restore_workers_spin.setRange(1, 16)
+        self.restore_workers_spin.setValue(4)
+        self.restore_workers_spin.setToolTip("MySQL SQL backups and CSV backups load table data, and rebuild "
+                                             "indexes, over this many connections")
+        restore_workers_layout.addWidget(self.restore_workers_spin)
+        restore_workers_layout.addWidget(QLabel("Index build memory (MB):"))
+        self.index_memory_spin = QSpinBox()
+        self.index_memory_spin.setRange(0, 1024 * 1024)
+        self.index_memory_spin.setSpecialValueText("Server setting")
+        self.index_memory_spin.setToolTip("PostgreSQL: total maintenance_work_mem shared by the index rebuild "
+                                          "connections of a CSV restore (default: the server's maintenance_work_mem)")
+        restore_workers_layout.addWidget(self.index_memory_spin)
+        restore_workers_layout.addStretch()
+        restore_layout.addLayout(restore_workers_layout)
+        
         # Refresh button
         refresh_button = QPushButton("Refresh Backups")
         refresh_button.clicked.connect(self.refresh_backup_list)
@@ -1270,6 +6015,11 @@ class DatabaseBackupApp(QMainWindow):
         self.restore_button.clicked.connect(self.restore_backup)
         self.restore_button.setEnabled(False)
         restore_layout.addWidget(self.restore_button)
+        self.restore_tables_button = QPushButton("Restore Selected Tables...")
+        self.restore_tables_button.setToolTip("Restore only some tables of a SQL backup, using its table index")
+        self.restore_tables_button.clicked.connect(self.restore_selected_tables)
+        self.restore_tables_button.setEnabled(False)
+        restore_layout.addWidget(self.restore_tables_button)
         
         restore_group.setLayout(restore_layout)
         layout.addWidget(restore_group)
@@ -1277,6 +6027,293 @@ class DatabaseBackupApp(QMainWindow):
         # Connect signals
         self.backup_list.itemSelectionChanged.connect(self.toggle_restore_button)
     
+    def setup_history_tab(self, tab):
+        layout = QVBoxLayout(tab)
+        
+        self.history_tree = QTreeWidget()
+        self.history_tree.setHeaderLabels([
+            "Started", "Trigger", "Format", "Duration", "Size", "Throughput", "Deferred", "Status", "Details"
+        ])
+        self.history_tree.setRootIsDecorated(False)
+        self.history_tree.setAlternatingRowColors(True)
+        layout.addWidget(self.history_tree)
+        
+        self.history_summary = QLabel("")
+        layout.addWidget(self.history_summary)
+        
+        refresh_button = QPushButton("Refresh History")
+        refresh_button.clicked.connect(self.refresh_history)
+        layout.addWidget(refresh_button)
+    
+    def setup_processes_tab(self, tab):
+        layout = QVBoxLayout(tab)
+        
+        self.process_tree = QTreeWidget()
+        self.process_tree.setHeaderLabels([
+            "Tool", "Kind", "PID", "Status", "Elapsed", "CPU", "CPU time", "Memory", "Peak memory", "Read", "Written"
+        ])
+        self.process_tree.setRootIsDecorated(False)
+        self.process_tree.setAlternatingRowColors(True)
+        layout.addWidget(self.process_tree)
+        
+        self.process_summary = QLabel("")
+        process_buttons = QHBoxLayout()
+        process_buttons.addWidget(self.process_summary, 1)
+        process_buttons.addWidget(self.cancel_job_buttons[1])
+        layout.addLayout(process_buttons)
+        
+        # Figures are sampled by the supervisor; the view only redraws while it is shown
+        self.process_timer = QTimer(self)
+        self.process_timer.timeout.connect(self.refresh_process_view)
+        self.process_timer.start(1000)
+    
+    def setup_activity_tab(self, tab):
+        layout = QVBoxLayout(tab)
+        
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Poll every (s):"))
+        self.monitor_interval_spin = QSpinBox()
+        self.monitor_interval_spin.setRange(1, 60)
+        self.monitor_interval_spin.setValue(2)
+        controls.addWidget(self.monitor_interval_spin)
+        controls.addWidget(QLabel("Cost budget (% of interval):"))
+        self.monitor_budget_spin = QSpinBox()
+        self.monitor_budget_spin.setRange(1, 50)
+        self.monitor_budget_spin.setValue(5)
+        self.monitor_budget_spin.setToolTip("Above this, lock details are dropped and then polling slows down")
+        controls.addWidget(self.monitor_budget_spin)
+        self.monitor_button = QPushButton("Start Monitoring")
+        self.monitor_button.clicked.connect(self.toggle_activity_monitor)
+        controls.addWidget(self.monitor_button)
+        controls.addStretch()
+        layout.addLayout(controls)
+        self.monitor_interval_spin.valueChanged.connect(self.update_monitor_limits)
+        self.monitor_budget_spin.valueChanged.connect(self.update_monitor_limits)
+        
+        charts = QHBoxLayout()
+        self.activity_charts = {
+            'sessions': Sparkline("Sessions", ActivityMonitor.HISTORY),
+            'active': Sparkline("Active", ActivityMonitor.HISTORY),
+            'blocked': Sparkline("Waiting on locks", ActivityMonitor.HISTORY),
+            'longest': Sparkline("Longest active (s)", ActivityMonitor.HISTORY),
+            'cost': Sparkline("Poll cost (ms)", ActivityMonitor.HISTORY)
+        }
+        for chart in self.activity_charts.values():
+            charts.addWidget(chart)
+        layout.addLayout(charts)
+        
+        self.activity_model = ActivityTableModel(self)
+        proxy = QSortFilterProxyModel(self)
+        proxy.setSourceModel(self.activity_model)
+        self.activity_view = QTableView()
+        self.activity_view.setModel(proxy)
+        self.activity_view.setSortingEnabled(True)
+        self.activity_view.sortByColumn(8, Qt.DescendingOrder)  # Longest in its state first
+        self.activity_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.activity_view.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.activity_view)
+        
+        self.activity_status = QLabel("Not monitoring")
+        layout.addWidget(self.activity_status)
+        
+        # Polling happens on the monitor's thread; the view only redraws new polls while it is shown
+        self.activity_timer = QTimer(self)
+        self.activity_timer.timeout.connect(self.refresh_activity_view)
+        self.activity_timer.start(500)
+    
+    def toggle_activity_monitor(self):
+        if self.activity_monitor:
+            self.stop_activity_monitor()
+            return
+        if not self.connection:
+            QMessageBox.warning(self, "Not Connected", "Please connect to a database first.")
+            return
+        db_type = self.current_db_type
+        self.activity_monitor = ActivityMonitor(
+            self.connector(db_type, connect_timeout=10), db_type,
+            self.monitor_interval_spin.value(), self.monitor_budget_spin.value() / 100
+        )
+        self.activity_monitor.start()
+        self.activity_polls_shown = 0
+        self.monitor_button.setText("Stop Monitoring")
+        self.activity_status.setText("Waiting for the first poll...")
+    
+    def stop_activity_monitor(self):
+        if self.activity_monitor:
+            self.activity_monitor.stop()
+            self.activity_monitor = None
+        self.monitor_button.setText("Start Monitoring")
+        self.activity_status.setText("Not monitoring")
+    
+    def update_monitor_limits(self):
+        if self.activity_monitor:
+            self.activity_monitor.set_limits(self.monitor_interval_spin.value(), self.monitor_budget_spin.value() / 100)
+    
+    def refresh_activity_view(self):
+        monitor = self.activity_monitor
+        if not monitor or not self.activity_view.isVisible():
+            return
+        rows, samples, polls = monitor.snapshot()
+        if polls == self.activity_polls_shown:
+            if monitor.error:
+                self.activity_status.setText(f"Monitor error (retrying in {monitor.interval:g} s): {monitor.error}")
+            return
+        self.activity_polls_shown = polls
+        
+        added, changed, removed = self.activity_model.update(rows)
+        for name, chart in self.activity_charts.items():
+            chart.set_values([round(sample['cost'] * 1000, 1) if name == 'cost' else sample[name] for sample in samples])
+        latest = samples[-1]
+        self.activity_status.setText(
+            f"{latest['sessions']} sessions, {latest['active']} active, {latest['blocked']} waiting on locks. "
+            f"Poll {latest['cost'] * 1000:.1f} ms every {monitor.interval:g} s "
+            f"({latest['cost'] / monitor.interval:.1%} of the interval, budget {monitor.budget:.0%}); "
+            f"lock details {'on' if monitor.lock_detail else 'off to stay within budget'}. "
+            f"Last update: {added} new, {changed} changed, {removed} ended"
+        )
+    
+    def refresh_process_view(self):
+        if not self.process_tree.isVisible():
+            return
+        jobs = self.supervisor.all_jobs()
+        self.process_tree.clear()
+        for job in jobs:
+            running = job.ended is None
+            io = job.read_bytes is not None
+            self.process_tree.addTopLevelItem(QTreeWidgetItem([
+                job.name,
+                job.kind,
+                str(job.pid),
+                job.stop_reason or job.status,
+                self.format_duration(job.elapsed),
+                f"{job.cpu_percent:.0f}%" if running else "",
+                f"{job.cpu_seconds:.1f} s",
+                self.format_size(job.rss) if running else "",
+                self.format_size(job.peak_rss),
+                self.format_size(job.read_bytes) if io else "n/a",
+                self.format_size(job.write_bytes) if io else "n/a"
+            ]))
+        running = [job for job in jobs if job.ended is None]
+        self.process_summary.setText(
+            f"{len(running)} running: {sum(job.cpu_percent for job in running):.0f}% CPU, "
+            f"{self.format_size(sum(job.rss for job in running))} resident"
+            if running else "No tools running"
+        )
+    
+    def setup_pitr_tab(self, tab):
+        layout = QVBoxLayout(tab)
+        
+        # Continuous WAL archiving (PostgreSQL)
+        wal_group = QGroupBox("Continuous WAL Archiving (PostgreSQL)")
+        wal_layout = QVBoxLayout()
+        
+        wal_dir_layout = QHBoxLayout()
+        wal_dir_layout.addWidget(QLabel("Archive directory:"))
+        self.wal_directory_input = QLineEdit()
+        self.wal_directory_input.setPlaceholderText("Defaults to <backup location>/wal")
+        wal_dir_layout.addWidget(self.wal_directory_input)
+        wal_browse_button = QPushButton("Browse...")
+        wal_browse_button.clicked.connect(lambda: self.browse_for_directory(self.wal_directory_input))
+        wal_dir_layout.addWidget(wal_browse_button)
+        wal_layout.addLayout(wal_dir_layout)
+        
+        wal_slot_layout = QHBoxLayout()
+        wal_slot_layout.addWidget(QLabel("Replication slot:"))
+        self.wal_slot_input = QLineEdit("db_backup_archiver")
+        self.wal_slot_input.setToolTip(
+            "The server keeps WAL for this slot while archiving is down, so no segment is lost "
+            "(leave blank to stream without a slot)"
+        )
+        wal_slot_layout.addWidget(self.wal_slot_input)
+        self.wal_archiving_button = QPushButton("Start Archiving")
+        self.wal_archiving_button.clicked.connect(self.toggle_wal_archiving)
+        wal_slot_layout.addWidget(self.wal_archiving_button)
+        wal_layout.addLayout(wal_slot_layout)
+        
+        self.wal_status_label = QLabel("Archiving stopped")
+        self.wal_status_label.setWordWrap(True)
+        wal_layout.addWidget(self.wal_status_label)
+        wal_group.setLayout(wal_layout)
+        layout.addWidget(wal_group)
+        
+        # Binlog streaming (MySQL)
+        binlog_group = QGroupBox("Binlog Streaming (MySQL)")
+        binlog_layout = QVBoxLayout()
+        
+        binlog_dir_layout = QHBoxLayout()
+        binlog_dir_layout.addWidget(QLabel("Archive directory:"))
+        self.binlog_directory_input = QLineEdit()
+        self.binlog_directory_input.setPlaceholderText("Defaults to <backup location>/binlog")
+        binlog_dir_layout.addWidget(self.binlog_directory_input)
+        binlog_browse_button = QPushButton("Browse...")
+        binlog_browse_button.clicked.connect(lambda: self.browse_for_directory(self.binlog_directory_input))
+        binlog_dir_layout.addWidget(binlog_browse_button)
+        binlog_layout.addLayout(binlog_dir_layout)
+        
+        binlog_options_layout = QHBoxLayout()
+        self.record_binlog_checkbox = QCheckBox("Record binlog coordinates in SQL backups")
+        self.record_binlog_checkbox.setToolTip(
+            "Dumps run with --single-transaction and --source-data so they can be rolled forward "
+            "(needs the RELOAD and REPLICATION CLIENT privileges)"
+        )
+        self.record_binlog_checkbox.setChecked(False)
+        binlog_options_layout.addWidget(self.record_binlog_checkbox)
+        binlog_options_layout.addStretch()
+        self.binlog_streaming_button = QPushButton("Start Streaming")
+        self.binlog_streaming_button.clicked.connect(self.toggle_binlog_streaming)
+        binlog_options_layout.addWidget(self.binlog_streaming_button)
+        binlog_layout.addLayout(binlog_options_layout)
+        
+        self.binlog_status_label = QLabel("Streaming stopped")
+        self.binlog_status_label.setWordWrap(True)
+        binlog_layout.addWidget(self.binlog_status_label)
+        binlog_group.setLayout(binlog_layout)
+        layout.addWidget(binlog_group)
+        
+        # Point-in-time restore from a base backup plus archived WAL
+        pitr_group = QGroupBox("Point-in-Time Restore (PostgreSQL)")
+        pitr_layout = QVBoxLayout()
+        
+        data_dir_layout = QHBoxLayout()
+        data_dir_layout.addWidget(QLabel("Restored base backup (data directory):"))
+        self.pitr_data_dir_input = QLineEdit()
+        self.pitr_data_dir_input.setPlaceholderText("A stopped cluster's data directory containing backup_label")
+        data_dir_layout.addWidget(self.pitr_data_dir_input)
+        data_dir_browse_button = QPushButton("Browse...")
+        data_dir_browse_button.clicked.connect(lambda: self.browse_for_directory(self.pitr_data_dir_input))
+        data_dir_layout.addWidget(data_dir_browse_button)
+        pitr_layout.addLayout(data_dir_layout)
+        
+        target_layout = QHBoxLayout()
+        target_layout.addWidget(QLabel("Recover to:"))
+        self.pitr_target_input = QDateTimeEdit(QDateTime.currentDateTime())
+        self.pitr_target_input.setCalendarPopup(True)
+        self.pitr_target_input.setDisplayFormat("yyyy-MM-dd HH:mm:ss")
+        target_layout.addWidget(self.pitr_target_input)
+        self.pitr_start_checkbox = QCheckBox("Start the server to replay")
+        self.pitr_start_checkbox.setChecked(True)
+        target_layout.addWidget(self.pitr_start_checkbox)
+        target_layout.addStretch()
+        pitr_button = QPushButton("Prepare Restore")
+        pitr_button.clicked.connect(self.prepare_pitr_restore)
+        target_layout.addWidget(pitr_button)
+        pitr_layout.addLayout(target_layout)
+        
+        self.pitr_status_label = QLabel("")
+        self.pitr_status_label.setWordWrap(True)
+        pitr_layout.addWidget(self.pitr_status_label)
+        pitr_group.setLayout(pitr_layout)
+        layout.addWidget(pitr_group)
+        layout.addStretch()
+        
+        self.archive_timer = QTimer(self)
+        self.archive_timer.timeout.connect(self.refresh_archive_status)
+    
+    def browse_for_directory(self, line_edit):
+        directory = QFileDialog.getExistingDirectory(self, "Select Directory", line_edit.text())
+        if directory:
+            line_edit.setText(directory)
+    
     def setup_user_tab(self, tab):
         layout = QVBoxLayout(tab)
         
@@ -1364,23 +6401,205 @@ class DatabaseBackupApp(QMainWindow):
         operations_group.setLayout(operations_layout)
         layout.addWidget(operations_group)
         
-        # User Table
-        self.user_table = QTableWidget()
-        self.user_table.setColumnCount(4)
-        self.user_table.setHorizontalHeaderLabels(["Username", "Can Login", "Superuser", "Other Privileges"])
+        # Bulk import from a CSV/YAML manifest
+        import_group = QGroupBox("Bulk Import")
+        import_layout = QVBoxLayout()
+        
+        manifest_layout = QHBoxLayout()
+        manifest_layout.addWidget(QLabel("Manifest:"))
+        self.manifest_path_input = QLineEdit()
+        self.manifest_path_input.setPlaceholderText("CSV or YAML file with username, password, host, privileges, roles")
+        manifest_layout.addWidget(self.manifest_path_input)
+        manifest_browse = QPushButton("Browse...")
+        manifest_browse.clicked.connect(self.browse_for_manifest)
+        manifest_layout.addWidget(manifest_browse)
+        import_layout.addLayout(manifest_layout)
+        
+        import_options_layout = QHBoxLayout()
+        import_options_layout.addWidget(QLabel("Existing users:"))
+        self.import_existing_combo = QComboBox()
+        self.import_existing_combo.addItems(["Skip", "Update"])
+        import_options_layout.addWidget(self.import_existing_combo)
+        import_options_layout.addWidget(QLabel("Connections:"))
+        self.import_workers_spin = QSpinBox()
+        self.import_workers_spin.setRange(1, 16)
+        self.import_workers_spin.setValue(4)
+        import_options_layout.addWidget(self.import_workers_spin)
+        self.import_dry_run_checkbox = QCheckBox("Dry run")
+        import_options_layout.addWidget(self.import_dry_run_checkbox)
+        self.import_users_button = QPushButton("Import Users")
+        self.import_users_button.clicked.connect(self.import_users_from_manifest)
+        import_options_layout.addWidget(self.import_users_button)
+        import_layout.addLayout(import_options_layout)
+        
+        import_group.setLayout(import_layout)
+        layout.addWidget(import_group)
+        
+        # User Table (rows are paged in from the server as the view scrolls)
+        self.user_model = UserTableModel(self)
+        # Queued: the model fails inside fetchMore, while the view is still laying itself out
+        self.user_model.fetch_failed.connect(self.show_user_model_error, Qt.QueuedConnection)
+        self.user_table = QTableView()
+        self.user_table.setModel(self.user_model)
+        self.user_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.user_table.setSortingEnabled(True)
         self.user_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.user_table.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
         
         # Load Users button
         self.load_users_button = QPushButton("Load Users")
         self.load_users_button.clicked.connect(self.load_users)
         operations_layout.addWidget(self.load_users_button)
         
+        # Server-side user filters
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Filter:"))
+        self.user_filter_input = QLineEdit()
+        self.user_filter_input.setPlaceholderText("Username contains...")
+        filter_layout.addWidget(self.user_filter_input)
+        filter_layout.addWidget(QLabel("Privilege:"))
+        self.user_privilege_filter_combo = QComboBox()
+        self.user_privilege_filter_combo.addItem("Any", None)
+        filter_layout.addWidget(self.user_privilege_filter_combo)
+        layout.addLayout(filter_layout)
+        
+        # Debounce typing so each keystroke doesn't hit the server
+        self.user_filter_timer = QTimer(self)
+        self.user_filter_timer.setSingleShot(True)
+        self.user_filter_timer.setInterval(300)
+        self.user_filter_timer.timeout.connect(self.apply_user_filters)
+        self.user_filter_input.textChanged.connect(lambda _: self.user_filter_timer.start())
+        self.user_privilege_filter_combo.currentIndexChanged.connect(lambda _: self.apply_user_filters())
+        
         layout.addWidget(self.user_table)
         
         # Connect signals
         self.user_op_combo.currentTextChanged.connect(self.update_ui_for_operation)
         self.update_ui_for_operation()
     
+    def setup_roles_tab(self, tab):
+        layout = QVBoxLayout(tab)
+        self.role_graph = RoleGraph()
+        
+        # Controls
+        controls_layout = QHBoxLayout()
+        self.load_role_graph_button = QPushButton("Load Role Graph")
+        self.load_role_graph_button.clicked.connect(self.load_role_graph)
+        controls_layout.addWidget(self.load_role_graph_button)
+        controls_layout.addWidget(QLabel("Filter:"))
+        self.role_filter_input = QLineEdit()
+        self.role_filter_input.setPlaceholderText("Role name contains...")
+        self.role_filter_input.textChanged.connect(self.populate_role_list)
+        controls_layout.addWidget(self.role_filter_input)
+        layout.addLayout(controls_layout)
+        
+        self.role_graph_status = QLabel("PostgreSQL only. Not loaded.")
+        layout.addWidget(self.role_graph_status)
+        
+        # Role list and details side by side
+        splitter = QSplitter(Qt.Horizontal)
+        self.role_list = QListWidget()
+        self.role_list.currentTextChanged.connect(self.show_role_details)
+        splitter.addWidget(self.role_list)
+        
+        self.role_details = QTreeWidget()
+        self.role_details.setHeaderLabels(["Role", "Details"])
+        splitter.addWidget(self.role_details)
+        splitter.setSizes([250, 550])
+        layout.addWidget(splitter)
+    
+    def load_role_graph(self):
+        if not self.connection:
+            QMessageBox.warning(self, "Not Connected", "Please connect to a database first.")
+            return
+            
+        if self.current_db_type != "PostgreSQL":
+            QMessageBox.information(self, "Not Supported", "The role graph is only available for PostgreSQL.")
+            return
+            
+        try:
+            self.role_graph.load(self.connection)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to load role graph:\n{self.format_exception(e)}")
+            return
+            
+        self.populate_role_list()
+    
+    def reset_role_graph(self):
+        self.role_graph = RoleGraph()
+        self.role_list.clear()
+        self.role_details.clear()
+        self.role_graph_status.setText("PostgreSQL only. Not loaded.")
+    
+    def refresh_role_graph(self, names):
+        """Re-read changed roles if the role graph has been loaded"""
+        if self.current_db_type != "PostgreSQL" or self.role_graph.loaded_at is None:
+            return
+            
+        try:
+            self.role_graph.refresh_roles(self.connection, names)
+        except Exception as e:
+            print(f"Error refreshing role graph: {e}")
+            return
+            
+        self.populate_role_list()
+    
+    def populate_role_list(self):
+        current = self.role_list.currentItem().text() if self.role_list.currentItem() else None
+        text = self.role_filter_input.text().strip().lower()
+        
+        self.role_list.blockSignals(True)
+        self.role_list.clear()
+        for name in self.role_graph.role_names():
+            if text in name.lower():
+                self.role_list.addItem(name)
+        self.role_list.blockSignals(False)
+        
+        if self.role_graph.loaded_at:
+            self.role_graph_status.setText(
+                f"{len(self.role_graph.roles)} roles, snapshot taken "
+                f"{self.role_graph.loaded_at.strftime('%Y-%m-%d %H:%M:%S')}"
+            )
+            
+        matches = self.role_list.findItems(current, Qt.MatchExactly) if current else []
+        if matches:
+            self.role_list.setCurrentItem(matches[0])
+        else:
+            self.show_role_details(None)
+    
+    def show_role_details(self, name):
+        self.role_details.clear()
+        if not name or name not in self.role_graph.oids:
+            return
+            
+        effective = self.role_graph.effective_privileges(name)
+        
+        def section(title, rows):
+            parent = QTreeWidgetItem([title, str(len(rows))])
+            for row in rows:
+                parent.addChild(QTreeWidgetItem(list(row)))
+            self.role_details.addTopLevelItem(parent)
+            parent.setExpanded(True)
+        
+        def edge_text(edge):
+            flags = ["inherit" if edge['inherit'] else "no inherit"]
+            if edge['admin']:
+                flags.append("admin option")
+            return ", ".join(flags)
+        
+        section("Attributes", [(attr, "") for attr in effective['attributes']])
+        section("Member of", [(role, edge_text(edge)) for role, edge in self.role_graph.direct_memberships(name)])
+        section("Members", [(role, edge_text(edge)) for role, edge in self.role_graph.direct_members(name)])
+        section("Inherited roles", [(role, "privileges inherited") for role in effective['inherited_roles']])
+        section("SET ROLE only", [(role, "requires SET ROLE") for role in effective['set_role_only']])
+        section("Attributes via SET ROLE", [
+            (attr, ", ".join(roles)) for attr, roles in sorted(effective['attributes_via_set_role'].items())
+        ])
+        section("Default privileges", [
+            (f"{owner} -> {grantee}", f"{', '.join(privileges)} on new {object_type} in {schema}")
+            for owner, schema, object_type, grantee, privileges in effective['default_privileges']
+        ])
+    
     def update_ui_for_operation(self):
         op = self.user_op_combo.currentText()
         
@@ -1428,12 +6647,13 @@ class DatabaseBackupApp(QMainWindow):
                 self.create_user(username, password)
                 QMessageBox.information(self, "Success", f"User {username} created successfully.")
                 self.load_users()
+                self.refresh_role_graph([username])
                 self.username_input.clear()
                 self.user_password_input.clear()
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to create user:\n{self.format_exception(e)}")
         else:
-            selected_rows = set(index.row() for index in self.user_table.selectedIndexes())
+            selected_rows = set(index.row() for index in self.user_table.selectionModel().selectedRows())
             
             if not selected_rows:
                 QMessageBox.warning(self, "No Selection", "Please select users to operate on.")
@@ -1441,12 +6661,16 @@ class DatabaseBackupApp(QMainWindow):
                 
             try:
                 if operation == "Modify Users":
-                    self.modify_users(selected_rows)
+                    results = self.modify_users(selected_rows)
                 else:
-                    self.delete_users(selected_rows)
+                    results = self.delete_users(selected_rows)
                     
-                QMessageBox.information(self, "Success", f"User {operation.lower()} completed successfully.")
+                if results is None:
+                    return
+                    
+                self.show_bulk_results(operation, results)
                 self.load_users()
+                self.refresh_role_graph([label for label, _, _ in results])
                 
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to {operation.lower()} users:\n{self.format_exception(e)}")
@@ -1456,115 +6680,194 @@ class DatabaseBackupApp(QMainWindow):
         
         if self.current_db_type == "PostgreSQL":
             with self.connection.cursor() as cursor:
-                query = f"CREATE USER {username} WITH PASSWORD '{password}'"
-                if privileges:
-                    query += " " + " ".join(privileges)
-                cursor.execute(query)
+                query = f"CREATE USER {quote_pg_identifier(username)} WITH PASSWORD %s"
+                pg_privileges = [priv for priv in privileges if priv in self.pg_privs.values()]
+                if pg_privileges:
+                    query += " " + " ".join(pg_privileges)
+                cursor.execute(query, (password,))
                 
         else:
+            account = quote_mysql_account(username, '%')
             with self.connection.cursor() as cursor:
-                cursor.execute(f"CREATE USER '{username}'@'%' IDENTIFIED BY '{password}'")
+                cursor.execute(f"CREATE USER {account} IDENTIFIED BY %s", (password,))
                 
                 if privileges:
                     priv_list = ", ".join(priv for priv in privileges if priv in self.mysql_privs.values())
                     if priv_list:
-                        cursor.execute(f"GRANT {priv_list} ON *.* TO '{username}'@'%'")
+                        cursor.execute(f"GRANT {priv_list} ON *.* TO {account}")
                         
         self.connection.commit()
     
+    def selected_accounts(self, selected_rows):
+        accounts = [self.user_model.account(row) for row in sorted(selected_rows)]
+        return [account for account in accounts if account]
+    
+    def selected_privileges(self):
+        privs = self.pg_privs if self.current_db_type == "PostgreSQL" else self.mysql_privs
+        return [priv for priv, cb in self.privilege_checkboxes.items() if cb.isChecked() and priv in privs.values()]
+    
     def modify_users(self, selected_rows):
-        privileges = [priv for priv, cb in self.privilege_checkboxes.items() if cb.isChecked()]
+        """Plan the privilege changes for the selected users and apply them once confirmed"""
+        operation = BulkUserOperation(
+            self.current_db_type, "modify",
+            self.selected_accounts(selected_rows),
+            self.selected_privileges()
+        )
+        operation.plan(self.connection)
         
-        for row in selected_rows:
-            username_item = self.user_table.item(row, 0)
-            if not username_item:
-                continue
-                
-            username = username_item.text()
+        if not operation.statement_count():
+            QMessageBox.information(self, "No Changes", "The selected users already have these privileges.")
+            return None
             
-            if self.current_db_type == "PostgreSQL":
-                with self.connection.cursor() as cursor:
-                    query = f"ALTER USER {username}"
-                    
-                    if privileges:
-                        query += " WITH " + " ".join(privileges)
-                        
-                    cursor.execute(query)
-                    
-            else:
-                with self.connection.cursor() as cursor:
-                    cursor.execute(f"REVOKE ALL PRIVILEGES, GRANT OPTION FROM '{username}'@'%'")
-                    
-                    if privileges:
-                        priv_list = ", ".join(priv for priv in privileges if priv in self.mysql_privs.values())
-                        if priv_list:
-                            cursor.execute(f"GRANT {priv_list} ON *.* TO '{username}'@'%'")
-                            
-            self.connection.commit()
+        if not self.confirm_user_plan(operation):
+            return None
             
-    def delete_users(self, selected_rows):
-        for row in selected_rows:
-            username_item = self.user_table.item(row, 0)
-            if not username_item:
-                continue
-                
-            username = username_item.text()
+        return operation.apply(self.connection)
             
-            if self.current_db_type == "PostgreSQL":
-                with self.connection.cursor() as cursor:
-                    cursor.execute(f"DROP USER IF EXISTS {username}")
-            else:
-                with self.connection.cursor() as cursor:
-                    cursor.execute(f"DROP USER IF EXISTS '{username}'@'%'")
-                    
-            self.connection.commit()
+    def delete_users(self, selected_rows):
+        """Drop all selected users in one batch"""
+        operation = BulkUserOperation(self.current_db_type, "delete", self.selected_accounts(selected_rows))
+        return operation.apply(self.connection)
     
-    def load_users(self):
+    def confirm_user_plan(self, operation):
+        changed = len(operation.accounts) - len(operation.unchanged)
+        
+        msg = QMessageBox(self)
+        msg.setIcon(QMessageBox.Question)
+        msg.setWindowTitle("Confirm Changes")
+        msg.setText(
+            f"Apply {operation.statement_count()} statement(s) to {changed} user(s)?\n"
+            f"{len(operation.unchanged)} user(s) already match and will not be touched."
+        )
+        msg.setDetailedText(operation.plan_text())
+        msg.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
+        return msg.exec_() == QMessageBox.Yes
+    
+    def show_bulk_results(self, operation, results):
+        failed = [result for result in results if not result[1]]
+        details = "\n".join(f"{label}: {message}" for label, _, message in results)
+        
+        msg = QMessageBox(self)
+        if failed:
+            msg.setIcon(QMessageBox.Critical)
+            msg.setWindowTitle("Error")
+            msg.setText(f"Failed to {operation.lower()}: {len(failed)} of {len(results)} users not applied.")
+        else:
+            msg.setIcon(QMessageBox.Information)
+            msg.setWindowTitle("Success")
+            msg.setText(f"User {operation.lower()} completed successfully for {len(results)} users.")
+        msg.setDetailedText(details)
+        msg.exec_()
+    
+    def browse_for_manifest(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Select user manifest",
+            "",
+            "Manifests (*.csv *.yaml *.yml);;All Files (*)"
+        )
+        if path:
+            self.manifest_path_input.setText(path)
+    
+    def import_users_from_manifest(self):
         if not self.connection:
             QMessageBox.warning(self, "Not Connected", "Please connect to a database first.")
             return
             
-        try:
-            self.user_table.setRowCount(0)
+        path = self.manifest_path_input.text().strip()
+        if not path or not os.path.exists(path):
+            QMessageBox.warning(self, "Missing Information", "Please select a manifest file.")
+            return
             
-            if self.current_db_type == "PostgreSQL":
-                with self.connection.cursor() as cursor:
-                    cursor.execute("""
-                        SELECT usename, usecreatedb, usesuper, useconfig 
-                        FROM pg_user
-                        ORDER BY usename
-                    """)
-                    users = cursor.fetchall()
-                    
-                    for row, user in enumerate(users):
-                        self.user_table.insertRow(row)
-                        self.user_table.setItem(row, 0, QTableWidgetItem(user[0]))
-                        self.user_table.setItem(row, 1, QTableWidgetItem("Yes" if user[2] else "No"))
-                        self.user_table.setItem(row, 2, QTableWidgetItem("Yes" if user[2] else "No"))
-                        self.user_table.setItem(row, 3, QTableWidgetItem(", ".join(user[3]) if user[3] else ""))
-                        
-            else:
-                with self.connection.cursor() as cursor:
-                    cursor.execute("SELECT user, host FROM mysql.user")
-                    users = cursor.fetchall()
-                    
-                    for row, user in enumerate(users):
-                        self.user_table.insertRow(row)
-                        username = f"{user[0]}@{user[1]}"
-                        self.user_table.setItem(row, 0, QTableWidgetItem(username))
-                        
-                        cursor.execute(f"SHOW GRANTS FOR '{user[0]}'@'{user[1]}'")
-                        grants = cursor.fetchall()
-                        privileges = []
-                        for grant in grants:
-                            privileges.append(grant[0].split(" ON ")[0].replace("GRANT ", ""))
-                        
-                        self.user_table.setItem(row, 1, QTableWidgetItem("Yes"))
-                        self.user_table.setItem(row, 2, QTableWidgetItem("Yes" if "ALL PRIVILEGES" in privileges else "No"))
-                        self.user_table.setItem(row, 3, QTableWidgetItem(", ".join(privileges)))
-                        
+        privs = self.pg_privs if self.current_db_type == "PostgreSQL" else self.mysql_privs
+        provisioner = UserProvisioner(
+            self.current_db_type,
+            self.connector(),
+            privs.values(),
+            workers=self.import_workers_spin.value(),
+            update_existing=self.import_existing_combo.currentText() == "Update",
+            dry_run=self.import_dry_run_checkbox.isChecked()
+        )
+        
+        def progress(done, total, elapsed):
+            rate = done / elapsed if elapsed else 0
+            self.statusBar().showMessage(f"Provisioned {done}/{total} users ({rate:.0f} users/s)")
+            QApplication.processEvents()
+        
+        try:
+            entries = read_user_manifest(path)
+            report = provisioner.run(self.connection, entries, progress)
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load users:\n{self.format_exception(e)}")
+            QMessageBox.critical(self, "Error", f"Failed to import users:\n{self.format_exception(e)}")
+            return
+            
+        self.show_provisioning_report(report)
+        if not report['dry_run']:
+            self.load_users()
+            self.refresh_role_graph([label for label, _, _, _ in report['results']])
+    
+    def show_provisioning_report(self, report):
+        counts = {'create': 0, 'update': 0, 'skip': 0}
+        for _, action in report['plan']:
+            counts[action] += 1
+            
+        msg = QMessageBox(self)
+        summary = (
+            f"{counts['create']} to create, {counts['update']} to update, "
+            f"{counts['skip']} existing skipped, in {report['batches']} batch(es)."
+        )
+        
+        if report['dry_run']:
+            msg.setIcon(QMessageBox.Information)
+            msg.setWindowTitle("Dry Run")
+            msg.setText(f"Dry run: nothing was changed.\n{summary}")
+            msg.setDetailedText("\n".join(report['statements']))
+        else:
+            failed = [result for result in report['results'] if not result[2]]
+            done = len(report['results'])
+            rate = done / report['elapsed'] if report['elapsed'] else 0
+            msg.setIcon(QMessageBox.Critical if failed else QMessageBox.Information)
+            msg.setWindowTitle("Import Finished")
+            msg.setText(
+                f"{summary}\n"
+                f"Provisioned {done - len(failed)} of {done} users in {report['elapsed']:.1f}s "
+                f"({rate:.0f} users/s), {len(failed)} failed."
+            )
+            if failed:
+                msg.setDetailedText("\n".join(f"{label} ({action}): {error}" for label, action, _, error in failed))
+                
+        self.statusBar().showMessage(summary, 5000)
+        msg.exec_()
+    
+    def load_users(self):
+        if not self.connection:
+            QMessageBox.warning(self, "Not Connected", "Please connect to a database first.")
+            return
+            
+        # Offer only the privilege filters that apply to the connected server
+        privs = self.pg_privs if self.current_db_type == "PostgreSQL" else self.mysql_privs
+        self.user_privilege_filter_combo.blockSignals(True)
+        self.user_privilege_filter_combo.clear()
+        self.user_privilege_filter_combo.addItem("Any", None)
+        for name, priv in privs.items():
+            self.user_privilege_filter_combo.addItem(name, priv)
+        self.user_privilege_filter_combo.blockSignals(False)
+        
+        self.user_model.name_filter = self.user_filter_input.text().strip()
+        self.user_model.privilege_filter = None
+        self.user_model.set_connection(self.connection, self.current_db_type)
+    
+    def apply_user_filters(self):
+        if not self.user_model.connection:
+            return
+            
+        self.user_model.set_filters(
+            self.user_filter_input.text().strip(),
+            self.user_privilege_filter_combo.currentData()
+        )
+    
+    def show_user_model_error(self, error):
+        QMessageBox.critical(self, "Error", f"Failed to load users:\n{self.format_exception(error)}")
     
     def browse_for_tool(self, tool_name):
         if platform.system() == "Windows":
@@ -1586,6 +6889,14 @@ class DatabaseBackupApp(QMainWindow):
                 self.mysqldump_path_input.setText(path)
     
     def apply_manual_paths(self):
+        # Clearing a field returns that tool to automatic, version-matched selection
+        if not self.pg_dump_path_input.text():
+            self.pg_dump_path = None
+            self.pg_restore_path = None
+        if not self.mysqldump_path_input.text():
+            self.mysqldump_path = None
+            self.mysql_path = None
+            
         if self.pg_dump_path_input.text():
             self.pg_dump_path = self.pg_dump_path_input.text()
             self.pg_restore_path = os.path.join(
@@ -1606,25 +6917,17 @@ class DatabaseBackupApp(QMainWindow):
     def update_tools_status(self):
         status = []
         
-        if self.pg_dump_path and os.path.exists(self.pg_dump_path):
-            status.append("pg_dump: Found")
-        else:
-            status.append("pg_dump: Not found")
-            
-        if self.pg_restore_path and os.path.exists(self.pg_restore_path):
-            status.append("pg_restore: Found")
-        else:
-            status.append("pg_restore: Not found")
-            
-        if self.mysqldump_path and os.path.exists(self.mysqldump_path):
-            status.append("mysqldump: Found")
-        else:
-            status.append("mysqldump: Not found")
-            
-        if self.mysql_path and os.path.exists(self.mysql_path):
-            status.append("mysql: Found")
-        else:
-            status.append("mysql: Not found")
+        for name in ['pg_dump', 'pg_restore', 'mysqldump', 'mysql']:
+            pinned = getattr(self, f"{name}_path", None)
+            versions = sorted(set(self.tool_registry.versions(name)), reverse=True)
+            if pinned and os.path.exists(pinned):
+                status.append(f"{name}: Set manually")
+            elif versions:
+                status.append(f"{name}: Found ({', '.join('.'.join(map(str, v)) for v in versions)})")
+            elif self.tool_registry.best(name):
+                status.append(f"{name}: Found")
+            else:
+                status.append(f"{name}: Not found")
             
         self.tools_status.setText(" | ".join(status))
     
@@ -1663,7 +6966,12 @@ class DatabaseBackupApp(QMainWindow):
             try:
                 self.connection.close()
                 self.connection = None
+                self.connection_details = None
                 self.current_db_type = None
+                self.user_model.clear()
+                self.reset_role_graph()
+                self.stop_activity_monitor()
+                self.activity_model.clear()
                 self.connection_status.setText("Disconnected")
                 self.connection_status.setStyleSheet("color: black;")
                 self.backup_button.setEnabled(False)
@@ -1674,75 +6982,66 @@ class DatabaseBackupApp(QMainWindow):
                 QMessageBox.warning(self, "Logout Error", f"Error during logout:\n{str(e)}")
     
     def find_database_tools(self):
-        if platform.system() == 'Windows':
-            pg_versions = ["16", "15", "14", "13", "12", "11", "10", "9.6"]
-            pg_paths = [
-                rf"C:\Program Files\PostgreSQL\{ver}\bin\pg_dump.exe" for ver in pg_versions
-            ] + [
-                r"C:\Program Files\PostgreSQL\bin\pg_dump.exe",
-                os.path.expandvars(r"%PROGRAMFILES%\PostgreSQL\bin\pg_dump.exe"),
-                os.path.expandvars(r"%PROGRAMFILES(x86)%\PostgreSQL\bin\pg_dump.exe")
-            ]
-            
-            mysql_versions = ["8.1", "8.0", "5.7", "5.6"]
-            mysql_paths = [
-                rf"C:\Program Files\MySQL\MySQL Server {ver}\bin\mysqldump.exe" for ver in mysql_versions
-            ] + [
-                r"C:\Program Files\MySQL\bin\mysqldump.exe",
-                os.path.expandvars(r"%PROGRAMFILES%\MySQL\bin\mysqldump.exe")
-            ]
-            
-            for drive in ["C:", "D:", "E:"]:
-                pg_paths.append(rf"{drive}\PostgreSQL\bin\pg_dump.exe")
-                mysql_paths.append(rf"{drive}\MySQL\bin\mysqldump.exe")
-                
-            for path in pg_paths:
-                if os.path.exists(path):
-                    self.pg_dump_path = path
-                    self.pg_restore_path = path.replace("pg_dump.exe", "pg_restore.exe")
-                    break
-                    
-            for path in mysql_paths:
-                if os.path.exists(path):
-                    self.mysqldump_path = path
-                    self.mysql_path = path.replace("mysqldump.exe", "mysql.exe")
-                    break
-        else:
-            for tool in ['pg_dump', 'pg_restore', 'mysqldump', 'mysql']:
-                try:
-                    path = subprocess.check_output(['which', tool]).decode().strip()
-                    if tool == 'pg_dump':
-                        self.pg_dump_path = path
-                    elif tool == 'pg_restore':
-                        self.pg_restore_path = path
-                    elif tool == 'mysqldump':
-                        self.mysqldump_path = path
-                    elif tool == 'mysql':
-                        self.mysql_path = path
-                except:
-                    pass
-        
-        self.check_environment_paths()
+        """Discover installed client tools; paths set manually or in the config stay pinned"""
+        try:
+            self.tool_registry.discover()
+        except Exception as e:
+            print(f"Error discovering database tools: {e}")
         self.update_tools_status()
     
-    def check_environment_paths(self):
-        paths = os.environ['PATH'].split(os.pathsep)
-        
-        for path in paths:
-            if not path.strip():
-                continue
-                
-            path = path.strip('"')
-            
-            pg_dump = os.path.join(path, "pg_dump.exe" if platform.system() == "Windows" else "pg_dump")
-            if not self.pg_dump_path and os.path.exists(pg_dump):
-                self.pg_dump_path = pg_dump
-                self.pg_restore_path = os.path.join(path, "pg_restore.exe" if platform.system() == "Windows" else "pg_restore")
-                
-            mysqldump = os.path.join(path, "mysqldump.exe" if platform.system() == "Windows" else "mysqldump")
-            if not self.mysqldump_path and os.path.exists(mysqldump):
-                self.mysqldump_path = mysqldump
-                self.mysql_path = os.path.join(path, "mysql.exe" if platform.system() == "Windows" else "mysql")
+    def server_version(self):
+        """Version tuple of the connected server, or None"""
+        if not self.connection:
+            return None
+        try:
+            if self.current_db_type == "PostgreSQL":
+                number = self.connection.server_version
+                if number >= 100000:
+                    return (number // 10000, number % 10000)
+                return (number // 10000, (number // 100) % 100, number % 100)
+            return ToolRegistry.parse_version(self.connection.get_server_info())
+        except Exception:
+            return None
+    
+    def resolve_tool(self, name):
+        """Path of a client tool: the pinned path if set, else the best match for the server"""
+        pinned = getattr(self, f"{name}_path", None)
+        if pinned and os.path.exists(pinned):
+            return pinned
+        return self.tool_registry.best(name, self.server_version())
+    
+    def pump_events(self):
+        """Keep the window responsive while a throttled backup waits"""
+        if threading.current_thread() is threading.main_thread():
+            QApplication.processEvents()
+    
+    def on_gui_thread(self, function, *args):
+        """Run work that touches widgets on the GUI thread; scheduler jobs and listeners run on its own thread"""
+        if threading.current_thread() is threading.main_thread():
+            function(*args)
+        else:
+            self.gui_call.emit(lambda: function(*args))
+    
+    def update_resource_limits(self):
+        """Push the Resource Limits settings to the limiters and any running dump"""
+        self.write_limiter.set_rate(self.write_rate_spin.value() * 1024 * 1024)
+        self.row_limiter.set_rate(self.row_rate_spin.value())
+        for job in self.supervisor.running(kind="dump"):
+            self.apply_process_priority(job.process)
+    
+    def apply_process_priority(self, process):
+        try:
+            set_process_priority(process.pid, self.process_priority_combo.currentText())
+        except psutil.NoSuchProcess:
+            pass
+        except Exception as e:
+            # Raising priority back up usually needs elevated rights
+            print(f"Error setting priority of process {process.pid}: {e}")
+    
+    def update_storage_ui(self):
+        use_s3 = self.storage_combo.currentText() == "S3-compatible"
+        self.s3_group.setVisible(use_s3)
+        self.backup_location_input.setEnabled(not use_s3)
     
     def select_backup_directory(self):
         directory = QFileDialog.getExistingDirectory(self, "Select Backup Directory")
@@ -1752,51 +7051,42 @@ class DatabaseBackupApp(QMainWindow):
             
     def refresh_backup_list(self):
         self.backup_list.clear()
-        backup_dir = self.backup_location_input.text()
         
-        if not backup_dir or not os.path.isdir(backup_dir):
+        try:
+            storage = self.backup_storage()
+            backups = storage.list()
+        except Exception as e:
+            self.statusBar().showMessage(f"Cannot list backups: {e}", 5000)
             return
             
-        for filename in os.listdir(backup_dir):
-            if filename.startswith("Backup_") and (filename.endswith('.sql') or filename.endswith('.zip')):
-                self.backup_list.addItem(filename)
+        for filename, _, _ in sorted(backups):
+            self.backup_list.addItem(filename)
                 
     def toggle_restore_button(self):
-        self.restore_button.setEnabled(len(self.backup_list.selectedItems()) > 0)
+        selected = self.backup_list.selectedItems()
+        self.restore_button.setEnabled(len(selected) > 0)
+        self.restore_tables_button.setEnabled(
+            len(selected) > 0 and selected[0].text().endswith(('.sql', '.sql' + BackupEncryption.SUFFIX))
+        )
         
     def connect_to_db(self):
         db_type = self.db_type_combo.currentText()
         host = self.host_input.text()
-        port = self.port_input.text()
         db_name = self.db_name_input.text()
         user = self.user_input.text()
-        password = self.pass_input.text()
         
         if not all([host, db_name, user]):
             QMessageBox.warning(self, "Missing Information", "Please fill in all required fields.")
             return
             
         try:
-            if db_type == "PostgreSQL":
-                port = port or "5432"
-                self.connection = psycopg2.connect(
-                    host=host,
-                    port=port,
-                    database=db_name,
-                    user=user,
-                    password=password
-                )
-            else:
-                port = port or "3306"
-                self.connection = pymysql.connect(
-                    host=host,
-                    port=int(port),
-                    database=db_name,
-                    user=user,
-                    password=password
-                )
-                
+            # Worker threads connect with this copy; they must not read the widgets
+            details = self.connection_form()
+            self.connection = connect_database(db_type, details)
+            self.connection_details = details
             self.current_db_type = db_type
+            self.user_model.clear()
+            self.reset_role_graph()
             self.connection_status.setText(f"Connected to {db_type} database: {db_name}")
             self.connection_status.setStyleSheet("color: green;")
             self.backup_button.setEnabled(True)
@@ -1804,8 +7094,18 @@ class DatabaseBackupApp(QMainWindow):
             self.connect_button.setEnabled(False)
             self.statusBar().showMessage("Connection successful", 3000)
             
+            if self.pending_scheduled_run:
+                due, self.pending_scheduled_run = self.pending_scheduled_run, None
+                self.scheduler.add_job(
+                    scheduled_backup_job, trigger='date', args=[due],
+                    run_date=datetime.datetime.now() + datetime.timedelta(seconds=5),
+                    id='deferred_backup', replace_existing=True, misfire_grace_time=None
+                )
+                self.update_next_backup_time()
+            
         except Exception as e:
             self.connection = None
+            self.connection_details = None
             self.connection_status.setText("Connection failed")
             self.connection_status.setStyleSheet("color: red;")
             self.backup_button.setEnabled(False)
@@ -1814,212 +7114,894 @@ class DatabaseBackupApp(QMainWindow):
             error_msg = self.format_exception(e)
             QMessageBox.critical(self, "Connection Error", f"Failed to connect to database:\n{error_msg}")
             
-    def create_backup(self):
+    def connection_form(self):
+        """Connection details as typed on the Connection tab; GUI thread only"""
+        return {
+            'host': self.host_input.text(),
+            'port': self.port_input.text(),
+            'database': self.db_name_input.text(),
+            'user': self.user_input.text(),
+            'password': self.pass_input.text()
+        }
+    
+    def open_connection(self, db_type=None, connect_timeout=None):
+        """Open another connection to the connected server; safe from any thread"""
+        return self.connector(db_type, connect_timeout)()
+    
+    def connector(self, db_type=None, connect_timeout=None):
+        """A connect function for worker threads, bound to the details of the current connection"""
+        db_type = db_type or self.current_db_type
+        details = self.connection_details
+        if details is None:
+            raise Exception("Not connected to a database")
+        return lambda: connect_database(db_type, details, connect_timeout)
+            
+    def backup_storage(self):
+        """Storage backend selected on the Backup/Restore tab"""
+        if self.storage_combo.currentText() == "S3-compatible":
+            return S3Storage(
+                self.s3_bucket_input.text().strip(),
+                prefix=self.s3_prefix_input.text().strip(),
+                endpoint_url=self.s3_endpoint_input.text().strip(),
+                access_key=self.s3_access_key_input.text().strip(),
+                secret_key=self.s3_secret_key_input.text(),
+                region=self.s3_region_input.text().strip()
+            )
+            
+        backup_dir = self.backup_location_input.text()
+        if not backup_dir:
+            raise ValueError("Please select a backup directory.")
+        return LocalStorage(backup_dir)
+    
+    def create_backup(self, scheduled=False):
         if not self.connection:
             QMessageBox.warning(self, "Not Connected", "Please connect to a database first.")
             return
             
-        if self.current_db_type == "PostgreSQL" and not self.pg_dump_path:
+        if self.current_db_type == "PostgreSQL" and not self.resolve_tool("pg_dump"):
             self.suggest_pg_install()
             return
             
-        if self.current_db_type == "MySQL" and not self.mysqldump_path:
+        if self.current_db_type == "MySQL" and not self.resolve_tool("mysqldump"):
             self.suggest_mysql_install()
             return
             
-        backup_dir = self.backup_location_input.text()
-        if not backup_dir:
-            QMessageBox.warning(self, "No Backup Location", "Please select a backup directory.")
+        if self.current_db_type == "MySQL" and self.backup_format_combo.currentText() == "Base backup":
+            QMessageBox.warning(self, "Not Supported", "Base backups are only available for PostgreSQL.")
             return
             
-        if not os.path.exists(backup_dir):
-            try:
-                os.makedirs(backup_dir)
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Cannot create backup directory:\n{str(e)}")
+        try:
+            storage = self.backup_storage()
+        except ValueError as e:
+            QMessageBox.warning(self, "No Backup Location", str(e))
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Cannot open backup storage:\n{self.format_exception(e)}")
+            return
+            
+        if self.encrypt_checkbox.isChecked():
+            if AESGCM is None:
+                QMessageBox.critical(self, "Error", "Encrypted backups require the cryptography package (pip install cryptography).")
                 return
+            if not self.encryption_passphrase_input.text():
+                QMessageBox.warning(self, "No Passphrase", "Please enter a passphrase for encrypted backups.")
+                return
+            
+        try:
+            storage.prepare()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Cannot access backup location {storage.description()}:\n{self.format_exception(e)}")
+            return
+            
+        if self.backup_running or self.active_job:
+            # One job at a time: Cancel, --cancel and the locked controls all follow the active job
+            kind = self.active_job.kind if self.active_job else "backup"
+            if scheduled:
+                print(f"Backup skipped: a {kind} is still running")
+            else:
+                QMessageBox.information(self, f"{kind.capitalize()} Running", f"A {kind} is still running. "
+                                        "Wait for it to finish, or cancel it, before starting a backup.")
+            return
             
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_name = f"Backup_{self.db_name_input.text()}_{timestamp}"
         backup_format = self.backup_format_combo.currentText().lower()
         
-        if self.current_db_type == "PostgreSQL":
-            if backup_format == "csv":
-                self.create_postgres_csv_backup(backup_dir, backup_name)
-            else:
-                self.create_postgres_sql_backup(backup_dir, backup_name)
-        else:
-            if backup_format == "csv":
-                self.create_mysql_csv_backup(backup_dir, backup_name)
+        estimate = None
+        try:
+            estimate = self.estimate_backup(backup_format)
+            self.on_gui_thread(self.estimate_label.setText, self.describe_estimate(estimate))
+            self.pump_events()
+            free_space = storage.free_space()
+            if not self.estimator.has_room(estimate, free_space):
+                message = (f"The backup is expected to need about {self.format_size(estimate['size'])}, "
+                           f"but only {self.format_size(free_space)} is free at {storage.description()}.")
+                if scheduled:
+                    print(f"Scheduled backup skipped: {message}")
+                    self.history.finish(
+                        self.history.start(self.current_db_type, self.db_name_input.text(), backup_format,
+                                           "scheduled", self.last_run_deferral, estimate['source_bytes']),
+                        "failed", error=f"Not enough free space: {message}"
+                    )
+                    self.on_gui_thread(self.refresh_history)
+                    return
+                reply = QMessageBox.question(
+                    self, "Not Enough Free Space", f"{message}\n\nStart the backup anyway?",
+                    QMessageBox.Yes | QMessageBox.No
+                )
+                if reply != QMessageBox.Yes:
+                    return
+        except Exception as e:
+            # Estimates are advisory; a failed estimate never blocks a backup
+            print(f"Error estimating backup size: {e}")
+        
+        self.backup_running = True
+        run_id = self.history.start(
+            self.current_db_type, self.db_name_input.text(), backup_format,
+            "scheduled" if scheduled else "manual", self.last_run_deferral if scheduled else 0,
+            estimate['source_bytes'] if estimate else None
+        )
+        result = {'error': "Interrupted"}
+        job = self.start_job("backup", f"{backup_format} backup of {self.db_name_input.text()}",
+                             self.current_db_type, run_id)
+        try:
+            if self.current_db_type == "PostgreSQL":
+                if backup_format == "csv":
+                    result = self.create_postgres_csv_backup(storage, backup_name)
+                elif backup_format == "base backup":
+                    result = self.create_postgres_base_backup(storage, backup_name)
+                else:
+                    result = self.create_postgres_sql_backup(storage, backup_name)
             else:
-                self.create_mysql_sql_backup(backup_dir, backup_name)
+                if backup_format == "csv":
+                    result = self.create_mysql_csv_backup(storage, backup_name)
+                else:
+                    result = self.create_mysql_sql_backup(storage, backup_name)
+        finally:
+            self.backup_running = False
+            self.finish_job(job)
+            # A cancellation that arrives after the backup is complete changes nothing
+            status = "success" if 'error' not in result else "aborted" if job.cancelled.is_set() else "failed"
+            try:
+                self.history.finish(
+                    run_id, status,
+                    result.get('bytes', 0), result.get('file'), result.get('error'), result.get('binlog')
+                )
+            except Exception as e:
+                print(f"Error recording backup history: {e}")
+            self.on_gui_thread(self.refresh_history)
                 
-        self.cleanup_old_backups(backup_dir)
+        self.cleanup_old_backups(storage)
         self.refresh_backup_list()
 
-    def create_postgres_sql_backup(self, backup_dir, backup_name):
-        backup_file = os.path.join(backup_dir, f"{backup_name}.sql")
+    def backup_filter(self):
+        return TableFilter.from_text(
+            self.include_schemas_input.text(), self.exclude_schemas_input.text(),
+            self.include_tables_input.text(), self.exclude_tables_input.text()
+        )
+    
+    def selected_backup_tables(self):
+        """(schema, table) pairs the include/exclude patterns select; raises if none"""
+        tables = self.backup_filter().select(list_backup_tables(self.connection, self.current_db_type))
+        if not tables:
+            raise ValueError("No tables match the include/exclude patterns.")
+        return tables
+    
+    def estimate_backup(self, backup_format):
+        """Size and duration estimate, read on a connection of its own rather than the GUI's"""
+        connection = self.open_connection(self.current_db_type)
+        try:
+            if backup_format == "base backup":
+                # A physical backup copies the whole cluster, whatever the table filters say
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT sum(pg_database_size(oid)) FROM pg_database")
+                    cluster_bytes = int(cursor.fetchone()[0] or 0)
+                return self.estimator.estimate([("", "", 0, cluster_bytes)], self.current_db_type,
+                                               self.db_name_input.text(), backup_format)
+            tables = self.backup_filter().select(read_table_sizes(connection, self.current_db_type))
+            return self.estimator.estimate(tables, self.current_db_type, self.db_name_input.text(), backup_format)
+        finally:
+            connection.close()
+    
+    def describe_estimate(self, estimate):
+        basis = f"based on {estimate['runs']} past runs" if estimate['runs'] else "rough guess, no past runs yet"
+        return (f"Estimate: ~{self.format_size(estimate['size'])} from {self.format_size(estimate['source_bytes'])} "
+                f"of table data (~{estimate['rows']:,} rows), ~{self.format_duration(estimate['seconds'])} ({basis})")
+    
+    @staticmethod
+    def format_size(size):
+        for unit in ("B", "KB", "MB", "GB"):
+            if size < 1024:
+                return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+            size /= 1024
+        return f"{size:.1f} TB"
+    
+    def show_backup_estimate(self):
+        """Estimate size and duration of the selected format and check free space"""
+        if not self.connection:
+            QMessageBox.warning(self, "Not Connected", "Please connect to a database first.")
+            return
+            
+        try:
+            estimate = self.estimate_backup(self.backup_format_combo.currentText().lower())
+            text = self.describe_estimate(estimate)
+            storage = self.backup_storage()
+            storage.prepare()
+            free_space = storage.free_space()
+            if free_space is not None:
+                text += f"; {self.format_size(free_space)} free at destination"
+                if not self.estimator.has_room(estimate, free_space):
+                    text += " - NOT ENOUGH SPACE"
+            self.estimate_label.setText(text)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to estimate backup:\n{self.format_exception(e)}")
+    
+    def open_backup_writer(self, storage, filename):
+        """Open the writer chain for a new backup; returns (writer, stored filename)"""
+        if not self.encrypt_checkbox.isChecked():
+            return ThrottledWriter(storage.open_writer(filename), self.write_limiter), filename
+            
+        filename += BackupEncryption.SUFFIX
+        inner = ThrottledWriter(storage.open_writer(filename), self.write_limiter)
+        try:
+            return EncryptingWriter(inner, self.encryption_passphrase_input.text()), filename
+        except Exception:
+            inner.abort()
+            raise
+    
+    def save_dump_index(self, storage, backup_file, indexer):
+        """Store the table index of a finished SQL backup next to it; failures only cost the index"""
+        if indexer.error:
+            print(f"Error indexing {backup_file}: {indexer.error}")
+            return
+        index_writer = None
+        try:
+            index = json.dumps(indexer.index(indexer.offset + len(indexer.buffer))).encode('utf-8')
+            # The index names every table, so it is encrypted whenever the backup is
+            index_writer = ThrottledWriter(storage.open_writer(dump_index_name(backup_file)), self.write_limiter)
+            if backup_file.endswith(BackupEncryption.SUFFIX):
+                index_writer = EncryptingWriter(index_writer, self.encryption_passphrase_input.text())
+            index_writer.write(index)
+            index_writer.close()
+        except Exception as e:
+            if index_writer:
+                index_writer.abort()
+            print(f"Error saving table index for {backup_file}: {e}")
+    
+    def open_backup_reader(self, storage, name):
+        """Open a stored backup for restore, decrypting ``.enc`` files on the fly"""
+        reader = storage.open_reader(name)
+        if not name.endswith(BackupEncryption.SUFFIX):
+            return reader
+        try:
+            return DecryptingReader(reader, self.encryption_passphrase_input.text())
+        except Exception:
+            reader.close()
+            raise
+    
+    def backup_summary(self, writer, started):
+        """Size, throughput and encryption overhead of a finished backup"""
+        elapsed = max(time.perf_counter() - started, 0.001)
+        size_mb = writer.bytes_written / (1024 * 1024)
+        summary = f"{size_mb:.1f} MB in {elapsed:.1f} s ({size_mb / elapsed:.1f} MB/s)"
+        if isinstance(writer, EncryptingWriter):
+            summary += f", encryption {writer.crypto_seconds / elapsed:.0%} of the time"
+        for job in self.supervisor.jobs_since(started, kind="dump"):
+            if job.sampled_at:
+                summary += f"\n{job.name}: {job.summary()}"
+        return summary
+    
+    def job_limits(self):
+        """Timeout and memory cap for dump and restore tools, from the Resource Limits settings"""
+        return {
+            'timeout': self.job_timeout_spin.value() * 60 or None,
+            'memory_limit': self.job_memory_spin.value() * 1024 * 1024 or None
+        }
+    
+    def process_failure(self, process, stderr):
+        """Error message for a tool that exited unsuccessfully"""
+        job = self.supervisor.job_for(process)
+        if job and job.stop_reason:
+            return job.stop_reason
+        return self.safe_decode(stderr) if stderr else "Unknown error"
+    
+    def start_job(self, kind, description, db_type=None, run_id=None):
+        """Make a backup or restore cancellable from the UI and from ``app.py --cancel``"""
+        job = JobControl(kind, description, db_type, self.history, run_id)
+        job.on_cancel(self.stop_job_work)
+        self.active_job = job
+        self.on_gui_thread(self.set_job_controls, True)
+        return job
+    
+    def finish_job(self, job):
+        job.close()
+        if self.active_job is job:
+            self.active_job = None
+        self.on_gui_thread(self.set_job_controls, False)
+    
+    def set_job_controls(self, running):
+        """Lock out actions that clash with a running job; throttle waits keep the event loop turning"""
+        for widget in (self.db_type_combo, self.host_input, self.port_input, self.db_name_input,
+                       self.user_input, self.pass_input, self.backup_format_combo, self.backup_location_input,
+                       self.browse_button, self.filter_group, self.storage_combo, self.s3_group,
+                       self.encrypt_checkbox, self.encryption_passphrase_input, self.backup_list):
+            widget.setEnabled(not running)
+        for button in self.cancel_job_buttons:
+            button.setEnabled(running)
+        connected = self.connection is not None
+        self.connect_button.setEnabled(not running and not connected)
+        self.logout_button.setEnabled(not running and connected)
+        self.backup_button.setEnabled(not running and connected)
+        if running:
+            self.restore_button.setEnabled(False)
+            self.restore_tables_button.setEnabled(False)
+        else:
+            self.toggle_restore_button()
+    
+    def cancel_running_job(self):
+        job = self.active_job
+        if not job or job.cancelled.is_set():
+            return
+        self.statusBar().showMessage(f"Cancelling the {job.kind}...", 5000)
+        for button in self.cancel_job_buttons:
+            button.setEnabled(False)
+        # Killing tools and reaching the server can take seconds; the window stays usable meanwhile
+        threading.Thread(target=job.cancel, name=f"{job.kind}-cancel", daemon=True).start()
+    
+    def check_job(self):
+        """Keep the window responsive during a backup or restore; raises JobCancelled once it is cancelled"""
+        self.pump_events()
+        if self.active_job:
+            self.active_job.check()
+    
+    def job_connection(self, db_type):
+        """A new connection whose queries are cancelled along with the running job"""
+        return self.job_connector(db_type)()
+    
+    def job_connector(self, db_type):
+        """job_connection for worker threads: the details and the job are bound now, on the GUI thread"""
+        connect = self.connector(db_type)
+        job = self.active_job
+        
+        def open_job_connection():
+            connection = connect()
+            if job:
+                job.add_session(connection.get_backend_pid() if db_type == "PostgreSQL" else connection.thread_id())
+            return connection
+        return open_job_connection
+    
+    def stop_job_work(self, job):
+        """Cancel hook: the job's queries on the server first, then its tools' process trees
+
+        Cancelling the statements first stops the server's work right away; a
+        killed client would only be noticed at the server's next write to it.
+        """
+        tools = [tool for tool in self.supervisor.running() if tool.kind in ("dump", "restore")]
+        if job.db_type:
+            ports = set()
+            for tool in tools:
+                ports |= tool.client_ports()
+            try:
+                self.cancel_server_queries(job.db_type, job.session_ids(), ports)
+            except Exception as e:
+                print(f"Error cancelling queries on the server: {e}")
+        for tool in tools:
+            self.supervisor.stop(tool, f"{tool.name} was cancelled")
+    
+    def cancel_server_queries(self, db_type, sessions, ports):
+        """Cancel the statements of our own sessions and of our tools' connections (by client port)"""
+        if not sessions and not ports:
+            return 0
+        connection = self.open_connection(db_type, connect_timeout=CANCEL_CONNECT_TIMEOUT)
+        try:
+            with connection.cursor() as cursor:
+                if db_type == "PostgreSQL":
+                    cursor.execute("""
+                        SELECT count(*) FILTER (WHERE pg_cancel_backend(pid)) FROM pg_stat_activity
+                        WHERE pid <> pg_backend_pid()
+                          AND (pid = ANY(%s) OR (client_port = ANY(%s) AND usename = current_user))
+                    """, (list(sessions), list(ports)))
+                    return cursor.fetchone()[0]
+                cursor.execute("""
+                    SELECT ID, HOST FROM information_schema.PROCESSLIST
+                    WHERE USER = SUBSTRING_INDEX(USER(), '@', 1) AND ID <> CONNECTION_ID()
+                """)
+                ids = [session for session, host in cursor.fetchall()
+                       if session in sessions or (host or "").rpartition(':')[2] in {str(port) for port in ports}]
+                for session in ids:
+                    try:
+                        cursor.execute(f"KILL QUERY {int(session)}")
+                    except pymysql.MySQLError as e:
+                        print(f"Error cancelling MySQL thread {session}: {e}")  # It may just have finished
+                return len(ids)
+        finally:
+            connection.close()
+    
+    def report_job_failure(self, title, message):
+        """Error dialog of a failed backup or restore, or a notice if it was cancelled"""
+        job = self.active_job
+        if not job or not job.cancelled.is_set():
+            QMessageBox.critical(self, title, message)
+        elif job.kind == "backup":
+            QMessageBox.information(self, "Backup Cancelled",
+                                    "The backup was cancelled. Its partial files were removed; it is not offered for restore.")
+        else:
+            QMessageBox.information(self, "Restore Cancelled",
+                                    "The restore was cancelled; the database may be partly restored.\n\n"
+                                    + message.split("\n", 1)[-1])
+    
+    def wait_for_tool(self, process):
+        """Wait for a tool with stderr piped to exit while the window stays responsive; returns its stderr"""
+        stderr_chunks = []
+        stderr_thread = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+        stderr_thread.start()
+        try:
+            while True:
+                try:
+                    process.wait(timeout=0.1)
+                    break
+                except subprocess.TimeoutExpired:
+                    self.check_job()
+        except BaseException:
+            kill_process_tree(process)
+            raise
+        finally:
+            stderr_thread.join()
+        return b''.join(stderr_chunks)
+    
+    def run_dump(self, command, writer, env=None):
+        """Run a dump tool and stream its stdout into a backup writer"""
+        self.check_job()
+        process = self.supervisor.start(command, kind="dump", env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                        **self.job_limits())
+        if self.process_priority_combo.currentText() != "Normal":
+            self.apply_process_priority(process)
+        
+        # Drain stderr on the side so a chatty tool can't block on a full pipe
+        stderr_chunks = []
+        stderr_thread = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+        stderr_thread.start()
+        
+        # stdout is read on the side as well, so a tool stalled on the server can still be cancelled
+        chunks = queue.Queue(maxsize=4)
+        
+        def read_stdout():
+            try:
+                for chunk in iter(lambda: process.stdout.read(STREAM_CHUNK_SIZE), b''):
+                    chunks.put(chunk)
+            finally:
+                chunks.put(None)
+                
+        reader_thread = threading.Thread(target=read_stdout, daemon=True)
+        reader_thread.start()
+        try:
+            while True:
+                try:
+                    chunk = chunks.get(timeout=0.1)
+                except queue.Empty:
+                    self.check_job()
+                    continue
+                if chunk is None:
+                    break
+                writer.write(chunk)
+                self.check_job()
+        except BaseException:
+            kill_process_tree(process)
+            while chunks.get() is not None:
+                pass
+            raise
+        finally:
+            reader_thread.join()
+            process.stdout.close()
+            process.wait()
+            stderr_thread.join()
+            
+        stderr = b''.join(stderr_chunks)
+        if process.returncode != 0:
+            raise Exception(self.process_failure(process, stderr))
+        return stderr
+    
+    def run_restore(self, command, reader, env=None):
+        """Run a restore tool, feeding it the backup on stdin"""
+        self.check_job()
+        if hasattr(reader, 'fileno'):
+            # Local file: hand the descriptor straight to the tool
+            process = self.supervisor.start(command, kind="restore", env=env, stdin=reader, stderr=subprocess.PIPE,
+                                            **self.job_limits())
+            stderr = self.wait_for_tool(process)
+        else:
+            process = self.supervisor.start(command, kind="restore", env=env, stdin=subprocess.PIPE,
+                                            stderr=subprocess.PIPE, **self.job_limits())
+            feed_errors = []
+            
+            def feed():
+                try:
+                    for chunk in iter(lambda: reader.read(STREAM_CHUNK_SIZE), b''):
+                        process.stdin.write(chunk)
+                except BrokenPipeError:
+                    pass  # The tool exited early; its stderr explains why
+                except BaseException as e:
+                    feed_errors.append(e)
+                finally:
+                    try:
+                        process.stdin.close()
+                    except BrokenPipeError:
+                        pass
+                        
+            # Fed from the side, so a tool stalled on the server can still be cancelled
+            feeder = threading.Thread(target=feed, daemon=True)
+            feeder.start()
+            try:
+                stderr = self.wait_for_tool(process)
+            finally:
+                feeder.join()
+            if feed_errors:
+                raise feed_errors[0]
+            
+        if process.returncode != 0:
+            raise Exception(self.process_failure(process, stderr))
+
+    def create_postgres_sql_backup(self, storage, backup_name):
+        backup_file = f"{backup_name}.sql"
+        writer = None
         try:
             command = [
-                self.pg_dump_path,
+                self.resolve_tool("pg_dump"),
                 "-h", self.host_input.text(),
                 "-p", self.port_input.text() or "5432",
                 "-U", self.user_input.text(),
-                "-f", backup_file,
+                *self.backup_filter().pg_dump_args(),
                 self.db_name_input.text()
             ]
             
+            if not self.backup_filter().is_empty():
+                self.selected_backup_tables()  # Fail early instead of dumping an empty schema
+                
             env = os.environ.copy()
             env["PGPASSWORD"] = self.pass_input.text()
             
-            process = subprocess.Popen(command, env=env, stderr=subprocess.PIPE)
-            self.background_processes.append(process)
-            _, stderr = process.communicate()
-            
-            if process.returncode != 0:
-                error_msg = self.safe_decode(stderr) if stderr else "Unknown error"
-                raise Exception(error_msg)
+            started = time.perf_counter()
+            writer, backup_file = self.open_backup_writer(storage, backup_file)
+            indexer = SqlDumpIndexer(writer, "PostgreSQL")
+            self.run_dump(command, indexer, env)
+            writer.close()
+            self.save_dump_index(storage, backup_file, indexer)
                 
-            QMessageBox.information(self, "Backup Successful", f"Database backup created:\n{backup_file}")
+            QMessageBox.information(
+                self, "Backup Successful",
+                f"Database backup created:\n{storage.location(backup_file)}\n\n{self.backup_summary(writer, started)}"
+            )
+            return {'file': backup_file, 'bytes': writer.bytes_written}
             
         except Exception as e:
-            QMessageBox.critical(self, "Backup Failed", f"Failed to create backup:\n{self.format_exception(e)}")
+            if writer:
+                writer.abort()
+            self.report_job_failure("Backup Failed", f"Failed to create backup:\n{self.format_exception(e)}")
+            return {'error': str(e)}
 
-    def create_postgres_csv_backup(self, backup_dir, backup_name):
+    def create_postgres_csv_backup(self, storage, backup_name):
+        return self.create_csv_backup(storage, backup_name, "PostgreSQL")
+    
+    def create_postgres_base_backup(self, storage, backup_name):
+        """Physical backup of the whole cluster: pg_basebackup's tar stream, gzipped on all cores"""
+        backup_file = f"{backup_name}.tar.gz"
+        writer = None
+        compressor = None
         try:
-            csv_dir = os.path.join(backup_dir, backup_name)
-            if not os.path.exists(csv_dir):
-                os.makedirs(csv_dir)
-                
-            with self.connection.cursor() as cursor:
-                cursor.execute("""
-                    SELECT table_name 
-                    FROM information_schema.tables 
-                    WHERE table_schema = 'public' 
-                    AND table_type = 'BASE TABLE'
-                """)
-                tables = cursor.fetchall()
-                
-                for table in tables:
-                    table_name = table[0]
-                    csv_file = os.path.join(csv_dir, f"{table_name}.csv")
-                    
-                    with open(csv_file, 'w') as f:
-                        cursor.copy_expert(
-                            f"COPY {table_name} TO STDOUT WITH CSV HEADER",
-                            f
-                        )
+            pg_basebackup_path = self.resolve_tool("pg_basebackup")
+            if not pg_basebackup_path:
+                raise Exception("pg_basebackup utility not found. Please install PostgreSQL or specify the path.")
+            # Tar to stdout needs -X fetch (streamed WAL needs a directory); the WAL
+            # written during the backup lands inside the tar, so it restores on its own
+            command = [
+                pg_basebackup_path,
+                "-h", self.host_input.text(),
+                "-p", self.port_input.text() or "5432",
+                "-U", self.user_input.text(),
+                "-D", "-", "-F", "tar", "-X", "fetch",
+                "--checkpoint=fast", "--no-password", "--verbose"
+            ]
+            env = os.environ.copy()
+            env["PGPASSWORD"] = self.pass_input.text()
+            
+            started = time.perf_counter()
+            writer, backup_file = self.open_backup_writer(storage, backup_file)
+            compressor = ParallelGzipWriter(writer)
+            output = self.safe_decode(self.run_dump(command, compressor, env))
+            compressor.close()
             
-            shutil.make_archive(
-                os.path.join(backup_dir, backup_name),
-                'zip',
-                csv_dir
+            position = find_base_backup_position(output)
+            if position:
+                try:
+                    self.history.record_base_backup(backup_file, position)
+                except Exception as e:
+                    print(f"Error cataloguing base backup: {e}")
+            summary = (f"{self.backup_summary(writer, started)}\n"
+                       f"Compressed {self.format_size(compressor.bytes_in)} to {self.format_size(writer.bytes_written)}")
+            if position:
+                summary += f"\nWAL start {position['start_lsn']} on timeline {position['timeline']}"
+            QMessageBox.information(
+                self, "Backup Successful",
+                f"Base backup created:\n{storage.location(backup_file)}\n\n{summary}"
             )
+            return {'file': backup_file, 'bytes': writer.bytes_written}
+            
+        except Exception as e:
+            if compressor:
+                compressor.abort()
+            elif writer:
+                writer.abort()
+            self.report_job_failure("Backup Failed", f"Failed to create base backup:\n{self.format_exception(e)}")
+            return {'error': str(e)}
+
+    def create_csv_backup(self, storage, backup_name, db_type):
+        """Parallel CSV export from one snapshot; resumable exports checkpoint each finished entry"""
+        writer = None
+        checkpoint = None
+        connect = self.job_connector(db_type)
+        if db_type == "PostgreSQL":
+            snapshot = PostgresSnapshot(connect, self.export_workers_spin.value())
+            task_factory = pg_table_task
+        else:
+            snapshot = MySQLSnapshot(connect, self.export_workers_spin.value())
+            task_factory = lambda schema, table, predicate: mysql_table_task(table, predicate)
+        try:
+            job = self.csv_job_identity(db_type)
+            if self.resumable_checkbox.isChecked():
+                checkpoint = self.find_checkpoint(storage, job)
+            if checkpoint:
+                backup_name = checkpoint.backup_name
+                manifest = checkpoint.manifest
+                if not checkpoint.done:
+                    checkpoint.state['snapshots'] = []  # Nothing kept from the earlier snapshot
+            else:
+                manifest = self.plan_csv_backup(db_type)
+                if self.resumable_checkbox.isChecked():
+                    checkpoint = BackupCheckpoint.create(
+                        os.path.join(storage.staging_directory(), backup_name), backup_name, job, manifest
+                    )
+            done = checkpoint.done if checkpoint else {}
+            locked_tasks = manifest_tasks([item for item in manifest if item['locked']], task_factory, done)
+            tasks = manifest_tasks([item for item in manifest if not item['locked']], task_factory, done)
+            
+            started = time.perf_counter()
+            if locked_tasks or tasks or not checkpoint:
+                snapshot.open()
+            export = ParallelCsvExport(snapshot.connections, self.row_limiter, checkpoint,
+                                       getattr(snapshot, 'reconnect', None))
+            if checkpoint:
+                if snapshot.info:
+                    checkpoint.add_snapshot(snapshot.info)
+                self.run_csv_export(snapshot, export, locked_tasks, tasks, None)
+                snapshots, rows = checkpoint.state['snapshots'], dict(checkpoint.done)
             
-            shutil.rmtree(csv_dir)
+            # Staged entries are copied in; otherwise each table is spooled to a temporary file
+            # by its worker and copied into the archive once finished
+            writer, backup_file = self.open_backup_writer(storage, f"{backup_name}.zip")
+            with zipfile.ZipFile(writer, 'w', zipfile.ZIP_DEFLATED) as archive:
+                if checkpoint:
+                    checkpoint.assemble(archive)
+                else:
+                    snapshots, rows = [snapshot.info], self.run_csv_export(snapshot, export, locked_tasks, tasks, archive)
+                archive.writestr("metadata.json", json.dumps({
+                    'snapshot': snapshots[0],
+                    # A resumed backup mixes snapshots and is not one point in time
+                    'consistent': len(snapshots) == 1,
+                    'resumed_snapshots': snapshots[1:],
+                    'tables': manifest,
+                    'rows': rows
+                }, indent=2))
+            writer.close()
+            if checkpoint:
+                checkpoint.remove()
             
+            chunked = [item for item in manifest if item['chunked_by']]
+            summary = (f"{len(manifest)} tables ({len(chunked)} split into chunks) using "
+                       f"{snapshots[-1]['workers']} connections\n{self.describe_snapshot(db_type, snapshots[-1])}")
+            if len(snapshots) > 1:
+                summary += (f"\nResumed after an interruption: {len(snapshots)} snapshots were used, "
+                            "so the tables are NOT from a single point in time")
             QMessageBox.information(
                 self, "Backup Successful",
-                f"CSV backup created:\n{backup_name}.zip"
+                f"CSV backup created:\n{storage.location(backup_file)}\n\n{summary}\n\n"
+                f"{self.backup_summary(writer, started)}"
             )
+            return {'file': backup_file, 'bytes': writer.bytes_written}
             
         except Exception as e:
-            QMessageBox.critical(self, "Backup Failed", f"Failed to create CSV backup:\n{self.format_exception(e)}")
+            if writer:
+                writer.abort()
+            message = f"Failed to create CSV backup:\n{self.format_exception(e)}"
+            if checkpoint and self.active_job and self.active_job.cancelled.is_set():
+                checkpoint.remove()  # A cancelled backup is not resumed later
+            elif checkpoint:
+                message += (f"\n\n{len(checkpoint.done)} of {checkpoint.total_entries()} entries are checkpointed; "
+                            "the next CSV backup of this database will offer to resume.")
+            self.report_job_failure("Backup Failed", message)
+            return {'error': str(e)}
+        finally:
+            snapshot.close()
+
+    def run_csv_export(self, snapshot, export, locked_tasks, tasks, archive):
+        try:
+            # MyISAM and friends are outside the snapshot: read them while the lock is held
+            rows = export.run(locked_tasks, archive, self.check_job)
+        finally:
+            snapshot.unlock()
+        rows.update(export.run(tasks, archive, self.check_job))
+        return rows
+
+    def plan_csv_backup(self, db_type):
+        tables = self.selected_backup_tables()
+        sizes = {(schema, table): size for schema, table, _, size in read_table_sizes(self.connection, db_type)}
+        locked = set()
+        if db_type == "MySQL":
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT TABLE_NAME FROM information_schema.TABLES
+                    WHERE TABLE_SCHEMA = DATABASE() AND ENGINE IS NOT NULL AND ENGINE <> 'InnoDB'
+                """)
+                locked = {row[0] for row in cursor.fetchall()}
+        return plan_csv_manifest(self.connection, db_type, tables, sizes, locked)
+
+    def csv_job_identity(self, db_type):
+        """What must match for an interrupted CSV backup to be resumed"""
+        return {
+            'db_type': db_type,
+            'host': self.host_input.text(),
+            'port': self.port_input.text(),
+            'database': self.db_name_input.text(),
+            'filter': [self.include_schemas_input.text(), self.exclude_schemas_input.text(),
+                       self.include_tables_input.text(), self.exclude_tables_input.text()]
+        }
+
+    def find_checkpoint(self, storage, job):
+        """An interrupted backup to resume; manual runs ask, scheduled runs resume automatically"""
+        checkpoint = BackupCheckpoint.find(storage.staging_directory(), job)
+        if not checkpoint or threading.current_thread() is not threading.main_thread():
+            return checkpoint
+        reply = QMessageBox.question(
+            self, "Resume Backup",
+            f"An interrupted CSV backup started {checkpoint.state['started']} has "
+            f"{len(checkpoint.done)} of {checkpoint.total_entries()} entries finished.\n\n"
+            "Resume it? Finished tables come from the earlier snapshot, so the result is not a single "
+            "point in time.\nChoose No to discard it and start over.",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            return checkpoint
+        checkpoint.remove()
+        return None
 
-    def create_mysql_sql_backup(self, backup_dir, backup_name):
-        backup_file = os.path.join(backup_dir, f"{backup_name}.sql")
+    @staticmethod
+    def describe_snapshot(db_type, info):
+        if db_type == "PostgreSQL":
+            return f"WAL position: {info['lsn']}"
+        position = (f"Binlog position: {info['binlog_file']}:{info['binlog_position']}"
+                    if info['binlog_file'] else "Binary logging is off; no binlog position recorded")
+        if not info['coordinated']:
+            position += "\n(No FLUSH TABLES WITH READ LOCK privilege: exported on a single connection)"
+        return position
+
+    def create_mysql_sql_backup(self, storage, backup_name):
+        backup_file = f"{backup_name}.sql"
+        writer = None
         try:
             command = [
-                self.mysqldump_path,
+                self.resolve_tool("mysqldump"),
                 "-h", self.host_input.text(),
                 "-P", self.port_input.text() or "3306",
                 "-u", self.user_input.text(),
                 f"--password={self.pass_input.text()}",
                 self.db_name_input.text()
             ]
+            record_binlog = (self.record_binlog_checkbox.isChecked() and self.binary_logging_enabled()
+                             and self.can_record_binlog_position())
+            if record_binlog:
+                # Consistent InnoDB snapshot with its binlog coordinates written as a comment
+                command[-1:-1] = ["--single-transaction", self.binlog_position_option(command[0])]
             
-            with open(backup_file, 'w') as output_file:
-                process = subprocess.Popen(command, stdout=output_file, stderr=subprocess.PIPE)
-                self.background_processes.append(process)
-                _, stderr = process.communicate()
-                
-                if process.returncode != 0:
-                    error_msg = self.safe_decode(stderr) if stderr else "Unknown error"
-                    raise Exception(error_msg)
-                    
-            QMessageBox.information(self, "Backup Successful", f"Database backup created:\n{backup_file}")
+            table_filter = self.backup_filter()
+            if not table_filter.is_empty():
+                # mysqldump has no wildcards, so patterns are resolved against the catalog
+                self.selected_backup_tables()
+                command[-1:-1] = table_filter.mysqldump_args(list_backup_tables(self.connection, "MySQL"))
             
-        except Exception as e:
-            QMessageBox.critical(self, "Backup Failed", f"Failed to create backup:\n{self.format_exception(e)}")
-
-    def create_mysql_csv_backup(self, backup_dir, backup_name):
-        try:
-            csv_dir = os.path.join(backup_dir, backup_name)
-            if not os.path.exists(csv_dir):
-                os.makedirs(csv_dir)
-                
-            with self.connection.cursor() as cursor:
-                cursor.execute("SHOW TABLES")
-                tables = cursor.fetchall()
-                
-                for table in tables:
-                    table_name = table[0]
-                    csv_file = os.path.join(csv_dir, f"{table_name}.csv")
-                    
-                    cursor.execute(f"SELECT * FROM {table_name}")
-                    rows = cursor.fetchall()
+            started = time.perf_counter()
+            writer, backup_file = self.open_backup_writer(storage, backup_file)
+            indexer = SqlDumpIndexer(writer, "MySQL")
+            capture = HeadCapture(indexer)
+            self.run_dump(command, capture)
+            writer.close()
+            self.save_dump_index(storage, backup_file, indexer)
+            binlog = find_binlog_position(bytes(capture.head)) if record_binlog else None
                     
-                    cursor.execute(f"SHOW COLUMNS FROM {table_name}")
-                    columns = [column[0] for column in cursor.fetchall()]
-                    
-                    with open(csv_file, 'w', newline='') as f:
-                        writer = csv.writer(f)
-                        writer.writerow(columns)
-                        writer.writerows(rows)
-            
-            shutil.make_archive(
-                os.path.join(backup_dir, backup_name),
-                'zip',
-                csv_dir
-            )
-            
-            shutil.rmtree(csv_dir)
-            
+            summary = self.backup_summary(writer, started)
+            if binlog:
+                summary += f"\nBinlog position: {binlog[0]}:{binlog[1]}"
+            elif self.record_binlog_checkbox.isChecked():
+                summary += ("\nNo binlog position recorded (binary logging is off, or the account lacks "
+                            "RELOAD / REPLICATION CLIENT)")
             QMessageBox.information(
                 self, "Backup Successful",
-                f"CSV backup created:\n{backup_name}.zip"
+                f"Database backup created:\n{storage.location(backup_file)}\n\n{summary}"
             )
+            return {'file': backup_file, 'bytes': writer.bytes_written, 'binlog': binlog}
             
         except Exception as e:
-            QMessageBox.critical(self, "Backup Failed", f"Failed to create CSV backup:\n{self.format_exception(e)}")
+            if writer:
+                writer.abort()
+            self.report_job_failure("Backup Failed", f"Failed to create backup:\n{self.format_exception(e)}")
+            return {'error': str(e)}
+
+    def binary_logging_enabled(self):
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT @@log_bin")
+                return bool(int(cursor.fetchone()[0]))
+        except Exception as e:
+            print(f"Error checking binary logging: {e}")
+            return False
+    
+    def can_record_binlog_position(self):
+        """Whether the account holds RELOAD and REPLICATION CLIENT; without them the dump runs as before"""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT PRIVILEGE_TYPE FROM information_schema.USER_PRIVILEGES
+                    WHERE GRANTEE = CONCAT("'", SUBSTRING_INDEX(CURRENT_USER(), '@', 1), "'@'",
+                                           SUBSTRING_INDEX(CURRENT_USER(), '@', -1), "'")
+                """)
+                privileges = {row[0] for row in cursor.fetchall()}
+        except Exception as e:
+            print(f"Error checking binlog privileges: {e}")
+            return False
+        missing = {'RELOAD', 'REPLICATION CLIENT'} - privileges
+        if 'SUPER' in privileges:
+            missing.discard('REPLICATION CLIENT')
+        if missing:
+            print(f"Binlog coordinates not recorded: the account lacks {', '.join(sorted(missing))}")
+        return not missing
+    
+    def binlog_position_option(self, mysqldump_path):
+        """--source-data on MySQL 8.0.26+, --master-data on older MySQL and MariaDB"""
+        version = self.tool_registry.version_of(mysqldump_path) or ()
+        output = self.tool_registry.cache.get(mysqldump_path, {}).get('output', '')
+        if 'MariaDB' in output or version < (8, 0, 26):
+            return "--master-data=2"
+        return "--source-data=2"
+    
+    def create_mysql_csv_backup(self, storage, backup_name):
+        return self.create_csv_backup(storage, backup_name, "MySQL")
 
-    def cleanup_old_backups(self, backup_dir):
+    def cleanup_old_backups(self, storage):
         try:
-            backups = []
-            for filename in os.listdir(backup_dir):
-                if filename.startswith("Backup_") and (filename.endswith(".sql") or filename.endswith(".zip")):
-                    filepath = os.path.join(backup_dir, filename)
-                    mtime = os.path.getmtime(filepath)
-                    backups.append((mtime, filepath))
-            
-            backups.sort()
+            backups = sorted(storage.list(), key=lambda backup: backup[1])
             
             while len(backups) > self.max_backups:
-                _, oldest_backup = backups.pop(0)
+                oldest_backup = backups.pop(0)[0]
                 try:
-                    os.remove(oldest_backup)
+                    storage.delete(oldest_backup)
                 except Exception as e:
                     print(f"Error deleting old backup {oldest_backup}: {e}")
+                    continue
+                if oldest_backup.endswith(('.sql', '.sql' + BackupEncryption.SUFFIX)):
+                    try:
+                        storage.delete(dump_index_name(oldest_backup))
+                    except Exception:
+                        pass  # Backups made before indexing have none
                     
         except Exception as e:
             print(f"Error cleaning up old backups: {e}")
 
     def toggle_scheduled_backups(self):
         schedule = self.schedule_combo.currentText()
+        enabled = self.scheduler.get_job('scheduled_backup') is not None
         
         self.scheduler.remove_all_jobs()
+        self.pending_scheduled_run = None
         
-        if schedule == "Disabled":
+        if schedule == "Disabled" or enabled:
             self.next_backup_label.setText("Next backup: Not scheduled")
             self.enable_schedule_button.setText("Enable Schedule")
             return
@@ -2035,19 +8017,190 @@ class DatabaseBackupApp(QMainWindow):
         elif schedule == "Weekly on Sunday":
             trigger = CronTrigger(day_of_week="sun", hour=0, minute=0)
             
+        # Missed runs (app closed, machine asleep) are caught up once on the next start
         self.scheduler.add_job(
-            self.create_backup,
+            scheduled_backup_job,
             trigger=trigger,
+            id='scheduled_backup',
+            replace_existing=True,
+            coalesce=True,
+            misfire_grace_time=self.misfire_grace_seconds(),
             next_run_time=datetime.datetime.now() + datetime.timedelta(seconds=10)
         )
         
         self.enable_schedule_button.setText("Disable Schedule")
         self.update_next_backup_time()
         
+    def misfire_grace_seconds(self):
+        # APScheduler treats None as "no limit"; 0 hours means never catch up
+        return self.catch_up_spin.value() * 3600 or 1
+    
+    def update_misfire_policy(self):
+        if self.scheduler.get_job('scheduled_backup'):
+            self.scheduler.modify_job('scheduled_backup', misfire_grace_time=self.misfire_grace_seconds())
+    
+    def restore_schedule_state(self):
+        """Reflect a schedule restored from the job store in the UI"""
+        if self.scheduler.get_job('scheduled_backup'):
+            self.enable_schedule_button.setText("Disable Schedule")
+        self.update_next_backup_time()
+        self.refresh_history()
+    
+    def refresh_history(self):
+        """Show recent runs; throughput well below the recent median is highlighted"""
+        self.history_tree.clear()
+        try:
+            runs = self.history.recent()
+        except Exception as e:
+            self.history_summary.setText(f"Cannot read backup history: {e}")
+            return
+            
+        slow = 0
+        for index, run in enumerate(runs):
+            throughput = run_throughput(run)
+            # Baseline: the next 10 older successful runs of the same database and format
+            baseline = [
+                run_throughput(older) for older in runs[index + 1:]
+                if older['database'] == run['database'] and older['format'] == run['format']
+                and run_throughput(older)
+            ][:10]
+            
+            duration = run['finished'] - run['started'] if run['finished'] else None
+            item = QTreeWidgetItem([
+                datetime.datetime.fromtimestamp(run['started']).strftime('%Y-%m-%d %H:%M:%S'),
+                run['trigger'] or "",
+                (run['format'] or "").upper(),
+                self.format_duration(duration) if duration is not None and run['status'] != 'missed' else "",
+                f"{run['bytes'] / (1024 * 1024):.1f} MB" if run['bytes'] else "",
+                f"{throughput / (1024 * 1024):.1f} MB/s" if throughput else "",
+                self.format_duration(run['deferred']) if run['deferred'] else "",
+                run['status'],
+                run['error'] or (run['file'] or "") + (
+                    f" (binlog {run['binlog_file']}:{run['binlog_position']})" if run['binlog_file']
+                    else f" (WAL from {run['start_lsn']})" if run['start_lsn'] else ""
+                )
+            ])
+            if run['status'] in ('failed', 'missed'):
+                item.setForeground(7, Qt.red)
+            elif run['status'] == 'aborted':
+                item.setForeground(7, Qt.darkYellow)
+            if throughput and len(baseline) >= 3 and throughput < 0.75 * statistics.median(baseline):
+                item.setForeground(5, Qt.red)
+                item.setToolTip(5, f"Below 75% of the median of the previous {len(baseline)} runs "
+                                   f"({statistics.median(baseline) / (1024 * 1024):.1f} MB/s)")
+                slow += 1
+            self.history_tree.addTopLevelItem(item)
+            
+        for column in range(self.history_tree.columnCount() - 1):
+            self.history_tree.resizeColumnToContents(column)
+        self.history_summary.setText(
+            f"{len(runs)} runs shown" + (f", {slow} noticeably slower than usual" if slow else "")
+        )
+    
+    def record_missed_run(self, event):
+        """Scheduler listener: runs missed beyond the catch-up window go into the history"""
+        try:
+            self.history.record_missed(
+                event.scheduled_run_time.timestamp(),
+                "Missed while the application was not running (outside the catch-up window)"
+            )
+            # Listeners run on the scheduler's thread
+            self.on_gui_thread(self.refresh_history)
+        except Exception as e:
+            print(f"Error recording missed backup: {e}")
+        
+    def run_scheduled_backup(self, due=None):
+        """Scheduler entry point: back up now, or retry later while the server is busy"""
+        if due is None and self.scheduler.get_job('deferred_backup'):
+            return  # The deferred run stands in for this one
+        due = due or datetime.datetime.now()
+        if not self.connection:
+            # A catch-up run right after start-up waits until the user connects
+            self.pending_scheduled_run = self.pending_scheduled_run or due
+            # Runs on the scheduler's thread; labels are updated on the GUI thread
+            self.on_gui_thread(
+                self.deferral_label.setText,
+                f"Backup due {self.pending_scheduled_run.strftime('%Y-%m-%d %H:%M:%S')} is waiting for a database connection"
+            )
+            return
+        reasons = []
+        if self.defer_checkbox.isChecked():
+            reasons = self.server_busy_reasons()
+            
+        now = datetime.datetime.now()
+        deadline = due + datetime.timedelta(minutes=self.defer_window_spin.value())
+        if reasons and now < deadline:
+            retry_at = min(now + datetime.timedelta(seconds=DEFER_RETRY_SECONDS), deadline)
+            self.scheduler.add_job(
+                scheduled_backup_job, trigger='date', run_date=retry_at, args=[due],
+                id='deferred_backup', replace_existing=True, misfire_grace_time=None
+            )
+            self.on_gui_thread(
+                self.deferral_label.setText,
+                f"Backup due {due.strftime('%H:%M:%S')} deferred ({'; '.join(reasons)}), "
+                f"retrying at {retry_at.strftime('%H:%M:%S')}"
+            )
+            self.on_gui_thread(self.update_next_backup_time)
+            return
+            
+        # Past the window the backup runs anyway; a late backup beats a missing one
+        self.last_run_deferral = (now - due).total_seconds()
+        if self.last_run_deferral >= 1:
+            status = f"Last scheduled backup started after a {self.format_duration(self.last_run_deferral)} deferral"
+            if reasons:
+                status += f" (window expired while busy: {'; '.join(reasons)})"
+        else:
+            status = "Last scheduled backup started on time"
+        self.on_gui_thread(self.deferral_label.setText, status)
+        
+        # The backup itself drives widgets, dialogs and the GUI connection, so it runs on the GUI thread
+        self.on_gui_thread(self.start_scheduled_backup, due)
+    
+    def start_scheduled_backup(self, due):
+        """GUI-thread half of a scheduled run; waits for a running backup or restore to finish first"""
+        if self.active_job:
+            retry_at = datetime.datetime.now() + datetime.timedelta(seconds=DEFER_RETRY_SECONDS)
+            self.scheduler.add_job(
+                scheduled_backup_job, trigger='date', run_date=retry_at, args=[due],
+                id='deferred_backup', replace_existing=True, misfire_grace_time=None
+            )
+            self.deferral_label.setText(
+                f"Backup due {due.strftime('%H:%M:%S')} is waiting for the running {self.active_job.kind}, "
+                f"retrying at {retry_at.strftime('%H:%M:%S')}"
+            )
+        else:
+            self.create_backup(scheduled=True)
+        self.update_next_backup_time()
+    
+    def server_busy_reasons(self):
+        """Sample load on a dedicated connection; an empty list means go ahead"""
+        policy = LoadPolicy(self.max_sessions_spin.value(), self.max_lag_spin.value(), self.max_cpu_spin.value())
+        connection = None
+        try:
+            connection = self.open_connection()
+            return policy.reasons(sample_server_load(connection, self.current_db_type))
+        except Exception as e:
+            # Never let a failed probe block backups
+            print(f"Error sampling server load: {e}")
+            return []
+        finally:
+            if connection:
+                connection.close()
+    
+    @staticmethod
+    def format_duration(seconds):
+        minutes, seconds = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        if hours:
+            return f"{hours}h {minutes}m"
+        if minutes:
+            return f"{minutes}m {seconds}s"
+        return f"{seconds}s"
+    
     def update_next_backup_time(self):
-        jobs = self.scheduler.get_jobs()
+        jobs = [job for job in self.scheduler.get_jobs() if job.next_run_time]
         if jobs:
-            next_run = jobs[0].next_run_time
+            next_run = min(job.next_run_time for job in jobs)
             self.next_backup_label.setText(f"Next backup: {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
         else:
             self.next_backup_label.setText("Next backup: Not scheduled")
@@ -2108,16 +8261,714 @@ class DatabaseBackupApp(QMainWindow):
         
         msg.exec_()
                 
-    def restore_backup(self):
+    def archive_directory(self, line_edit, subdirectory):
+        """Directory for continuously archived logs: as set, else under a local backup location"""
+        directory = line_edit.text().strip()
+        if directory:
+            return directory
+        if not self.backup_location_input.text() or self.storage_combo.currentText() != "Local directory":
+            raise ValueError("Set an archive directory (or a local backup location)")
+        return os.path.join(self.backup_location_input.text(), subdirectory)
+    
+    def toggle_wal_archiving(self):
+        if self.wal_archiver:
+            self.wal_archiver.stop()
+            self.wal_archiver = None
+            self.wal_archiving_button.setText("Start Archiving")
+            self.refresh_archive_status()
+            if not self.binlog_archiver:
+                self.archive_timer.stop()
+            return
+            
+        if self.current_db_type != "PostgreSQL":
+            QMessageBox.warning(self, "Not Connected", "Connect to a PostgreSQL server first.")
+            return
+        pg_receivewal_path = self.resolve_tool("pg_receivewal")
+        if not pg_receivewal_path:
+            QMessageBox.critical(self, "Error", "pg_receivewal utility not found. Please install PostgreSQL client tools.")
+            return
+            
+        try:
+            archive = WalArchive(self.archive_directory(self.wal_directory_input, "wal"))
+            archive.prepare()
+            env = os.environ.copy()
+            env["PGPASSWORD"] = self.pass_input.text()
+            base = [
+                pg_receivewal_path,
+                "-h", self.host_input.text(),
+                "-p", self.port_input.text() or "5432",
+                "-U", self.user_input.text(),
+                "--no-password"
+            ]
+            slot = self.wal_slot_input.text().strip()
+            if slot:
+                base += ["--slot", slot]
+                result = subprocess.run(base + ["--create-slot", "--if-not-exists"], env=env,
+                                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=60)
+                if result.returncode != 0:
+                    raise Exception(self.safe_decode(result.stdout) or "Could not create the replication slot")
+            # --no-loop: on a lost connection the tool exits and the supervisor restarts it with backoff
+            command = base + ["-D", archive.spool, "--no-loop", "--verbose"]
+            self.wal_archiver = ContinuousArchiver("pg_receivewal", archive, lambda: command, env,
+                                                  supervisor=self.supervisor)
+            self.wal_archiver.start()
+        except Exception as e:
+            self.wal_archiver = None
+            QMessageBox.critical(self, "Error", f"Failed to start WAL archiving:\n{self.format_exception(e)}")
+            return
+            
+        self.wal_archiving_button.setText("Stop Archiving")
+        self.archive_timer.start(2000)
+        self.refresh_archive_status()
+    
+    def toggle_binlog_streaming(self):
+        if self.binlog_archiver:
+            self.binlog_archiver.stop()
+            self.binlog_archiver = None
+            self.binlog_streaming_button.setText("Start Streaming")
+            self.refresh_archive_status()
+            if not self.wal_archiver:
+                self.archive_timer.stop()
+            return
+            
+        if self.current_db_type != "MySQL":
+            QMessageBox.warning(self, "Not Connected", "Connect to a MySQL server first.")
+            return
+        mysqlbinlog_path = self.resolve_tool("mysqlbinlog")
+        if not mysqlbinlog_path:
+            QMessageBox.critical(self, "Error", "mysqlbinlog utility not found. Please install MySQL client tools.")
+            return
+        if not self.binary_logging_enabled():
+            QMessageBox.critical(self, "Error", "Binary logging is disabled on this server (log_bin is OFF).")
+            return
+            
+        try:
+            archive = BinlogArchive(self.archive_directory(self.binlog_directory_input, "binlog"))
+            archive.prepare()
+            first_file = archive.resume_file()
+            if not first_file:
+                # First start: capture everything the server still has
+                with self.connection.cursor() as cursor:
+                    cursor.execute("SHOW BINARY LOGS")
+                    first_file = cursor.fetchone()[0]
+            base = [
+                mysqlbinlog_path,
+                "--read-from-remote-server",
+                "--host", self.host_input.text(),
+                "--port", self.port_input.text() or "3306",
+                "--user", self.user_input.text(),
+                f"--password={self.pass_input.text()}",
+                "--raw", "--stop-never",
+                f"--result-file={archive.spool}{os.sep}"
+            ]
+            # Each (re)start continues from the newest binlog held locally
+            self.binlog_archiver = ContinuousArchiver(
+                "mysqlbinlog", archive, lambda: base + [archive.resume_file() or first_file],
+                supervisor=self.supervisor
+            )
+            self.binlog_archiver.start()
+        except Exception as e:
+            self.binlog_archiver = None
+            QMessageBox.critical(self, "Error", f"Failed to start binlog streaming:\n{self.format_exception(e)}")
+            return
+            
+        self.binlog_streaming_button.setText("Stop Streaming")
+        self.archive_timer.start(2000)
+        self.refresh_archive_status()
+    
+    def refresh_archive_status(self):
+        for archiver, label, make_archive, unit in [
+            (self.wal_archiver, self.wal_status_label,
+             lambda: WalArchive(self.archive_directory(self.wal_directory_input, "wal")), "segments"),
+            (self.binlog_archiver, self.binlog_status_label,
+             lambda: BinlogArchive(self.archive_directory(self.binlog_directory_input, "binlog")), "binlogs")
+        ]:
+            try:
+                archive = archiver.archive if archiver else make_archive()
+                count, size, stored, first, last, archived = archive.summary()
+            except Exception:
+                count = 0
+            if count:
+                catalog = (f"{count} {unit} ({first} .. {last}), {self.format_size(size)} stored as "
+                           f"{self.format_size(stored)}, last archived "
+                           f"{datetime.datetime.fromtimestamp(archived):%Y-%m-%d %H:%M:%S}")
+            else:
+                catalog = f"No {unit} archived yet"
+                
+            if not archiver:
+                label.setText(f"Stopped. {catalog}")
+                continue
+            receiver = archiver.receiver
+            state = f"{receiver.name} running (PID {receiver.process.pid})" if receiver.running else f"{receiver.name} restarting"
+            if receiver.restarts:
+                state += f", restarted {receiver.restarts} times (last {receiver.last_exit})"
+            lines = [state, catalog]
+            if archiver.last_error:
+                lines.append(f"Archive error: {archiver.last_error}")
+            elif receiver.output:
+                lines.append(receiver.output[-1])
+            label.setText("\n".join(lines))
+    
+    def prepare_pitr_restore(self):
+        """Configure a restored base backup to replay archived WAL up to the chosen time"""
+        data_directory = self.pitr_data_dir_input.text().strip()
+        target = self.pitr_target_input.dateTime().toPyDateTime().astimezone()
+        try:
+            label = read_backup_label(data_directory)
+        except FileNotFoundError:
+            QMessageBox.critical(self, "Error", "The data directory has no backup_label; restore a physical base backup into it first.")
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Cannot read the base backup:\n{self.format_exception(e)}")
+            return
+        if os.path.exists(os.path.join(data_directory, 'postmaster.pid')):
+            QMessageBox.critical(self, "Error", "The server for this data directory is running; stop it first.")
+            return
+            
+        try:
+            archive = self.wal_archiver.archive if self.wal_archiver else WalArchive(self.archive_directory(self.wal_directory_input, "wal"))
+            coverage = archive.coverage(label['start_lsn'], label['timeline'], target.timestamp())
+            if not coverage['covered'] and os.path.isdir(archive.spool):
+                # WAL still being streamed covers the most recent changes
+                partial = archive.stage_partial()
+                next_name = wal_segment_name(label['timeline'], coverage['next'], coverage['segment_size'])
+                if partial and partial[0][8:] == next_name[8:]:
+                    coverage['reached'] = partial[1]
+                    coverage['covered'] = partial[1] >= target.timestamp()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Cannot restore to that point:\n{self.format_exception(e)}")
+            return
+            
+        reached = datetime.datetime.fromtimestamp(coverage['reached'])
+        if not coverage['covered']:
+            reply = QMessageBox.question(
+                self, "Target Not Covered",
+                f"Archived WAL only reaches {reached:%Y-%m-%d %H:%M:%S}. Recover as far as the archive goes?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                return
+            target = None  # A target past the end of the WAL is an error; replay everything instead
+            
+        try:
+            settings_file = write_recovery_settings(data_directory, archive.restore_command(), target)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to write recovery settings:\n{self.format_exception(e)}")
+            return
+            
+        until = f"{target:%Y-%m-%d %H:%M:%S %Z}" if target else "the end of the archive"
+        message = (f"Base backup from {label['start_time'] or format_lsn(label['start_lsn'])} will replay WAL to "
+                   f"{until}. Recovery settings written to {settings_file}.")
+        if self.pitr_start_checkbox.isChecked():
+            pg_ctl_path = self.resolve_tool("pg_ctl")
+            if not pg_ctl_path:
+                QMessageBox.critical(self, "Error", "pg_ctl utility not found; start the server manually to replay.")
+                self.pitr_status_label.setText(message)
+                return
+            log_file = os.path.join(data_directory, "pitr_recovery.log")
+            result = subprocess.run([pg_ctl_path, "-D", data_directory, "-l", log_file, "-W", "start"],
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            if result.returncode != 0:
+                QMessageBox.critical(self, "Error", f"pg_ctl failed to start the server:\n{self.safe_decode(result.stdout)}")
+                self.pitr_status_label.setText(message)
+                return
+            message += f" Server started; replay progress is logged to {log_file}."
+        self.pitr_status_label.setText(message)
+        QMessageBox.information(self, "Point-in-Time Restore", message)
+    
+    def plan_binlog_replay(self, storage, backup_name):
+        """Binlogs rolling a SQL backup forward to the chosen time; None if the user cancels"""
+        if not self.resolve_tool("mysqlbinlog"):
+            raise Exception("mysqlbinlog utility not found. Please install MySQL client tools.")
+        position = self.history.binlog_position(backup_name)
+        if not position:
+            # Backups made elsewhere still carry the coordinates in their header comment
+            with self.open_backup_reader(storage, backup_name) as reader:
+                position = find_binlog_position(reader.read(1024 * 1024))
+        if not position:
+            raise ValueError("This backup has no binlog coordinates; it was taken without recording them.")
+            
+        target = self.roll_forward_input.dateTime().toPyDateTime()
+        archive = self.binlog_archiver.archive if self.binlog_archiver else BinlogArchive(
+            self.archive_directory(self.binlog_directory_input, "binlog")
+        )
+        plan = archive.replay_files(position[0], target.timestamp())
+        if not plan['covered']:
+            reached = datetime.datetime.fromtimestamp(plan['reached'])
+            reply = QMessageBox.question(
+                self, "Target Not Covered",
+                f"Archived binlogs only reach {reached:%Y-%m-%d %H:%M:%S}. Roll forward as far as they go?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                return None
+            target = None  # Everything archived
+        plan.update(position=position[1], target=target)
+        return plan
+    
+    def replay_binlogs(self, plan, mysql_command):
+        """Pipe archived binlogs through mysqlbinlog into the server, stopping at the target time"""
+        workdir = tempfile.mkdtemp(prefix="binlog_replay_")
+        try:
+            paths = []
+            for name, path in plan['files']:
+                if path.endswith('.gz'):
+                    local = os.path.join(workdir, name)
+                    with gzip.open(path, 'rb') as src, open(local, 'wb') as dst:
+                        shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+                    path = local
+                paths.append(path)
+                
+            # One mysqlbinlog run for all files keeps session state (temporary tables) intact
+            command = [
+                self.resolve_tool("mysqlbinlog"),
+                f"--start-position={plan['position']}",
+                f"--database={self.db_name_input.text()}"
+            ]
+            if plan['target']:
+                command.append(f"--stop-datetime={plan['target']:%Y-%m-%d %H:%M:%S}")
+            command += paths
+            process = self.supervisor.start(command, kind="restore", stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                            **self.job_limits())
+            stderr_chunks = []
+            stderr_thread = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+            stderr_thread.start()
+            try:
+                self.run_restore(mysql_command, process.stdout)
+            finally:
+                process.stdout.close()
+                process.wait()
+                stderr_thread.join()
+            if process.returncode != 0:
+                stderr = b''.join(stderr_chunks)
+                job = self.supervisor.job_for(process)
+                raise Exception(job.stop_reason if job and job.stop_reason else
+                                self.safe_decode(stderr) if stderr else "mysqlbinlog failed")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    def restore_base_backup(self, backup_name):
+        """Unpack a base backup into an empty directory, ready for a local pg_ctl start"""
+        try:
+            storage = self.backup_storage()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Cannot open backup storage:\n{self.format_exception(e)}")
+            return
+        if backup_name.endswith(BackupEncryption.SUFFIX) and not self.encryption_passphrase_input.text():
+            QMessageBox.warning(self, "No Passphrase", "This backup is encrypted. Enter its passphrase on the Backup/Restore tab.")
+            return
+            
+        target = QFileDialog.getExistingDirectory(self, "Select an empty directory for the restored data directory")
+        if not target:
+            return
+        if os.listdir(target):
+            QMessageBox.warning(self, "Directory Not Empty", "Choose an empty directory for the restored cluster.")
+            return
+            
+        job = self.start_job("restore", f"unpacking {backup_name}")
+        try:
+            with self.open_backup_reader(storage, backup_name) as reader:
+                with gzip.GzipFile(fileobj=CheckedReader(reader, self.check_job), mode='rb') as stream:
+                    extract_tar_stream(stream, target)
+            if platform.system() != 'Windows':
+                os.chmod(target, 0o700)  # The server refuses group/world-accessible data directories
+            label = read_backup_label(target)
+        except Exception as e:
+            for entry in os.listdir(target):
+                path = os.path.join(target, entry)
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+            self.report_job_failure("Restore Failed", f"Failed to unpack base backup:\n{self.format_exception(e)}")
+            return
+        finally:
+            self.finish_job(job)
+            
+        self.pitr_data_dir_input.setText(target)
+        QMessageBox.information(
+            self, "Restore Successful",
+            f"Data directory laid down at:\n{target}\n\n"
+            f"Base backup WAL start {format_lsn(label['start_lsn'])} on timeline {label['timeline']}.\n"
+            f"Start it with:\n  pg_ctl -D \"{target}\" start\n"
+            "(check the port in postgresql.conf if another server runs here). "
+            "To recover to a point in time instead, use the Point-in-Time tab."
+        )
+    
+    def choose_index_tables(self, index):
+        """Ask which tables of an indexed dump to restore; returns a set of (schema, table)"""
+        sizes = {}
+        for section in index['sections']:
+            if section['table'] is not None:
+                key = (section['schema'], section['table'])
+                sizes[key] = sizes.get(key, 0) + section['end'] - section['start']
+                
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Restore Selected Tables")
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel("Tables to restore (existing MySQL tables are replaced):"))
+        table_list = QListWidget()
+        table_list.setSelectionMode(QAbstractItemView.MultiSelection)
+        for key in sorted(sizes):
+            label = f"{key[0]}.{key[1]}" if key[0] else key[1]
+            item = QListWidgetItem(f"{label}  ({self.format_size(sizes[key])})")
+            item.setData(Qt.UserRole, key)
+            table_list.addItem(item)
+        layout.addWidget(table_list)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        
+        if dialog.exec_() != QDialog.Accepted:
+            return set()
+        return {tuple(item.data(Qt.UserRole)) for item in table_list.selectedItems()}
+    
+    def restore_selected_tables(self):
+        """Stream only the chosen tables' sections of a SQL backup into the server"""
         if not self.connection:
             QMessageBox.warning(self, "Not Connected", "Please connect to a database first.")
             return
+        selected_items = self.backup_list.selectedItems()
+        if not selected_items:
+            return
+        backup_name = selected_items[0].text()
+        encrypted = backup_name.endswith(BackupEncryption.SUFFIX)
+        if encrypted and not self.encryption_passphrase_input.text():
+            QMessageBox.warning(self, "No Passphrase", "This backup is encrypted. Enter its passphrase on the Backup/Restore tab.")
+            return
+            
+        try:
+            storage = self.backup_storage()
+            with self.open_backup_reader(storage, dump_index_name(backup_name)) as reader:
+                index = json.loads(reader.read().decode('utf-8'))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No usable table index for this backup (backups made before "
+                                 f"indexing have none):\n{self.format_exception(e)}")
+            return
+        if index['db_type'] != self.current_db_type:
+            QMessageBox.warning(self, "Wrong Database Type", f"This is a {index['db_type']} backup.")
+            return
+            
+        tables = self.choose_index_tables(index)
+        if not tables:
+            return
+        ranges = index_ranges(index, tables)
+        
+        job = self.start_job("restore", f"restore of {len(tables)} table(s) from {backup_name}", self.current_db_type)
+        try:
+            if self.current_db_type == "PostgreSQL":
+                # pg_dump's plain output creates tables without dropping them first
+                with self.connection.cursor() as cursor:
+                    existing = []
+                    for schema, table in sorted(tables):
+                        cursor.execute("SELECT to_regclass(%s)", (f"{quote_pg_identifier(schema)}.{quote_pg_identifier(table)}",))
+                        if cursor.fetchone()[0]:
+                            existing.append(f"{schema}.{table}")
+                self.connection.rollback()
+                if existing:
+                    QMessageBox.warning(self, "Tables Exist", "Drop or rename these tables first:\n" + "\n".join(existing))
+                    return
+                psql_path = self.resolve_tool("psql")
+                if not psql_path:
+                    QMessageBox.critical(self, "Error", "psql utility not found. Please install PostgreSQL or specify the path.")
+                    return
+                command = [
+                    psql_path,
+                    "-h", self.host_input.text(),
+                    "-p", self.port_input.text() or "5432",
+                    "-U", self.user_input.text(),
+                    "-d", self.db_name_input.text(),
+                    "-v", "ON_ERROR_STOP=1", "--single-transaction", "-q"
+                ]
+                env = os.environ.copy()
+                env["PGPASSWORD"] = self.pass_input.text()
+            else:
+                mysql_path = self.resolve_tool("mysql")
+                if not mysql_path:
+                    QMessageBox.critical(self, "Error", "mysql utility not found. Please install MySQL or specify the path.")
+                    return
+                command = [
+                    mysql_path,
+                    "-h", self.host_input.text(),
+                    "-P", self.port_input.text() or "3306",
+                    "-u", self.user_input.text(),
+                    f"--password={self.pass_input.text()}",
+                    self.db_name_input.text()
+                ]
+                env = None
+                
+            local_path = None if encrypted else storage.local_path(backup_name)
+            if local_path and os.path.getsize(local_path) != index['size']:
+                raise ValueError("The backup file does not match its table index")
+            started = time.perf_counter()
+            if local_path:
+                self.run_restore(command, RangeReader(ranges, path=local_path), env)
+            else:
+                with self.open_backup_reader(storage, backup_name) as reader:
+                    self.run_restore(command, RangeReader(ranges, stream=reader), env)
+        except Exception as e:
+            self.report_job_failure("Restore Failed", f"Failed to restore tables:\n{self.format_exception(e)}")
+            return
+        finally:
+            self.finish_job(job)
+            
+        restored = sum(end - start for start, end in ranges)
+        QMessageBox.information(
+            self, "Restore Successful",
+            f"Restored {len(tables)} table(s) from {self.format_size(restored)} of a "
+            f"{self.format_size(index['size'])} dump in {time.perf_counter() - started:.1f} s."
+        )
+    
+    def restore_mysql_parallel(self, storage, backup_name, command, workers):
+        """Restore a mysqldump SQL backup with its tables' data loaded concurrently
+
+        Uses the backup's table index, or indexes the dump while reading it.
+        Encrypted and remote backups are first spooled to a private temporary
+        file so every connection can read its own sections. Returns the number
+        of connections used; dumps that cannot be split load on one.
+        """
+        try:
+            with self.open_backup_reader(storage, dump_index_name(backup_name)) as reader:
+                index = json.loads(reader.read().decode('utf-8'))
+        except Exception:
+            index = None  # Backups made before indexing are indexed below
+            
+        encrypted = backup_name.endswith(BackupEncryption.SUFFIX)
+        path = None if encrypted else storage.local_path(backup_name)
+        spool = None
+        try:
+            if path is None or index is None:
+                if path is None:
+                    spool = tempfile.NamedTemporaryFile(prefix="restore_", suffix=".sql", delete=False)
+                indexer = SqlDumpIndexer(spool or open(os.devnull, 'wb'), "MySQL")
+                with indexer.inner, self.open_backup_reader(storage, backup_name) as reader:
+                    for chunk in iter(lambda: reader.read(STREAM_CHUNK_SIZE), b''):
+                        indexer.write(chunk)
+                        self.check_job()
+                path = path or spool.name
+                if index is None and indexer.error is None:
+                    index = indexer.index(os.path.getsize(path))
+                    
+            plan = None
+            if index is not None:
+                if os.path.getsize(path) != index['size']:
+                    raise ValueError("The backup file does not match its table index")
+                try:
+                    plan = MySQLRestorePlan(index)
+                except ValueError as e:
+                    print(f"Restoring on one connection: {e}")
+            if plan is None or len(plan.tables) < 2:
+                with open(path, 'rb') as f:
+                    self.run_restore(command, f)
+                return 1
+                
+            self.run_restore(command, RangeReader(plan.schema, path=path))
+            
+            # Data sections carry their own LOCK TABLES, so tables load side by side
+            bulk_command = command[:-1] + [f"--init-command={MYSQL_BULK_SESSION}"] + command[-1:]
+            prefix = plan.session_preamble(path)
+            
+            def load_table(table, ranges):
+                try:
+                    self.run_restore(bulk_command, RangeReader(ranges, path=path, prefix=prefix))
+                except Exception as e:
+                    raise Exception(f"Loading table {table} failed:\n{e}") from e
+                    
+            workers = min(workers, len(plan.tables))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pending = {executor.submit(load_table, table, ranges) for table, ranges in plan.tables}
+                try:
+                    while pending:
+                        done, pending = wait(pending, timeout=0.1, return_when=FIRST_EXCEPTION)
+                        for future in done:
+                            future.result()
+                        self.check_job()
+                except BaseException:
+                    # Tables already loading finish; the rest never start
+                    for future in pending:
+                        future.cancel()
+                    wait(pending)
+                    raise
+                    
+            # Views, routines and events come last, once every table they refer to exists
+            if plan.late:
+                self.run_restore(command, RangeReader(plan.late, path=path, prefix=prefix))
+            return workers
+        finally:
+            if spool:
+                os.remove(spool.name)
+    
+    def restore_csv_backup(self, storage, backup_name):
+        """Load a CSV backup into the existing tables, with their indexes and constraints deferred
+
+        The tables are emptied, their indexes, keys and foreign keys dropped,
+        the CSV entries loaded over several connections, and everything
+        rebuilt concurrently afterwards. Returns a summary with the time
+        spent in each phase.
+        """
+        db_type = self.current_db_type
+        workers = self.restore_workers_spin.value()
+        encrypted = backup_name.endswith(BackupEncryption.SUFFIX)
+        path = None if encrypted else storage.local_path(backup_name)
+        spool = None
+        ddl_file = None
+        connection = None
+        deferred = DeferredIndexes(db_type)
+        phases = {}
+        try:
+            if path is None:
+                # Zip archives need random access: encrypted and remote ones are spooled to a private file
+                started = time.perf_counter()
+                spool = tempfile.NamedTemporaryFile(prefix="restore_", suffix=".zip", delete=False)
+                with spool, self.open_backup_reader(storage, backup_name) as reader:
+                    for chunk in iter(lambda: reader.read(STREAM_CHUNK_SIZE), b''):
+                        spool.write(chunk)
+                        self.check_job()
+                path = spool.name
+                phases['download'] = time.perf_counter() - started
+            with zipfile.ZipFile(path) as archive:
+                entry_sizes = {info.filename: info.file_size for info in archive.infolist()}
+            tables = csv_archive_tables(entry_sizes, db_type)
+            if not tables:
+                raise ValueError("The archive holds no table data")
+            weights = {table: sum(entry_sizes[name] for name in names) for table, names in tables.items()}
+            
+            started = time.perf_counter()
+            connection = self.job_connection(db_type)
+            with connection.cursor() as cursor:
+                if db_type == "PostgreSQL":
+                    cursor.execute("SELECT t FROM unnest(%s::text[]) AS t WHERE to_regclass(t) IS NULL",
+                                   ([f"{quote_pg_identifier(s)}.{quote_pg_identifier(t)}" for s, t in tables],))
+                    missing = [row[0] for row in cursor.fetchall()]
+                    nullable = {}
+                else:
+                    cursor.execute("""
+                        SELECT TABLE_NAME, COLUMN_NAME, IS_NULLABLE = 'YES'
+                        FROM information_schema.COLUMNS
+                        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN %s
+                    """, (sorted(table for _, table in tables),))
+                    nullable = {}
+                    for table, column, is_nullable in cursor.fetchall():
+                        nullable.setdefault(table, {})[column] = bool(is_nullable)
+                    missing = sorted(table for _, table in tables if table not in nullable)
+            connection.rollback()
+            if missing:
+                raise ValueError("CSV backups hold data only; create these tables first (e.g. from a schema-only "
+                                 "SQL backup):\n" + "\n".join(missing))
+                                 
+            deferred.capture(connection, sorted(tables))
+            if deferred.items:
+                # Kept until everything is rebuilt, in case the restore stops half way
+                ddl_file = os.path.join(tempfile.gettempdir(), f"restore_indexes_{datetime.datetime.now():%Y%m%d_%H%M%S}.sql")
+                with open(ddl_file, 'w', encoding='utf-8') as f:
+                    f.write(deferred.script())
+            with connection.cursor() as cursor:
+                try:
+                    if db_type == "PostgreSQL":
+                        # Emptying and dropping commit together, or not at all
+                        cursor.execute("TRUNCATE " + ", ".join(f"{quote_pg_identifier(s)}.{quote_pg_identifier(t)}"
+                                                                for s, t in sorted(tables)))
+                        deferred.drop(cursor)
+                    else:
+                        cursor.execute("SET SESSION foreign_key_checks=0")
+                        deferred.drop(cursor)
+                        for _, table in sorted(tables):
+                            cursor.execute(f"TRUNCATE TABLE {quote_mysql_identifier(table)}")
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    if db_type == "PostgreSQL":
+                        deferred.dropped.clear()
+                    raise
+            phases['prepare'] = time.perf_counter() - started
+            
+            connect = self.job_connector(db_type)
+            load_error = None
+            started = time.perf_counter()
+            tasks = [(name, csv_load_task(db_type, schema, table, path, name, nullable.get(table)))
+                     for (schema, table), names in sorted(tables.items(), key=lambda item: -weights[item[0]])
+                     for name in names]
+            try:
+                loaded = run_on_connections(connect, tasks, workers,
+                                            ["SET synchronous_commit = off"] if db_type == "PostgreSQL" else [MYSQL_BULK_SESSION],
+                                            self.check_job)
+            except Exception as e:
+                self.check_job()  # A cancelled restore leaves the rebuild to the saved DDL
+                load_error, loaded = e, {}
+            phases['load'] = time.perf_counter() - started
             
+            # Rebuild even after a failed load, so the tables are not left without their keys
+            started = time.perf_counter()
+            index_tasks = [(label, statement_task(statement))
+                           for label, statement in deferred.statements(deferred.dropped, ('key', 'index'), weights)]
+            session = []
+            if db_type == "PostgreSQL" and index_tasks:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT setting::bigint FROM pg_settings WHERE name = 'maintenance_work_mem'")
+                    budget = self.index_memory_spin.value() * 1024 or cursor.fetchone()[0]  # kB
+                connection.rollback()
+                memory = max(1024, budget // min(workers, len(index_tasks)))
+                session = [f"SET maintenance_work_mem = '{memory}kB'"]
+            built = run_on_connections(connect, index_tasks, workers, session, self.check_job)
+            phases['indexes'] = time.perf_counter() - started
+            
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                if db_type == "MySQL":
+                    cursor.execute("SET SESSION foreign_key_checks=0")
+                for _, statement in deferred.statements(deferred.dropped, ('foreign key',)):
+                    cursor.execute(statement)
+            connection.commit()
+            run_on_connections(connect, [(label, statement_task(statement)) for label, statement in deferred.validations()],
+                               workers, on_wait=self.check_job)
+            phases['foreign keys'] = time.perf_counter() - started
+            deferred.dropped.clear()
+            if ddl_file:
+                os.remove(ddl_file)
+            if load_error:
+                raise load_error
+        except Exception as e:
+            if deferred.dropped and ddl_file:
+                raise Exception(f"{e}\n\nIndexes and constraints dropped for the load are not all back; "
+                                f"their definitions are saved in {ddl_file}") from e
+            raise
+        finally:
+            if connection:
+                connection.close()
+            if spool:
+                os.remove(spool.name)
+                
+        rows = sum(result or 0 for _, result in loaded.values())
+        summary = (f"{len(tables)} tables, {rows} rows from {len(tasks)} entries over "
+                   f"{min(workers, len(tasks))} connections\n"
+                   f"Deferred {len(deferred.items)} indexes, keys and foreign keys")
+        if built:
+            slowest = max(built, key=lambda label: built[label][0])
+            summary += f" (slowest: {slowest}, {built[slowest][0]:.1f} s)"
+        return summary + "\n" + ", ".join(f"{phase} {seconds:.1f} s" for phase, seconds in phases.items())
+    
+    def restore_backup(self):
         selected_items = self.backup_list.selectedItems()
+        if selected_items and is_base_backup_name(selected_items[0].text()):
+            # Physical restores build a new data directory and need no connection
+            self.restore_base_backup(selected_items[0].text())
+            return
+            
+        if not self.connection:
+            QMessageBox.warning(self, "Not Connected", "Please connect to a database first.")
+            return
+            
         if not selected_items:
             return
             
-        backup_file = os.path.join(self.backup_location_input.text(), selected_items[0].text())
+        backup_name = selected_items[0].text()
+        try:
+            storage = self.backup_storage()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Cannot open backup storage:\n{self.format_exception(e)}")
+            return
+        backup_file = storage.location(backup_name)
         
         reply = QMessageBox.question(
             self, "Confirm Restore",
@@ -2128,9 +8979,23 @@ class DatabaseBackupApp(QMainWindow):
         if reply != QMessageBox.Yes:
             return
             
+        encrypted = backup_name.endswith(BackupEncryption.SUFFIX)
+        if encrypted and not self.encryption_passphrase_input.text():
+            QMessageBox.warning(self, "No Passphrase", "This backup is encrypted. Enter its passphrase on the Backup/Restore tab.")
+            return
+            
+        replay = None
+        connections = 1
+        summary = None
+        job = self.start_job("restore", f"restore of {backup_name}", self.current_db_type)
         try:
-            if self.current_db_type == "PostgreSQL":
-                if not self.pg_restore_path or not os.path.exists(self.pg_restore_path):
+            if backup_name.endswith(('.zip', '.zip' + BackupEncryption.SUFFIX)):
+                if self.connection:
+                    self.connection.close()
+                summary = self.restore_csv_backup(storage, backup_name)
+            elif self.current_db_type == "PostgreSQL":
+                pg_restore_path = self.resolve_tool("pg_restore")
+                if not pg_restore_path:
                     QMessageBox.critical(self, "Error", "pg_restore utility not found. Please install PostgreSQL or specify the path.")
                     return
                     
@@ -2138,36 +9003,48 @@ class DatabaseBackupApp(QMainWindow):
                     self.connection.close()
                     
                 command = [
-                    self.pg_restore_path,
+                    pg_restore_path,
                     "-h", self.host_input.text(),
                     "-p", self.port_input.text() or "5432",
                     "-U", self.user_input.text(),
                     "-d", self.db_name_input.text(),
-                    "-c",
-                    backup_file
+                    "-c"
                 ]
                 
                 env = os.environ.copy()
                 env["PGPASSWORD"] = self.pass_input.text()
                 
-                process = subprocess.Popen(command, env=env, stderr=subprocess.PIPE)
-                self.background_processes.append(process)
-                _, stderr = process.communicate()
-                
-                if process.returncode != 0:
-                    error_msg = self.safe_decode(stderr) if stderr else "Unknown error"
-                    raise Exception(error_msg)
+                local_path = None if encrypted else storage.local_path(backup_name)
+                if local_path:
+                    self.check_job()
+                    process = self.supervisor.start(command + [local_path], kind="restore", env=env,
+                                                    stderr=subprocess.PIPE, **self.job_limits())
+                    stderr = self.wait_for_tool(process)
+                    
+                    if process.returncode != 0:
+                        raise Exception(self.process_failure(process, stderr))
+                else:
+                    # Remote and encrypted backups are streamed into pg_restore's stdin
+                    with self.open_backup_reader(storage, backup_name) as reader:
+                        self.run_restore(command, reader, env)
                     
             else:
-                if not self.mysql_path or not os.path.exists(self.mysql_path):
+                mysql_path = self.resolve_tool("mysql")
+                if not mysql_path:
                     QMessageBox.critical(self, "Error", "mysql utility not found. Please install MySQL or specify the path.")
                     return
                     
+                if self.roll_forward_checkbox.isChecked():
+                    # Work out the binlogs before anything is overwritten
+                    replay = self.plan_binlog_replay(storage, backup_name)
+                    if replay is None:
+                        return
+                    
                 if self.connection:
                     self.connection.close()
                     
                 command = [
-                    self.mysql_path,
+                    mysql_path,
                     "-h", self.host_input.text(),
                     "-P", self.port_input.text() or "3306",
                     "-u", self.user_input.text(),
@@ -2175,24 +9052,40 @@ class DatabaseBackupApp(QMainWindow):
                     self.db_name_input.text()
                 ]
                 
-                with open(backup_file, 'r') as input_file:
-                    process = subprocess.Popen(command, stdin=input_file, stderr=subprocess.PIPE)
-                    self.background_processes.append(process)
-                    _, stderr = process.communicate()
-                    
-                    if process.returncode != 0:
-                        error_msg = self.safe_decode(stderr) if stderr else "Unknown error"
-                        raise Exception(error_msg)
+                if self.restore_workers_spin.value() > 1 and backup_name.endswith(('.sql', '.sql' + BackupEncryption.SUFFIX)):
+                    connections = self.restore_mysql_parallel(storage, backup_name, command, self.restore_workers_spin.value())
+                else:
+                    with self.open_backup_reader(storage, backup_name) as reader:
+                        self.run_restore(command, reader)
+                if replay:
+                    self.replay_binlogs(replay, command)
                         
             self.connect_to_db()
-            QMessageBox.information(self, "Restore Successful", "Database restored successfully.")
+            if summary:
+                QMessageBox.information(self, "Restore Successful", f"CSV backup loaded.\n\n{summary}")
+            elif connections > 1:
+                QMessageBox.information(
+                    self, "Restore Successful",
+                    f"Database restored, with table data loaded over {connections} connections."
+                    + (f" Rolled forward from {len(replay['files'])} binlog(s)." if replay else "")
+                )
+            elif replay:
+                until = f"{replay['target']:%Y-%m-%d %H:%M:%S}" if replay['target'] else "the end of the archive"
+                QMessageBox.information(
+                    self, "Restore Successful",
+                    f"Database restored and rolled forward to {until} from {len(replay['files'])} binlog(s)."
+                )
+            else:
+                QMessageBox.information(self, "Restore Successful", "Database restored successfully.")
             
         except Exception as e:
-            QMessageBox.critical(self, "Restore Failed", f"Failed to restore database:\n{self.format_exception(e)}")
+            self.report_job_failure("Restore Failed", f"Failed to restore database:\n{self.format_exception(e)}")
             try:
                 self.connect_to_db()
             except:
                 pass
+        finally:
+            self.finish_job(job)
                 
     def load_config(self):
         config = ConfigParser()
@@ -2210,8 +9103,42 @@ class DatabaseBackupApp(QMainWindow):
             if 'Backup' in config:
                 backup_config = config['Backup']
                 self.backup_location_input.setText(backup_config.get('location', ''))
+                self.storage_combo.setCurrentText(backup_config.get('storage', 'Local directory'))
+                self.s3_endpoint_input.setText(backup_config.get('s3_endpoint', ''))
+                self.s3_region_input.setText(backup_config.get('s3_region', ''))
+                self.s3_bucket_input.setText(backup_config.get('s3_bucket', ''))
+                self.s3_prefix_input.setText(backup_config.get('s3_prefix', ''))
+                self.s3_access_key_input.setText(backup_config.get('s3_access_key', ''))
                 self.backup_format_combo.setCurrentText(backup_config.get('format', 'SQL'))
                 self.schedule_combo.setCurrentText(backup_config.get('schedule', 'Disabled'))
+                self.write_rate_spin.setValue(backup_config.getint('max_write_rate', 0))
+                self.row_rate_spin.setValue(backup_config.getint('csv_rows_per_second', 0))
+                self.process_priority_combo.setCurrentText(backup_config.get('process_priority', 'Normal'))
+                self.export_workers_spin.setValue(backup_config.getint('export_workers', 4))
+                self.restore_workers_spin.setValue(backup_config.getint('restore_workers', 4))
+                self.index_memory_spin.setValue(backup_config.getint('index_build_memory', 0))
+                self.job_timeout_spin.setValue(backup_config.getint('tool_timeout', 0))
+                self.job_memory_spin.setValue(backup_config.getint('tool_memory_limit', 0))
+                self.monitor_interval_spin.setValue(backup_config.getint('monitor_interval', 2))
+                self.monitor_budget_spin.setValue(backup_config.getint('monitor_budget', 5))
+                self.resumable_checkbox.setChecked(backup_config.getboolean('resumable_csv', True))
+                self.defer_checkbox.setChecked(backup_config.getboolean('defer_when_busy', False))
+                self.max_sessions_spin.setValue(backup_config.getint('defer_max_sessions', 20))
+                self.max_lag_spin.setValue(backup_config.getint('defer_max_lag', 60))
+                self.max_cpu_spin.setValue(backup_config.getint('defer_max_cpu', 80))
+                self.defer_window_spin.setValue(backup_config.getint('defer_window', 120))
+                self.catch_up_spin.setValue(backup_config.getint('catch_up_hours', 24))
+                self.include_schemas_input.setText(backup_config.get('include_schemas', ''))
+                self.exclude_schemas_input.setText(backup_config.get('exclude_schemas', ''))
+                self.include_tables_input.setText(backup_config.get('include_tables', ''))
+                self.exclude_tables_input.setText(backup_config.get('exclude_tables', ''))
+                
+            if 'Archiving' in config:
+                archiving_config = config['Archiving']
+                self.wal_directory_input.setText(archiving_config.get('wal_directory', ''))
+                self.wal_slot_input.setText(archiving_config.get('wal_slot', 'db_backup_archiver'))
+                self.binlog_directory_input.setText(archiving_config.get('binlog_directory', ''))
+                self.record_binlog_checkbox.setChecked(archiving_config.getboolean('record_binlog_position', False))
                 
             if 'Paths' in config:
                 path_config = config['Paths']
@@ -2240,8 +9167,42 @@ class DatabaseBackupApp(QMainWindow):
         
         config['Backup'] = {
             'location': self.backup_location_input.text(),
+            'storage': self.storage_combo.currentText(),
+            's3_endpoint': self.s3_endpoint_input.text(),
+            's3_region': self.s3_region_input.text(),
+            's3_bucket': self.s3_bucket_input.text(),
+            's3_prefix': self.s3_prefix_input.text(),
+            's3_access_key': self.s3_access_key_input.text(),
             'format': self.backup_format_combo.currentText(),
-            'schedule': self.schedule_combo.currentText()
+            'schedule': self.schedule_combo.currentText(),
+            'max_write_rate': str(self.write_rate_spin.value()),
+            'csv_rows_per_second': str(self.row_rate_spin.value()),
+            'process_priority': self.process_priority_combo.currentText(),
+            'export_workers': str(self.export_workers_spin.value()),
+            'restore_workers': str(self.restore_workers_spin.value()),
+            'index_build_memory': str(self.index_memory_spin.value()),
+            'tool_timeout': str(self.job_timeout_spin.value()),
+            'tool_memory_limit': str(self.job_memory_spin.value()),
+            'monitor_interval': str(self.monitor_interval_spin.value()),
+            'monitor_budget': str(self.monitor_budget_spin.value()),
+            'resumable_csv': str(self.resumable_checkbox.isChecked()),
+            'defer_when_busy': str(self.defer_checkbox.isChecked()),
+            'defer_max_sessions': str(self.max_sessions_spin.value()),
+            'defer_max_lag': str(self.max_lag_spin.value()),
+            'defer_max_cpu': str(self.max_cpu_spin.value()),
+            'defer_window': str(self.defer_window_spin.value()),
+            'catch_up_hours': str(self.catch_up_spin.value()),
+            'include_schemas': self.include_schemas_input.text(),
+            'exclude_schemas': self.exclude_schemas_input.text(),
+            'include_tables': self.include_tables_input.text(),
+            'exclude_tables': self.exclude_tables_input.text()
+        }
+        
+        config['Archiving'] = {
+            'wal_directory': self.wal_directory_input.text(),
+            'wal_slot': self.wal_slot_input.text(),
+            'binlog_directory': self.binlog_directory_input.text(),
+            'record_binlog_position': str(self.record_binlog_checkbox.isChecked())
         }
         
         config['Paths'] = {
@@ -2258,7 +9219,19 @@ class DatabaseBackupApp(QMainWindow):
         
     def closeEvent(self, event):
         """Handle application close event"""
+        if self.active_job:
+            QMessageBox.warning(self, f"{self.active_job.kind.capitalize()} Running",
+                                f"A {self.active_job.kind} is still running. Wait for it to finish, "
+                                f"or cancel it, before closing the application.")
+            event.ignore()
+            return
         try:
+            # Stop continuous archiving; segments already finished are swept into the archive
+            for archiver in (self.wal_archiver, self.binlog_archiver):
+                if archiver:
+                    archiver.stop()
+            self.stop_activity_monitor()
+                
             # Shutdown scheduler
             if hasattr(self, 'scheduler') and self.scheduler:
                 self.scheduler.shutdown()
@@ -2277,36 +9250,46 @@ class DatabaseBackupApp(QMainWindow):
         
     def terminate_background_processes(self):
         """Terminate all background processes"""
-        for proc in self.background_processes:
-            try:
-                if isinstance(proc, subprocess.Popen):
-                    # Terminate the process tree
-                    parent = psutil.Process(proc.pid)
-                    for child in parent.children(recursive=True):
-                        child.terminate()
-                    parent.terminate()
-                    
-                    # Wait a bit then kill if still running
-                    try:
-                        proc.wait(timeout=2)
-                    except subprocess.TimeoutExpired:
-                        proc.kill()
-                        
-                elif platform.system() == 'Windows' and isinstance(proc, tuple):
-                    # Handle Windows service control processes
-                    handle, process_id = proc
-                    try:
-                        win32process.TerminateProcess(handle, 0)
-                        win32api.CloseHandle(handle)
-                    except:
-                        pass
-                        
-            except Exception as e:
-                print(f"Error terminating process {proc}: {e}")
-                
-        self.background_processes = []
+        self.supervisor.stop_all()
+
+def run_cli(argv):
+    """Job control from the command line; returns an exit code, or None to start the UI"""
+    parser = argparse.ArgumentParser(description="Database Backup Manager")
+    parser.add_argument("--jobs", action="store_true", help="list the backups and restores in progress")
+    parser.add_argument("--cancel", nargs="?", const="all", metavar="JOB_ID",
+                        help="cancel a backup or restore in progress (all of them without JOB_ID)")
+    args, _ = parser.parse_known_args(argv)  # Anything else is left to Qt
+    if not args.jobs and args.cancel is None:
+        return None
+        
+    history = BackupHistory(SCHEDULE_DB)
+    if args.jobs:
+        jobs = history.active_jobs()
+        for job in jobs:
+            started = datetime.datetime.fromtimestamp(job['started']).strftime('%Y-%m-%d %H:%M:%S')
+            state = "cancelling" if job['cancel_requested'] else "running"
+            print(f"{job['id']}\t{job['kind']}\t{state}\tstarted {started}\t{job['description']}")
+        if not jobs:
+            print("No backup or restore is running")
+        return 0
+        
+    try:
+        job_id = None if args.cancel == "all" else int(args.cancel)
+    except ValueError:
+        parser.error(f"invalid job id: {args.cancel}")
+    count = history.request_cancel(job_id)
+    if not count:
+        print("No matching backup or restore is running")
+        return 1
+    # The owning application polls for the request and stops the job within a few seconds
+    print(f"Cancellation requested for {count} job(s)")
+    return 0
 
 if __name__ == "__main__":
+    exit_code = run_cli(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
+        
     # On Windows, hide the console window
     if platform.system() == "Windows":
         import ctypes